@@ -0,0 +1,90 @@
+"""NumPy による一括ダメージ計算.
+
+攻撃と防御の情報を列ごとの配列で受け取り、多数のダメージ値をまとめて計算します.
+結果は Damage.calc を1件ずつ呼んだ場合と一致します.
+
+NumPy がインストールされていない環境では利用できません.
+"""
+from __future__ import annotations
+
+import typing as tp
+
+from damage.damage import AttackType, Attribute, ConditionMagnificationDictType
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 属性耐性の表の列の並び
+ATTRIBUTES = tuple(Attribute)
+
+
+def is_available() -> bool:
+    """NumPy が利用できるか？"""
+
+    return np is not None
+
+
+def calc_damages(
+        powers: tp.Any,
+        types: tp.Any,
+        attributes: tp.Any,
+        physics: tp.Any,
+        magics: tp.Any,
+        resistances: tp.Any,
+        conditions: tp.Any,
+        cond_mag_dict: ConditionMagnificationDictType = None) -> np.ndarray:
+    """ダメージ値をまとめて計算します.
+
+    各列は攻撃1回ごとの値を並べた、同じ長さの配列です.
+    状態異常特攻は全件で共通のため、特攻の異なる攻撃は分けて計算してください.
+
+    :params powers: 威力
+    :params types: 攻撃タイプ（AttackType の値）
+    :params attributes: 属性（Attribute の値）
+    :params physics: 物理防御力
+    :params magics: 魔法防御力
+    :params resistances: 属性抵抗率の表。列は ATTRIBUTES の並び
+    :params conditions: 状態異常（Condition の値のビット和）。正常時は 0
+    :params cond_mag_dict: 状態異常特攻の辞書（状態異常種別:倍率）
+    :return: ダメージ値の配列
+    :raises ImportError: NumPy がインストールされていない
+    """
+
+    if not is_available():
+        raise ImportError('calc_damages requires numpy')
+
+    powers = np.asarray(powers, dtype=np.int64)
+    types = np.asarray(types, dtype=np.int64)
+    attributes = np.asarray(attributes, dtype=np.intp)
+    physics = np.asarray(physics, dtype=np.int64)
+    magics = np.asarray(magics, dtype=np.int64)
+    resistances = np.asarray(resistances, dtype=np.float64).reshape(
+        -1, len(ATTRIBUTES))
+    conditions = np.asarray(conditions, dtype=np.int64)
+
+    # 基本ダメージ
+    is_magic = types == AttackType.MAGIC.value
+    if not (is_magic | (types == AttackType.PHYSICS.value)).all():
+        raise NotImplementedError
+    defences = np.where(is_magic, magics, physics)
+    values = np.maximum(0, powers - defences).astype(np.float64)
+
+    # 状態異常特攻（Damage と同じく、辞書の順に倍率を足していく）
+    if cond_mag_dict:
+        sum_mags = np.ones(len(values))
+        for cond, mag in cond_mag_dict.items():
+            matches = (conditions & cond.value) != 0
+            sum_mags = np.where(matches, sum_mags + (mag - 1.0), sum_mags)
+        values = values * sum_mags
+
+    # 属性抵抗
+    columns = np.zeros(max(a.value for a in ATTRIBUTES) + 1, dtype=np.intp)
+    for column, attr in enumerate(ATTRIBUTES):
+        columns[attr.value] = column
+    ratios = resistances[np.arange(len(values)), columns[attributes]]
+    values = values * ratios
+
+    # int() と同じく 0 の方向に切り捨てる
+    return values.astype(np.int64)
@@ -0,0 +1,124 @@
+"""コンパイル済みのダメージ計算.
+
+攻撃情報と防御情報を、添字で引くだけの表に変換しておきます.
+同じ攻撃と防御の組み合わせで何度も計算する場合に、辞書の走査や検索を省けます.
+結果は Damage.calc と一致します.
+"""
+from __future__ import annotations
+
+import functools
+import operator
+
+from damage.damage import AttackInfo, DefenceInfo, Attribute, Condition
+
+# 属性抵抗率の表の並び
+ATTRIBUTES = tuple(Attribute)
+
+# 属性 → 属性抵抗率の表の添字
+_ATTRIBUTE_INDICES = {attr: i for i, attr in enumerate(ATTRIBUTES)}
+
+# すべての状態異常のビット和
+CONDITION_MASK = functools.reduce(operator.or_, Condition).value
+
+
+class CompiledAttack:
+    """コンパイル済みの攻撃情報.
+
+    状態異常特攻は、状態異常のビット和を添字として、足し合わせた倍率を引ける表にします.
+
+    :params attack: 攻撃情報
+    """
+
+    def __init__(self, attack: AttackInfo) -> None:
+        self._power = attack.power
+        self._magic = attack.is_magic()
+        if not self._magic and not attack.is_physics():
+            raise NotImplementedError
+        self._attr_index = _ATTRIBUTE_INDICES[attack.attribute]
+
+        # Damage と同じく、一致した倍率を辞書の順に足していく
+        items = [
+            (cond.value, mag)
+            for cond, mag in attack.condition_magnifications.items()]
+        mags = []
+        for conditions in range(CONDITION_MASK + 1):
+            sum_mag = 1.0
+            for value, mag in items:
+                if conditions & value:
+                    sum_mag += (mag - 1.0)
+            mags.append(sum_mag)
+        self._cond_mags = tuple(mags)
+
+    @property
+    def power(self) -> int:
+        """威力."""
+
+        return self._power
+
+    @property
+    def condition_magnifications(self) -> tuple[float, ...]:
+        """状態異常のビット和 → 状態異常特攻の倍率 の表."""
+
+        return self._cond_mags
+
+    def is_magic(self) -> bool:
+        """魔法攻撃か？"""
+
+        return self._magic
+
+
+class CompiledDefence:
+    """コンパイル済みの防御情報.
+
+    属性抵抗率は、すべての属性を ATTRIBUTES の並びで持つ表にします.
+
+    :params defence: 防御情報
+    """
+
+    def __init__(self, defence: DefenceInfo) -> None:
+        self._physics = defence.physical_power
+        self._magic = defence.magical_power
+        self._regists = tuple(defence.get_regist(attr) for attr in ATTRIBUTES)
+        self._conditions = sum(
+            cond.value for cond in Condition if defence.is_condition(cond))
+
+    @property
+    def physical_power(self) -> int:
+        """物理防御力."""
+
+        return self._physics
+
+    @property
+    def magical_power(self) -> int:
+        """魔法防御力."""
+
+        return self._magic
+
+    @property
+    def regists(self) -> tuple[float, ...]:
+        """属性抵抗率の表（ATTRIBUTES の並び）."""
+
+        return self._regists
+
+    @property
+    def conditions(self) -> int:
+        """状態異常のビット和。正常時は 0."""
+
+        return self._conditions
+
+
+def calc(attack: CompiledAttack, defence: CompiledDefence) -> int:
+    """ダメージ値を計算します.
+
+    :params attack: コンパイル済みの攻撃情報
+    :params defence: コンパイル済みの防御情報
+    :return: ダメージ値
+    """
+
+    if attack._magic:
+        val = float(max(0, attack._power - defence._magic))
+    else:
+        val = float(max(0, attack._power - defence._physics))
+    val = val * attack._cond_mags[defence._conditions]
+    val = val * defence._regists[attack._attr_index]
+    return int(val)
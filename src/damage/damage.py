@@ -1,7 +1,10 @@
 """ダメージ計算モジュール."""
 from __future__ import annotations
 
+import typing as tp
+from collections import OrderedDict
 from enum import Enum, Flag, auto
+from types import MappingProxyType
 
 
 class AttackType(Enum):
@@ -34,6 +37,55 @@ AttributeResistanceDictType = dict[Attribute, float]
 # [型エイリアス] 状態異常特攻の辞書（状態異常：ダメージ倍率）
 ConditionMagnificationDictType = dict[Condition, float]
 
+# [型エイリアス] 内容を表すキー
+ContentKeyType = tuple
+
+# 辞書を指定しなかった場合に共有する、空の読み取り専用の辞書
+_EMPTY_MAPPING = MappingProxyType({})
+
+
+def _create_attack_key(
+        power: int,
+        type_: AttackType,
+        attr: Attribute,
+        cond_mag_dict: tp.Mapping[Condition, float]) -> ContentKeyType:
+    """攻撃情報の内容を表すキーを作成します.
+
+    列挙型はプロセスごとにハッシュ値が変わるため、値（数値）に置き換えます.
+
+    :params power: 威力
+    :params type_: 攻撃タイプ
+    :params attr: 属性
+    :params cond_mag_dict: 状態異常特攻の辞書
+    :return: キー
+    """
+
+    return (
+        power, type_.value, attr.value,
+        tuple((cond.value, mag) for cond, mag in cond_mag_dict.items()))
+
+
+def _create_defence_key(
+        physics: int,
+        magic: int,
+        res_dict: tp.Mapping[Attribute, float],
+        conditions: tp.Optional[Condition]) -> ContentKeyType:
+    """防御情報の内容を表すキーを作成します.
+
+    :params physics: 物理防御力
+    :params magic: 魔法防御力
+    :params res_dict: 属性抵抗率の辞書
+    :params conditions: 状態異常。正常時は None
+    :return: キー
+    """
+
+    regists = sorted((attr.value, ratio) for attr, ratio in res_dict.items())
+    if conditions is None:
+        conditions_value = 0
+    else:
+        conditions_value = conditions.value
+    return physics, magic, tuple(regists), conditions_value
+
 
 class AttackInfo:
     """攻撃情報.
@@ -79,6 +131,27 @@ class AttackInfo:
 
         return self._cond_mag_dict
 
+    @property
+    def content_key(self) -> ContentKeyType:
+        """内容を表すキー.
+
+        内容が同じ攻撃情報は同じキーになります.
+        状態異常特攻は足し合わせる順番で結果が変わりうるため、辞書の順番もキーに含みます.
+        辞書を後から変更しても反映されるよう、呼び出すたびに作ります.
+        """
+
+        return _create_attack_key(
+            self._power, self._type, self._attr, self._cond_mag_dict)
+
+    @property
+    def content_hash(self) -> int:
+        """内容から求めたハッシュ値.
+
+        キーは数値だけで作るため、プロセスが違っても同じ値になります.
+        """
+
+        return hash(self.content_key)
+
     def is_physics(self) -> bool:
         """物理攻撃か？"""
 
@@ -138,6 +211,26 @@ class DefenceInfo:
 
         return self._magic
 
+    @property
+    def content_key(self) -> ContentKeyType:
+        """内容を表すキー.
+
+        内容が同じ防御情報は同じキーになります. 属性抵抗率の辞書の順番は問いません.
+        辞書を後から変更しても反映されるよう、呼び出すたびに作ります.
+        """
+
+        return _create_defence_key(
+            self._physics, self._magic, self._res_dict, self._conditions)
+
+    @property
+    def content_hash(self) -> int:
+        """内容から求めたハッシュ値.
+
+        キーは数値だけで作るため、プロセスが違っても同じ値になります.
+        """
+
+        return hash(self.content_key)
+
     def get_regist(self, attr: Attribute) -> float:
         """属性抵抗率を得ます.
 
@@ -164,6 +257,215 @@ class DefenceInfo:
         return bool(self._conditions & condition)
 
 
+class FrozenAttackInfo:
+    """変更できない攻撃情報.
+
+    AttackInfo と同じように使えます. 属性を __slots__ に持ち、作成後は変更できません.
+    状態異常特攻の辞書を指定しない場合は、空の辞書を新しく作らずに共有します.
+
+    :params power: 威力
+    :params type_: 攻撃タイプ
+    :params attr: 属性
+    :params cond_mag_dict: 状態異常特攻の辞書（状態異常種別:倍率）。コピーして持ちます
+    """
+
+    __slots__ = ('_power', '_type', '_attr', '_cond_mag_dict', '_content_key')
+
+    def __init__(
+            self,
+            power: int,
+            type_: AttackType = AttackType.PHYSICS,
+            attr: Attribute = Attribute.NONE,
+            cond_mag_dict: ConditionMagnificationDictType = None) -> None:
+        if power < 0:
+            raise ValueError
+
+        set_ = object.__setattr__
+        set_(self, '_power', power)
+        set_(self, '_type', type_)
+        set_(self, '_attr', attr)
+        if cond_mag_dict:
+            set_(self, '_cond_mag_dict', MappingProxyType(dict(cond_mag_dict)))
+        else:
+            set_(self, '_cond_mag_dict', _EMPTY_MAPPING)
+        set_(self, '_content_key', None)
+
+    @property
+    def power(self) -> int:
+        """威力."""
+
+        return self._power
+
+    @property
+    def attribute(self) -> Attribute:
+        """属性."""
+
+        return self._attr
+
+    @property
+    def condition_magnifications(self) -> MappingProxyType:
+        """状態異常特攻の辞書（読み取り専用）."""
+
+        return self._cond_mag_dict
+
+    @property
+    def content_key(self) -> ContentKeyType:
+        """内容を表すキー. AttackInfo と同じ形です.
+
+        変更できないため、初回に作ったキーを使い続けます.
+        """
+
+        if self._content_key is None:
+            object.__setattr__(self, '_content_key', _create_attack_key(
+                self._power, self._type, self._attr, self._cond_mag_dict))
+        return self._content_key
+
+    @property
+    def content_hash(self) -> int:
+        """内容から求めたハッシュ値. プロセスが違っても同じ値になります."""
+
+        return hash(self.content_key)
+
+    def is_physics(self) -> bool:
+        """物理攻撃か？"""
+
+        return self._type == AttackType.PHYSICS
+
+    def is_magic(self) -> bool:
+        """魔法攻撃か？"""
+
+        return self._type == AttackType.MAGIC
+
+    def get_condition_magnification(self, cond: Condition) -> float:
+        """指定した状態異常特攻の倍率を得ます."""
+
+        mag = self._cond_mag_dict.get(cond)
+        if mag is None:
+            return 1.0
+        return mag
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self) -> tuple:
+        # 読み取り専用の辞書は pickle できないため、コンストラクタの引数に戻す
+        return type(self), (
+            self._power, self._type, self._attr,
+            dict(self._cond_mag_dict) or None)
+
+    def __copy__(self) -> FrozenAttackInfo:
+        return self
+
+    def __deepcopy__(self, memo: dict) -> FrozenAttackInfo:
+        return self
+
+
+class FrozenDefenceInfo:
+    """変更できない防御情報.
+
+    DefenceInfo と同じように使えます. 属性を __slots__ に持ち、作成後は変更できません.
+    属性抵抗率の辞書を指定しない場合は、空の辞書を新しく作らずに共有します.
+
+    :params physics: 物理防御力
+    :params magic: 魔法防御力
+    :params res_dict: 属性抵抗率の辞書（属性→抵抗率）。コピーして持ちます
+    :params conditions: 状態異常。正常時は None
+    """
+
+    __slots__ = ('_physics', '_magic', '_res_dict', '_conditions', '_content_key')
+
+    def __init__(
+            self,
+            physics: int,
+            magic: int,
+            res_dict: AttributeResistanceDictType = None,
+            conditions: Condition = None) -> None:
+        if physics < 0:
+            raise ValueError
+        if magic < 0:
+            raise ValueError
+
+        set_ = object.__setattr__
+        set_(self, '_physics', physics)
+        set_(self, '_magic', magic)
+        if res_dict:
+            set_(self, '_res_dict', MappingProxyType(dict(res_dict)))
+        else:
+            set_(self, '_res_dict', _EMPTY_MAPPING)
+        set_(self, '_conditions', conditions)
+        set_(self, '_content_key', None)
+
+    @property
+    def physical_power(self) -> int:
+        """物理防御力."""
+
+        return self._physics
+
+    @property
+    def magical_power(self) -> int:
+        """魔法防御力."""
+
+        return self._magic
+
+    @property
+    def content_key(self) -> ContentKeyType:
+        """内容を表すキー. DefenceInfo と同じ形です.
+
+        変更できないため、初回に作ったキーを使い続けます.
+        """
+
+        if self._content_key is None:
+            object.__setattr__(self, '_content_key', _create_defence_key(
+                self._physics, self._magic, self._res_dict, self._conditions))
+        return self._content_key
+
+    @property
+    def content_hash(self) -> int:
+        """内容から求めたハッシュ値. プロセスが違っても同じ値になります."""
+
+        return hash(self.content_key)
+
+    def get_regist(self, attr: Attribute) -> float:
+        """属性抵抗率を得ます.
+
+        :params attr: 属性
+        :return: 属性抵抗率。見つからない場合は 1.0
+        """
+
+        res = self._res_dict.get(attr)
+        if res is None:
+            return 1.0
+        return res
+
+    def has_condition(self) -> bool:
+        """状態異常を持っているか？"""
+
+        return self._conditions is not None
+
+    def is_condition(self, condition: Condition) -> bool:
+        """指定の状態異常を持っているか？"""
+
+        if self._conditions is None:
+            return False
+
+        return bool(self._conditions & condition)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self) -> tuple:
+        # 読み取り専用の辞書は pickle できないため、コンストラクタの引数に戻す
+        return type(self), (
+            self._physics, self._magic,
+            dict(self._res_dict) or None, self._conditions)
+
+    def __copy__(self) -> FrozenDefenceInfo:
+        return self
+
+    def __deepcopy__(self, memo: dict) -> FrozenDefenceInfo:
+        return self
+
+
 class Damage:
     """ダメージ.
 
@@ -245,3 +547,125 @@ class Damage:
         attr = self._attack.attribute
         ratio = self._defence.get_regist(attr)
         return val * ratio
+
+
+def calc_damage(
+        attack: tp.Union[AttackInfo, FrozenAttackInfo],
+        defence: tp.Union[DefenceInfo, FrozenDefenceInfo]) -> int:
+    """ダメージ値を計算します.
+
+    Damage.calc と同じ結果を、Damage を作らずに求めます.
+
+    :params attack: 攻撃情報
+    :params defence: 防御情報
+    :return: ダメージ値
+    """
+
+    # 基本ダメージ
+    if attack.is_physics():
+        df_pow = defence.physical_power
+    elif attack.is_magic():
+        df_pow = defence.magical_power
+    else:
+        raise NotImplementedError
+    val = float(max(0, attack.power - df_pow))
+
+    # 状態異常特攻
+    cond_mag_dict = attack.condition_magnifications
+    if cond_mag_dict and defence.has_condition():
+        sum_mag = 1.0
+        for cond, mag in cond_mag_dict.items():
+            if defence.is_condition(cond):
+                sum_mag += (mag - 1.0)
+        val = val * sum_mag
+
+    # 属性抵抗
+    val = val * defence.get_regist(attack.attribute)
+
+    return int(val)
+
+
+class DamageCache:
+    """ダメージ値のキャッシュ.
+
+    攻撃情報と防御情報の内容が同じであれば、前回の計算結果を返します.
+    保持する数が上限を超えると、最も長く使われていないものから捨てます.
+
+    :params maxsize: 保持する計算結果の上限
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        assert 0 < maxsize
+
+        self._maxsize = maxsize
+        self._values: OrderedDict[tuple[ContentKeyType, ContentKeyType], int] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def maxsize(self) -> int:
+        """保持する計算結果の上限."""
+
+        return self._maxsize
+
+    @property
+    def hits(self) -> int:
+        """キャッシュから返した回数."""
+
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """計算し直した回数."""
+
+        return self._misses
+
+    @property
+    def evictions(self) -> int:
+        """上限を超えて捨てた回数."""
+
+        return self._evictions
+
+    @property
+    def hit_rate(self) -> float:
+        """キャッシュから返した割合."""
+
+        total = self._hits + self._misses
+        if total == 0:
+            return 0.0
+        return self._hits / total
+
+    def calc(self, attack: AttackInfo, defence: DefenceInfo) -> int:
+        """ダメージ値を得ます.
+
+        :params attack: 攻撃情報
+        :params defence: 防御情報
+        :return: ダメージ値
+        """
+
+        key = (attack.content_key, defence.content_key)
+        value = self._values.get(key)
+        if value is not None:
+            self._hits += 1
+            self._values.move_to_end(key)
+            return value
+
+        self._misses += 1
+        value = Damage(attack, defence).calc()
+        self._values[key] = value
+        if self._maxsize < len(self._values):
+            self._values.popitem(last=False)
+            self._evictions += 1
+        return value
+
+    def clear(self) -> None:
+        """保持している計算結果と統計を消します."""
+
+        self._values.clear()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
@@ -0,0 +1,178 @@
+"""ダメージ値の分布.
+
+威力と防御力のばらつき、状態異常にかかっている確率から、ダメージ値の分布を解析的に求めます.
+乱数で何度も試す代わりに、整数のダメージ値ごとの確率を正確に計算します.
+"""
+from __future__ import annotations
+
+import typing as tp
+from fractions import Fraction
+
+from damage.compiled import CompiledAttack, CONDITION_MASK
+from damage.damage import AttackInfo, DefenceInfo, Condition
+
+# [型エイリアス] 範囲（最小値, 最大値）。どちらも含み、範囲内の値は同じ確率で出る
+RangeType = tuple[int, int]
+
+# [型エイリアス] 状態異常にかかっている確率の辞書（状態異常：確率）
+ConditionProbabilityDictType = dict[Condition, float]
+
+
+class DamageDistribution:
+    """ダメージ値の分布.
+
+    威力と防御力は範囲内の整数が同じ確率で出るものとし、状態異常はそれぞれ独立にかかっているものとします.
+    1回ごとのダメージ値は Damage.calc と同じ計算で求めます.
+    確率は Fraction で持つため、丸め誤差はありません.
+
+    :params attack: 攻撃情報
+    :params defence: 防御情報
+    :params power_range: 威力の範囲。None の場合は攻撃情報の威力で固定
+    :params defence_range: 攻撃タイプに対応する防御力の範囲。None の場合は防御情報の防御力で固定
+    :params cond_prob_dict: 状態異常にかかっている確率の辞書。None の場合は防御情報の状態異常で固定
+    :raises ValueError: 範囲や確率が正しくない
+    """
+
+    def __init__(
+            self,
+            attack: AttackInfo,
+            defence: DefenceInfo,
+            power_range: tp.Optional[RangeType] = None,
+            defence_range: tp.Optional[RangeType] = None,
+            cond_prob_dict: tp.Optional[ConditionProbabilityDictType] = None) -> None:
+        if power_range is None:
+            power_range = (attack.power, attack.power)
+        if defence_range is None:
+            if attack.is_magic():
+                df_pow = defence.magical_power
+            else:
+                df_pow = defence.physical_power
+            defence_range = (df_pow, df_pow)
+        if cond_prob_dict is None:
+            cond_prob_dict = {
+                cond: 1.0 if defence.is_condition(cond) else 0.0
+                for cond in Condition}
+        _check_range(power_range)
+        _check_range(defence_range)
+        for prob in cond_prob_dict.values():
+            if not 0.0 <= prob <= 1.0:
+                raise ValueError
+
+        # 基本ダメージ → 出る組み合わせの数
+        basic_counts = _calc_basic_counts(power_range, defence_range)
+        total = (
+            (power_range[1] - power_range[0] + 1)
+            * (defence_range[1] - defence_range[0] + 1))
+
+        mags = CompiledAttack(attack).condition_magnifications
+        ratio = defence.get_regist(attack.attribute)
+
+        probs: dict[int, Fraction] = {}
+        for conditions, cond_prob in _calc_condition_probabilities(cond_prob_dict):
+            mag = mags[conditions]
+            for basic, count in basic_counts.items():
+                # Damage.calc と同じ順番で計算する
+                val = float(basic)
+                val = val * mag
+                val = val * ratio
+                damage = int(val)
+                probs[damage] = (
+                    probs.get(damage, 0) + Fraction(count, total) * cond_prob)
+
+        self._probs = dict(sorted(probs.items()))
+
+    @property
+    def probabilities(self) -> dict[int, Fraction]:
+        """ダメージ値 → 確率 の辞書（ダメージ値の小さい順）."""
+
+        return self._probs
+
+    @property
+    def mean(self) -> Fraction:
+        """ダメージ値の期待値."""
+
+        return sum(
+            (damage * prob for damage, prob in self._probs.items()), Fraction(0))
+
+    def get_probability(self, damage: int) -> Fraction:
+        """指定したダメージ値になる確率を得ます.
+
+        :params damage: ダメージ値
+        :return: 確率
+        """
+
+        return self._probs.get(damage, Fraction(0))
+
+    def percentile(self, q: float) -> int:
+        """パーセンタイルを得ます.
+
+        :params q: パーセント（0 から 100）
+        :return: そのダメージ値以下になる確率が q% 以上となる、最小のダメージ値
+        :raises ValueError: q が範囲外
+        """
+
+        if not 0 <= q <= 100:
+            raise ValueError
+
+        rate = Fraction(q) / 100
+        cumulative = Fraction(0)
+        for damage, prob in self._probs.items():
+            cumulative += prob
+            if rate <= cumulative:
+                return damage
+        return damage
+
+
+def _check_range(range_: RangeType) -> None:
+    """範囲が正しいか調べます.
+
+    :params range_: 範囲
+    :raises ValueError: 負の値を含む、または最小値が最大値より大きい
+    """
+
+    low, high = range_
+    if low < 0 or high < low:
+        raise ValueError
+
+
+def _calc_basic_counts(
+        power_range: RangeType,
+        defence_range: RangeType) -> dict[int, int]:
+    """基本ダメージの分布を組み合わせの数で求めます.
+
+    威力と防御力の差の分布は、2つの一様分布の畳み込みになります.
+
+    :params power_range: 威力の範囲
+    :params defence_range: 防御力の範囲
+    :return: 基本ダメージ → 出る組み合わせの数 の辞書
+    """
+
+    p_low, p_high = power_range
+    d_low, d_high = defence_range
+    counts: dict[int, int] = {}
+    for diff in range(p_low - d_high, p_high - d_low + 1):
+        # 威力 - 防御力 = diff となる威力の数
+        count = min(p_high, diff + d_high) - max(p_low, diff + d_low) + 1
+        basic = max(0, diff)
+        counts[basic] = counts.get(basic, 0) + count
+    return counts
+
+
+def _calc_condition_probabilities(
+        cond_prob_dict: ConditionProbabilityDictType
+) -> list[tuple[int, Fraction]]:
+    """状態異常の組み合わせごとの確率を求めます.
+
+    :params cond_prob_dict: 状態異常にかかっている確率の辞書
+    :return: (状態異常のビット和, 確率) のリスト。確率が 0 の組み合わせは含まない
+    """
+
+    results = []
+    for conditions in range(CONDITION_MASK + 1):
+        prob = Fraction(1)
+        for cond in Condition:
+            p = Fraction(cond_prob_dict.get(cond, 0.0))
+            prob *= p if conditions & cond.value else 1 - p
+        if prob:
+            results.append((conditions, prob))
+    return results
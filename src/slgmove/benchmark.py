@@ -0,0 +1,317 @@
+"""slgmove の移動計算のベンチマーク.
+
+乱数の種を固定したマップで、計算方式ごとの処理時間と最大メモリ使用量を計測します.
+計測結果を基準値として保存しておけば、次回以降の計測で性能の劣化を検出できます.
+
+    python -m slgmove.benchmark --save baseline.json
+    python -m slgmove.benchmark --baseline baseline.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+import typing as tp
+from pathlib import Path
+
+from slgmove import vector
+from slgmove.main import Unit, Map, MoveMap, Ground, Engine
+from slgmove.position import GridPosition, GridPoint
+
+# 地面タイプ → Ground
+GROUND_DICT = {
+    0: Ground(1),
+    1: Ground(Ground.COST_FORBIDDEN),
+    2: Ground(2),
+    3: Ground(3),
+}
+
+# 地形の構成（地面タイプ → 出現の重み）
+TERRAINS = {
+    'plain': {0: 95, 1: 5},
+    'rough': {0: 50, 1: 10, 2: 25, 3: 15},
+    'maze': {0: 65, 1: 35},
+}
+
+# RECURSIVE は移動力に対して指数的に遅くなるため、この大きさまでのマップでのみ計測する
+_RECURSIVE_MAX_SIZE = 32
+
+
+class Case:
+    """計測条件.
+
+    :params size: マップの幅と高さ
+    :params terrain: 地形の構成の名前
+    :params density: ユニットのいるセルの割合
+    :params move: ユニットの移動力
+    """
+
+    def __init__(
+            self,
+            size: int,
+            terrain: str,
+            density: float,
+            move: int) -> None:
+        self._size = size
+        self._terrain = terrain
+        self._density = density
+        self._move = move
+
+    @property
+    def size(self) -> int:
+        """マップの幅と高さ."""
+
+        return self._size
+
+    @property
+    def terrain(self) -> str:
+        """地形の構成の名前."""
+
+        return self._terrain
+
+    @property
+    def density(self) -> float:
+        """ユニットのいるセルの割合."""
+
+        return self._density
+
+    @property
+    def move(self) -> int:
+        """ユニットの移動力."""
+
+        return self._move
+
+    def __str__(self) -> str:
+        return f'{self._size}x{self._size} {self._terrain} d={self._density} m={self._move}'
+
+
+# 標準の計測条件
+DEFAULT_CASES = (
+    Case(32, 'plain', 0.02, 6),
+    Case(32, 'rough', 0.02, 6),
+    Case(32, 'maze', 0.02, 6),
+    Case(128, 'plain', 0.02, 20),
+    Case(128, 'rough', 0.02, 20),
+    Case(128, 'maze', 0.02, 20),
+    Case(128, 'plain', 0.10, 20),
+    Case(256, 'plain', 0.02, 20),
+    Case(256, 'rough', 0.02, 20),
+    Case(256, 'maze', 0.02, 20),
+)
+
+# 短時間で終わる計測条件
+QUICK_CASES = (
+    Case(16, 'rough', 0.05, 4),
+    Case(64, 'rough', 0.05, 10),
+)
+
+
+def generate_map(
+        size: int,
+        terrain: str,
+        density: float,
+        seed: int = 0) -> Map:
+    """乱数でマップを作成し、ユニットを配置します.
+
+    同じ引数からは常に同じマップが作られます.
+
+    :params size: マップの幅と高さ
+    :params terrain: 地形の構成の名前
+    :params density: ユニットのいるセルの割合
+    :params seed: 乱数の種
+    :return: マップ
+    """
+
+    rand = random.Random(seed)
+    weights = TERRAINS[terrain]
+    types = rand.choices(
+        list(weights), list(weights.values()), k=size * size)
+    ground_types = [types[y * size:(y + 1) * size] for y in range(size)]
+    map_ = Map(ground_types, GROUND_DICT)
+
+    for index in rand.sample(range(size * size), int(size * size * density)):
+        y, x = divmod(index, size)
+        map_.add_unit(Unit(GridPosition(x, y)))
+    return map_
+
+
+def generate_units(
+        map_: Map,
+        move: int,
+        count: int,
+        seed: int = 0) -> list[Unit]:
+    """移動範囲を計算するユニットを作成します.
+
+    ユニットは空いているセルに置きますが、マップには追加しません.
+
+    :params map_: マップ
+    :params move: 移動力
+    :params count: ユニットの数
+    :params seed: 乱数の種
+    :return: ユニットのリスト
+    """
+
+    rand = random.Random(seed)
+    occupied = map_.get_unit_indices()
+    units = []
+    while len(units) < count:
+        x = rand.randrange(map_.width)
+        y = rand.randrange(map_.height)
+        if map_.cost_grid.index(x, y) in occupied:
+            continue
+        units.append(Unit(GridPosition(x, y), move))
+    return units
+
+
+def measure(func: tp.Callable[[], tp.Any], repeat: int) -> dict[str, float]:
+    """処理時間と最大メモリ使用量を計測します.
+
+    処理時間は repeat 回のうち最短のもの、メモリは tracemalloc で計測した1回分の最大値です.
+
+    :params func: 計測する処理
+    :params repeat: 処理時間の計測回数
+    :return: 'time'（秒）と 'peak'（バイト）の辞書
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'time': min(times), 'peak': peak}
+
+
+def get_engines(case: Case) -> list[Engine]:
+    """計測条件で計測する計算方式を得ます.
+
+    :params case: 計測条件
+    :return: 計算方式のリスト
+    """
+
+    engines = [Engine.QUEUE]
+    if case.size <= _RECURSIVE_MAX_SIZE:
+        engines.append(Engine.RECURSIVE)
+    if vector.is_available():
+        engines.append(Engine.NUMPY)
+    return engines
+
+
+def run(
+        cases: tp.Iterable[Case] = DEFAULT_CASES,
+        repeat: int = 5,
+        units: int = 10,
+        seed: int = 0) -> dict[str, dict[str, float]]:
+    """ベンチマークを実行します.
+
+    :params cases: 計測条件
+    :params repeat: 処理時間の計測回数
+    :params units: 移動範囲を計算するユニットの数
+    :params seed: 乱数の種
+    :return: 計測項目の名前 → 計測結果 の辞書
+    """
+
+    results = {}
+    for case in cases:
+        map_ = generate_map(case.size, case.terrain, case.density, seed)
+        targets = generate_units(map_, case.move, units, seed)
+
+        for engine in get_engines(case):
+            move_map = MoveMap(map_, engine)
+
+            def calc():
+                for unit in targets:
+                    move_map.calc(unit)
+
+            results[f'calc[{engine.name}] {case}'] = measure(calc, repeat)
+
+        positions = [
+            GridPosition(x, y)
+            for y in range(map_.height) for x in range(map_.width)]
+
+        def can_move():
+            for pos in positions:
+                map_.can_move(pos, case.move)
+
+        results[f'can_move {case}'] = measure(can_move, repeat)
+
+        def neighbors(type_):
+            def func():
+                for pos in positions:
+                    p = type_(pos.x, pos.y)
+                    p.up(), p.down(), p.left(), p.right()
+            return func
+
+        results[f'GridPosition {case}'] = measure(neighbors(GridPosition), repeat)
+        results[f'GridPoint {case}'] = measure(neighbors(GridPoint.of), repeat)
+
+    return results
+
+
+def compare(
+        results: dict[str, dict[str, float]],
+        baseline: dict[str, dict[str, float]],
+        tolerance: float = 0.2) -> list[str]:
+    """計測結果を基準値と比べ、劣化した項目を得ます.
+
+    基準値に無い項目は比べません.
+
+    :params results: 計測結果
+    :params baseline: 基準値
+    :params tolerance: 許容する増加の割合
+    :return: 劣化した項目の説明のリスト
+    """
+
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key in ('time', 'peak'):
+            limit = base[key] * (1.0 + tolerance)
+            if limit < result[key]:
+                regressions.append(
+                    f'{name}: {key} {result[key]:.6g} > {base[key]:.6g}')
+    return regressions
+
+
+def main(argv: tp.Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--save', type=Path, help='計測結果を基準値として保存するファイル')
+    parser.add_argument('--baseline', type=Path, help='比べる基準値のファイル')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='許容する増加の割合')
+    parser.add_argument('--repeat', type=int, default=5, help='処理時間の計測回数')
+    parser.add_argument('--seed', type=int, default=0, help='乱数の種')
+    parser.add_argument('--quick', action='store_true', help='短時間で終わる条件で計測する')
+    args = parser.parse_args(argv)
+
+    cases = QUICK_CASES if args.quick else DEFAULT_CASES
+    results = run(cases, args.repeat, seed=args.seed)
+    for name, result in results.items():
+        print(f'{name:50} {result["time"] * 1000:10.3f} ms {result["peak"] / 1024:10.1f} KiB')
+
+    if args.save is not None:
+        args.save.write_text(json.dumps(results, indent=2), encoding='utf-8')
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""チャンク分割されたマップ.
+
+マップを一定の大きさのチャンクに分けてファイルに保存し、必要になったチャンクだけを読み込みます.
+メモリに置くチャンクの数には上限があり、超えた場合は最も長く使われていないチャンクから捨てます.
+"""
+from __future__ import annotations
+
+import json
+import typing as tp
+from collections import OrderedDict
+from pathlib import Path
+
+from slgmove import mapfile
+from slgmove.grid import Grid, SparseGrid
+from slgmove.main import MapBase, Map, Ground
+
+# チャンクの情報を保存するファイル名
+INDEX_FILE = 'index.json'
+
+# チャンクの大きさの既定値
+DEFAULT_CHUNK_SIZE = 64
+
+# [型エイリアス] チャンクの読み込み関数（チャンクのX座標, Y座標 → チャンクのマップ）
+ChunkLoaderType = tp.Callable[[int, int], Map]
+
+
+def get_chunk_path(directory: Path, cx: int, cy: int) -> Path:
+    """チャンクのファイルのパスを得ます.
+
+    :params directory: 保存先のディレクトリ
+    :params cx: チャンクのX座標
+    :params cy: チャンクのY座標
+    :return: ファイルのパス
+    """
+
+    return Path(directory) / f'{cx}_{cy}.map'
+
+
+def save_chunks(
+        map_: Map,
+        directory: Path,
+        chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    """マップをチャンクに分けて保存します.
+
+    :params map_: マップ
+    :params directory: 保存先のディレクトリ
+    :params chunk_size: チャンクの幅と高さ
+    """
+
+    assert 0 < chunk_size
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    lines = map_.type_grid.to_list()
+    for top in range(0, map_.height, chunk_size):
+        for left in range(0, map_.width, chunk_size):
+            chunk_lines = [
+                line[left:left + chunk_size]
+                for line in lines[top:top + chunk_size]]
+            chunk = Map(chunk_lines, map_.ground_dict)
+            path = get_chunk_path(directory, left // chunk_size, top // chunk_size)
+            mapfile.save(chunk, path)
+
+    index = {
+        'width': map_.width,
+        'height': map_.height,
+        'chunk_size': chunk_size,
+        'grounds': [[t, g.cost] for t, g in map_.ground_dict.items()],
+    }
+    (directory / INDEX_FILE).write_text(json.dumps(index), encoding='utf-8')
+
+
+class ChunkedMap(MapBase):
+    """チャンク分割されたマップ.
+
+    Map と同じように get_type, get_cost, is_range, can_move などを使え、MoveMap で移動範囲を計算できます.
+    チャンクは最初に参照されたときに読み込まれます.
+    MoveMap の計算結果は、マップ全体分ではなく書き込まれたセルの分だけメモリを使います.
+
+    :params width: 幅
+    :params height: 高さ
+    :params ground_dict: 地面タイプ → Ground の辞書
+    :params loader: チャンクの読み込み関数
+    :params chunk_size: チャンクの幅と高さ
+    :params max_chunks: メモリに置くチャンクの数の上限
+    """
+
+    def __init__(
+            self,
+            width: int,
+            height: int,
+            ground_dict: dict[int, Ground],
+            loader: ChunkLoaderType,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            max_chunks: int = 64) -> None:
+        assert 0 < width
+        assert 0 < height
+        assert 0 < chunk_size
+        assert 0 < max_chunks
+
+        super().__init__(ground_dict)
+        self._width = width
+        self._height = height
+        self._loader = loader
+        self._chunk_size = chunk_size
+        self._max_chunks = max_chunks
+        self._chunks: OrderedDict[tuple[int, int], Map] = OrderedDict()
+        # 直前に参照したチャンク
+        self._last_key = None
+        self._last_chunk = None
+        self._type_grid = _ChunkedGrid(self, lambda c: c.type_grid)
+        self._cost_grid = _ChunkedGrid(self, lambda c: c.cost_grid)
+
+    @classmethod
+    def open(cls, directory: Path, max_chunks: int = 64) -> ChunkedMap:
+        """save_chunks で保存したマップを開きます.
+
+        チャンクは参照されたときに mapfile.load で読み込みます.
+
+        :params directory: 保存先のディレクトリ
+        :params max_chunks: メモリに置くチャンクの数の上限
+        :return: マップ
+        """
+
+        directory = Path(directory)
+        index = json.loads((directory / INDEX_FILE).read_text(encoding='utf-8'))
+        ground_dict = {t: Ground(cost) for t, cost in index['grounds']}
+
+        def loader(cx: int, cy: int) -> Map:
+            return mapfile.load(get_chunk_path(directory, cx, cy))
+
+        return cls(
+            index['width'], index['height'], ground_dict, loader,
+            index['chunk_size'], max_chunks)
+
+    @property
+    def width(self) -> int:
+        """幅."""
+
+        return self._width
+
+    @property
+    def height(self) -> int:
+        """高さ."""
+
+        return self._height
+
+    @property
+    def chunk_size(self) -> int:
+        """チャンクの幅と高さ."""
+
+        return self._chunk_size
+
+    @property
+    def max_chunks(self) -> int:
+        """メモリに置くチャンクの数の上限."""
+
+        return self._max_chunks
+
+    @property
+    def loaded_count(self) -> int:
+        """メモリに置いているチャンクの数."""
+
+        return len(self._chunks)
+
+    @property
+    def type_grid(self) -> _ChunkedGrid:
+        """地面タイプのグリッド.
+
+        参照したセルのチャンクを読み込みます. 書き換えはできません.
+        """
+
+        return self._type_grid
+
+    @property
+    def cost_grid(self) -> _ChunkedGrid:
+        """移動コストのグリッド.
+
+        参照したセルのチャンクを読み込みます. 書き換えはできません.
+        """
+
+        return self._cost_grid
+
+    def create_step_grid(self, value: int) -> SparseGrid:
+        """MoveMap の計算結果を書き込むグリッドを作成します.
+
+        :params value: 初期値
+        :return: 書き込まれたセルだけを持つグリッド
+        """
+
+        return SparseGrid(self._width, self._height, value)
+
+    def get_chunk(self, cx: int, cy: int) -> Map:
+        """チャンクを得ます.
+
+        読み込まれていない場合は読み込み、上限を超えたら最も長く使われていないチャンクを捨てます.
+
+        :params cx: チャンクのX座標
+        :params cy: チャンクのY座標
+        :return: チャンクのマップ
+        """
+
+        key = (cx, cy)
+        if key == self._last_key:
+            return self._last_chunk
+
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            chunk = self._loader(cx, cy)
+            self._chunks[key] = chunk
+            while self._max_chunks < len(self._chunks):
+                self._chunks.popitem(last=False)
+        else:
+            self._chunks.move_to_end(key)
+
+        self._last_key = key
+        self._last_chunk = chunk
+        return chunk
+
+
+class _ChunkedGrid:
+    """チャンク分割されたマップのグリッド.
+
+    Grid と同じ添字で参照でき、参照したセルのチャンクを読み込みます.
+
+    :params map_: チャンク分割されたマップ
+    :params get_grid: チャンクのマップから対象のグリッドを得る関数
+    """
+
+    def __init__(
+            self,
+            map_: ChunkedMap,
+            get_grid: tp.Callable[[Map], Grid]) -> None:
+        self._map = map_
+        self._get_grid = get_grid
+
+    @property
+    def width(self) -> int:
+        """幅."""
+
+        return self._map.width
+
+    @property
+    def height(self) -> int:
+        """高さ."""
+
+        return self._map.height
+
+    @property
+    def data(self) -> _ChunkedGrid:
+        """添字で参照できる一次元配列の代わり."""
+
+        return self
+
+    def index(self, x: int, y: int) -> int:
+        """座標に対応する添字を得ます.
+
+        :params x: X座標
+        :params y: Y座標
+        :return: 添字
+        """
+
+        return y * self._map.width + x
+
+    def get(self, x: int, y: int) -> int:
+        """指定座標の値を得ます.
+
+        :params x: X座標
+        :params y: Y座標
+        :return: 値
+        """
+
+        size = self._map.chunk_size
+        cx, lx = divmod(x, size)
+        cy, ly = divmod(y, size)
+        return self._get_grid(self._map.get_chunk(cx, cy)).get(lx, ly)
+
+    def to_list(self) -> list[list[int]]:
+        """二次元リストに変換します.
+
+        すべてのチャンクを参照するため、巨大なマップでは注意してください.
+
+        :return: 値の二次元リスト
+        """
+
+        return [
+            [self.get(x, y) for x in range(self.width)]
+            for y in range(self.height)]
+
+    def __getitem__(self, index: int) -> int:
+        y, x = divmod(index, self._map.width)
+        return self.get(x, y)
+
+    def __len__(self) -> int:
+        return self._map.width * self._map.height
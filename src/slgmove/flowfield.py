@@ -0,0 +1,156 @@
+"""フローフィールド.
+
+目的地から逆向きに最小コストを広げ、各セルの「目的地までのコスト」と「次に進む方向」を求めます.
+一度計算すれば、何体のユニットでもセルを参照するだけで目的地へ向かわせられます.
+"""
+from __future__ import annotations
+
+import heapq
+import typing as tp
+from enum import Enum
+
+from slgmove.grid import Grid
+from slgmove.main import MapBase, Ground, get_neighbors
+from slgmove.position import GridPosition
+
+
+class Direction(Enum):
+    """進む方向."""
+
+    NONE = 0  # 目的地、または到達できない
+    UP = 1  # 上
+    DOWN = 2  # 下
+    LEFT = 3  # 左
+    RIGHT = 4  # 右
+
+
+class FlowField:
+    """フローフィールド.
+
+    移動のコストは MoveMap と同じく、進入するセルの移動コストです.
+    地形だけで計算するため、ユニットの位置は考慮しません.
+
+    :params map_: マップ
+    """
+
+    # 到達できないセルのコスト
+    UNSET_VALUE = -1
+
+    def __init__(self, map_: MapBase) -> None:
+        self._map = map_
+        self._distances = Grid(map_.width, map_.height, 'i', self.UNSET_VALUE)
+        self._directions = Grid(map_.width, map_.height, 'b', Direction.NONE.value)
+
+    @property
+    def distance_grid(self) -> Grid:
+        """セルごとの目的地までのコストのグリッド."""
+
+        return self._distances
+
+    @property
+    def direction_grid(self) -> Grid:
+        """セルごとの進む方向（Direction の値）のグリッド."""
+
+        return self._directions
+
+    def calc(self, goals: tp.Iterable[GridPosition]) -> None:
+        """指定した目的地へのフローフィールドを計算します.
+
+        目的地が複数ある場合は、最も近い目的地へ向かいます.
+        範囲外・進入禁止の目的地は無視します.
+
+        :params goals: 目的地
+        """
+
+        width = self._map.width
+        height = self._map.height
+        costs = self._map.cost_grid.data
+        forbidden = Ground.COST_FORBIDDEN
+        distances = self._distances.data
+        directions = self._directions.data
+        self._distances.fill(self.UNSET_VALUE)
+        self._directions.fill(Direction.NONE.value)
+
+        open_list = []
+        for goal in goals:
+            if not self._map.is_range(goal):
+                continue
+            index = self._distances.index(goal.x, goal.y)
+            if costs[index] == forbidden:
+                continue
+            distances[index] = 0
+            open_list.append((0, index))
+        heapq.heapify(open_list)
+
+        while open_list:
+            distance, index = heapq.heappop(open_list)
+            if distances[index] < distance:
+                continue
+
+            # 隣からこのセルに進入するコスト
+            next_distance = distance + costs[index]
+            for prev_index in get_neighbors(index, width, height):
+                if costs[prev_index] == forbidden:
+                    continue
+                prev_distance = distances[prev_index]
+                if prev_distance != self.UNSET_VALUE and prev_distance <= next_distance:
+                    continue
+
+                distances[prev_index] = next_distance
+                directions[prev_index] = _get_direction(prev_index, index, width).value
+                heapq.heappush(open_list, (next_distance, prev_index))
+
+    def get_distance(self, pos: GridPosition) -> int:
+        """指定位置から目的地までのコストを得ます.
+
+        :params pos: 位置
+        :return: コスト。到達できない場合は UNSET_VALUE
+        """
+
+        return self._distances.get(pos.x, pos.y)
+
+    def get_direction(self, pos: GridPosition) -> Direction:
+        """指定位置で進む方向を得ます.
+
+        :params pos: 位置
+        :return: 方向。目的地・到達できない位置では Direction.NONE
+        """
+
+        return Direction(self._directions.get(pos.x, pos.y))
+
+    def get_next(self, pos: GridPosition) -> tp.Optional[GridPosition]:
+        """指定位置から次に進む位置を得ます.
+
+        :params pos: 位置
+        :return: 次の位置。目的地・到達できない位置では None
+        """
+
+        direction = self.get_direction(pos)
+        if direction == Direction.UP:
+            return pos.up()
+        if direction == Direction.DOWN:
+            return pos.down()
+        if direction == Direction.LEFT:
+            return pos.left()
+        if direction == Direction.RIGHT:
+            return pos.right()
+        return None
+
+
+def _get_direction(index: int, next_index: int, width: int) -> Direction:
+    """隣り合うセルへの方向を得ます.
+
+    :params index: 移動元のセルの添字
+    :params next_index: 移動先のセルの添字
+    :params width: マップの幅
+    :return: 方向
+    """
+
+    diff = next_index - index
+    if diff == -width:
+        return Direction.UP
+    if diff == width:
+        return Direction.DOWN
+    if diff == -1:
+        return Direction.LEFT
+    return Direction.RIGHT
@@ -0,0 +1,518 @@
+"""グリッドクラス."""
+from __future__ import annotations
+
+import itertools
+import typing as tp
+from array import array
+
+from slgmove import vector
+
+# 値の範囲が小さい順に試す型コード（型コード, 最小値, 最大値）
+_TYPECODE_RANGES = (
+    ('b', -(1 << 7), (1 << 7) - 1),
+    ('h', -(1 << 15), (1 << 15) - 1),
+    ('i', -(1 << 31), (1 << 31) - 1),
+    ('q', -(1 << 63), (1 << 63) - 1),
+)
+
+
+def fit_typecode(values: tp.Iterable[int]) -> str:
+    """値をすべて格納できる最小の型コードを得ます.
+
+    :params values: 格納する値
+    :return: array モジュールの型コード
+    """
+
+    values = tuple(values)
+    lo = min(values, default=0)
+    hi = max(values, default=0)
+    for typecode, min_, max_ in _TYPECODE_RANGES:
+        if min_ <= lo and hi <= max_:
+            return typecode
+    raise OverflowError
+
+
+# グリッドをバイト列に並べるときの境界
+GRID_ALIGN = 8
+
+
+def align_offset(offset: int) -> int:
+    """境界に合わせたオフセットを得ます.
+
+    :params offset: オフセット
+    :return: offset 以上で、最も近い境界のオフセット
+    """
+
+    return (offset + GRID_ALIGN - 1) // GRID_ALIGN * GRID_ALIGN
+
+
+def layout_grids(
+        offset: int,
+        width: int,
+        height: int,
+        typecodes: tp.Iterable[str]) -> list[tuple[int, int]]:
+    """同じ大きさのグリッドを、境界に合わせて順に並べたときの位置を得ます.
+
+    マップのファイルと共有メモリは、この並びでグリッドを置きます.
+
+    :params offset: 最初のグリッドを置ける位置
+    :params width: 幅
+    :params height: 高さ
+    :params typecodes: グリッドごとの型コード
+    :return: グリッドごとの (オフセット, バイト数) のリスト
+    """
+
+    layouts = []
+    for typecode in typecodes:
+        offset = align_offset(offset)
+        size = array(typecode).itemsize * width * height
+        layouts.append((offset, size))
+        offset += size
+    return layouts
+
+
+def _format_rows(
+        data: tp.Sequence[int],
+        width: int,
+        height: int,
+        digits: int) -> str:
+    """一次元に並べた値を、行ごとに空白区切りの文字列にします.
+
+    :params data: y * width + x の順に並べた値
+    :params width: 幅
+    :params height: 高さ
+    :params digits: 値の最小の桁数
+    :return: 文字列
+    """
+
+    if digits <= 0:
+        return ''.join(
+            ' '.join(map(str, data[y * width:(y + 1) * width])) + ' \n'
+            for y in range(height))
+
+    line_format = f'{{:{digits}}} ' * width + '\n'
+    return ''.join(
+        line_format.format(*data[y * width:(y + 1) * width])
+        for y in range(height))
+
+
+class Grid:
+    """二次元のグリッドを一次元配列で表現したクラス.
+
+    (x, y) の値は y * width + x の位置に格納されます.
+    Python の int を要素ごとに持つ二次元リストに比べ、メモリ使用量を大きく抑えられます.
+
+    :params width: 幅
+    :params height: 高さ
+    :params typecode: 要素の型（array モジュールの型コード）
+    :params value: 初期値
+    """
+
+    def __init__(
+            self,
+            width: int,
+            height: int,
+            typecode: str = 'b',
+            value: int = 0) -> None:
+        assert 0 < width
+        assert 0 < height
+
+        self._width = width
+        self._height = height
+        self._typecode = typecode
+        self._data = array(typecode, [value]) * (width * height)
+
+    @classmethod
+    def from_list(
+            cls,
+            lines: list[list[int]],
+            typecode: tp.Optional[str] = None) -> Grid:
+        """二次元リストからグリッドを作成します.
+
+        :params lines: 値の二次元リスト
+        :params typecode: 要素の型。None の場合は値から自動で決めます
+        :return: グリッド
+        """
+
+        assert 0 < len(lines)
+        assert 0 < len(lines[0])
+
+        values = [v for line in lines for v in line]
+        return cls.from_values(len(lines[0]), len(lines), values, typecode)
+
+    @classmethod
+    def from_values(
+            cls,
+            width: int,
+            height: int,
+            values: tp.Iterable[int],
+            typecode: tp.Optional[str] = None) -> Grid:
+        """一次元に並べた値からグリッドを作成します.
+
+        :params width: 幅
+        :params height: 高さ
+        :params values: y * width + x の順に並べた値
+        :params typecode: 要素の型。None の場合は値から自動で決めます
+        :return: グリッド
+        """
+
+        if typecode is None:
+            values = tuple(values)
+            typecode = fit_typecode(values)
+        return cls._wrap(width, height, typecode, array(typecode, values))
+
+    @classmethod
+    def from_buffer(
+            cls,
+            width: int,
+            height: int,
+            typecode: str,
+            buffer: tp.Any) -> Grid:
+        """既存のバッファをコピーせずに使うグリッドを作成します.
+
+        mmap や共有メモリの上にグリッドを置くためのものです.
+        読み取り専用のバッファの場合、値を書き換えると TypeError になります.
+
+        :params width: 幅
+        :params height: 高さ
+        :params typecode: 要素の型（array モジュールの型コード）
+        :params buffer: y * width + x の順に値が並んだバッファ
+        :return: グリッド
+        """
+
+        view = memoryview(buffer).cast('B').cast(typecode)
+        return cls._wrap(width, height, typecode, view)
+
+    @classmethod
+    def from_rle(
+            cls,
+            width: int,
+            height: int,
+            runs: tp.Iterable[tuple[int, int]],
+            typecode: tp.Optional[str] = None) -> Grid:
+        """to_rle で得たランレングス形式からグリッドを作成します.
+
+        :params width: 幅
+        :params height: 高さ
+        :params runs: (値, 個数) のリスト
+        :params typecode: 要素の型。None の場合は値から自動で決めます
+        :return: グリッド
+        """
+
+        runs = tuple(runs)
+        if typecode is None:
+            typecode = fit_typecode(value for value, _ in runs)
+        data = array(typecode)
+        for value, count in runs:
+            data.extend(array(typecode, [value]) * count)
+        return cls._wrap(width, height, typecode, data)
+
+    @classmethod
+    def _wrap(cls, width: int, height: int, typecode: str, data: tp.Any) -> Grid:
+        """一次元配列をそのまま使うグリッドを作成します.
+
+        :params width: 幅
+        :params height: 高さ
+        :params typecode: 要素の型
+        :params data: 一次元配列
+        :return: グリッド
+        """
+
+        assert 0 < width
+        assert 0 < height
+        assert len(data) == width * height
+
+        grid = cls.__new__(cls)
+        grid._width = width
+        grid._height = height
+        grid._typecode = typecode
+        grid._data = data
+        return grid
+
+    @property
+    def width(self) -> int:
+        """幅."""
+
+        return self._width
+
+    @property
+    def height(self) -> int:
+        """高さ."""
+
+        return self._height
+
+    @property
+    def typecode(self) -> str:
+        """要素の型コード."""
+
+        return self._typecode
+
+    @property
+    def data(self) -> tp.MutableSequence[int]:
+        """一次元配列.
+
+        計算ループなどで直接添字アクセスするためのものです.
+        from_buffer で作成した場合は memoryview になります.
+        """
+
+        return self._data
+
+    def index(self, x: int, y: int) -> int:
+        """座標に対応する一次元配列の添字を得ます.
+
+        :params x: X座標
+        :params y: Y座標
+        :return: 添字
+        """
+
+        return y * self._width + x
+
+    def get(self, x: int, y: int) -> int:
+        """指定座標の値を得ます.
+
+        :params x: X座標
+        :params y: Y座標
+        :return: 値
+        :raises IndexError: 範囲外
+        """
+
+        if not (0 <= x < self._width and 0 <= y < self._height):
+            raise IndexError
+        return self._data[y * self._width + x]
+
+    def set(self, x: int, y: int, value: int) -> None:
+        """指定座標に値を設定します.
+
+        :params x: X座標
+        :params y: Y座標
+        :params value: 値
+        :raises IndexError: 範囲外
+        """
+
+        if not (0 <= x < self._width and 0 <= y < self._height):
+            raise IndexError
+        self._data[y * self._width + x] = value
+
+    def fill(self, value: int) -> None:
+        """すべての要素を指定値で埋めます.
+
+        :params value: 値
+        """
+
+        self._data[:] = array(self._typecode, [value]) * len(self._data)
+
+    def to_list(self) -> list[list[int]]:
+        """二次元リストに変換します.
+
+        :return: 値の二次元リスト
+        """
+
+        w = self._width
+        return [self._data[y * w:(y + 1) * w].tolist() for y in range(self._height)]
+
+    def to_string(self, digits: int = 0) -> str:
+        """文字列に変換します.
+
+        値ごとに空白、行ごとに改行を付けます（Map.dump と同じ形式）.
+
+        :params digits: 値の最小の桁数。足りない分は左に空白を詰めます
+        :return: 文字列
+        """
+
+        return _format_rows(self._data, self._width, self._height, digits)
+
+    def to_bytes(self) -> bytes:
+        """一次元配列の内容をそのままバイト列にします.
+
+        要素の大きさは typecode、バイト順は実行環境のものです.
+
+        :return: バイト列
+        """
+
+        return memoryview(self._data).cast('B').tobytes()
+
+    def to_numpy(self) -> vector.np.ndarray:
+        """(height, width) の NumPy 配列にコピーします.
+
+        :return: 二次元配列
+        :raises ImportError: NumPy がインストールされていない
+        """
+
+        if not vector.is_available():
+            raise ImportError('to_numpy requires numpy')
+        return vector.as_array(self._data, self._width, self._height).copy()
+
+    def to_rle(self) -> list[tuple[int, int]]:
+        """y * width + x の順に、同じ値が続く区間をまとめたランレングス形式に変換します.
+
+        :return: (値, 個数) のリスト
+        """
+
+        return [
+            (value, len(tuple(group)))
+            for value, group in itertools.groupby(self._data)]
+
+
+class SparseGrid:
+    """値を辞書で持つグリッド.
+
+    初期値以外の値を持つセルだけを保持するため、巨大なマップで一部のセルだけを使う場合に向いています.
+    Grid と同じ操作ができ、添字も Grid と共通です.
+
+    :params width: 幅
+    :params height: 高さ
+    :params value: 初期値
+    """
+
+    def __init__(self, width: int, height: int, value: int = 0) -> None:
+        assert 0 < width
+        assert 0 < height
+
+        self._width = width
+        self._height = height
+        self._data = _DefaultDict(value)
+
+    @property
+    def width(self) -> int:
+        """幅."""
+
+        return self._width
+
+    @property
+    def height(self) -> int:
+        """高さ."""
+
+        return self._height
+
+    @property
+    def typecode(self) -> str:
+        """要素の型コード."""
+
+        return 'q'
+
+    @property
+    def data(self) -> dict[int, int]:
+        """添字 → 値 の辞書.
+
+        保持していない添字を参照すると初期値を返します.
+        """
+
+        return self._data
+
+    def index(self, x: int, y: int) -> int:
+        """座標に対応する添字を得ます.
+
+        :params x: X座標
+        :params y: Y座標
+        :return: 添字
+        """
+
+        return y * self._width + x
+
+    def get(self, x: int, y: int) -> int:
+        """指定座標の値を得ます.
+
+        :params x: X座標
+        :params y: Y座標
+        :return: 値
+        :raises IndexError: 範囲外
+        """
+
+        if not (0 <= x < self._width and 0 <= y < self._height):
+            raise IndexError
+        return self._data[y * self._width + x]
+
+    def set(self, x: int, y: int, value: int) -> None:
+        """指定座標に値を設定します.
+
+        :params x: X座標
+        :params y: Y座標
+        :params value: 値
+        :raises IndexError: 範囲外
+        """
+
+        if not (0 <= x < self._width and 0 <= y < self._height):
+            raise IndexError
+        self._data[y * self._width + x] = value
+
+    def fill(self, value: int) -> None:
+        """すべての要素を指定値で埋めます.
+
+        :params value: 値
+        """
+
+        self._data.clear()
+        self._data.value = value
+
+    def to_list(self) -> list[list[int]]:
+        """二次元リストに変換します.
+
+        :return: 値の二次元リスト
+        """
+
+        w = self._width
+        return [
+            [self._data[y * w + x] for x in range(w)]
+            for y in range(self._height)]
+
+    def to_grid(self) -> Grid:
+        """すべてのセルの値を持つ Grid に変換します.
+
+        :return: グリッド
+        """
+
+        data = self._data
+        values = [data.value] * (self._width * self._height)
+        for index, value in data.items():
+            values[index] = value
+        return Grid.from_values(self._width, self._height, values)
+
+    def to_string(self, digits: int = 0) -> str:
+        """文字列に変換します. Grid.to_string と同じ形式です.
+
+        :params digits: 値の最小の桁数
+        :return: 文字列
+        """
+
+        return self.to_grid().to_string(digits)
+
+    def to_bytes(self) -> bytes:
+        """値をバイト列にします. 要素の型は to_grid で決まります.
+
+        :return: バイト列
+        """
+
+        return self.to_grid().to_bytes()
+
+    def to_numpy(self) -> vector.np.ndarray:
+        """(height, width) の NumPy 配列にします.
+
+        :return: 二次元配列
+        :raises ImportError: NumPy がインストールされていない
+        """
+
+        return self.to_grid().to_numpy()
+
+    def to_rle(self) -> list[tuple[int, int]]:
+        """ランレングス形式に変換します. Grid.to_rle と同じ形式です.
+
+        :return: (値, 個数) のリスト
+        """
+
+        return self.to_grid().to_rle()
+
+
+class _DefaultDict(dict):
+    """保持していないキーに対して初期値を返す辞書.
+
+    collections.defaultdict と異なり、参照しただけではキーを追加しません.
+
+    :params value: 初期値
+    """
+
+    def __init__(self, value: int) -> None:
+        super().__init__()
+        self.value = value
+
+    def __missing__(self, key: int) -> int:
+        return self.value
@@ -0,0 +1,389 @@
+"""階層的経路探索（HPA*）.
+
+マップを一定の大きさのクラスタに分け、クラスタの境界の出入口と、同じクラスタ内の出入口の間のコストを事前に計算します.
+長い距離の経路は、出入口をつないだ抽象グラフの上で探してから、クラスタ内の経路に展開します.
+"""
+from __future__ import annotations
+
+import heapq
+import typing as tp
+
+from slgmove.main import Map, Ground, get_neighbors, _trace_path
+from slgmove.position import GridPosition
+
+# [型エイリアス] クラスタの位置（クラスタのX座標, Y座標）
+ClusterType = tuple[int, int]
+
+# [型エイリアス] 境界（左上のクラスタのX座標, Y座標, 縦の境界か）
+BorderType = tuple[int, int, bool]
+
+# 抽象グラフで開始位置を表す値
+_START = -1
+
+
+class HierarchicalMap:
+    """階層的経路探索の抽象グラフ.
+
+    移動のルールは Map.find_path と同じで、進入するセルのコストを足し合わせたものを経路のコストとします.
+    ただし地形だけで計算するため、ユニットの位置は考慮しません.
+    経路は出入口を経由するため、最小コストになるとは限りません.
+
+    地形を変更した場合は、update で変更した位置を渡してください.
+
+    :params map_: マップ
+    :params cluster_size: クラスタの幅と高さ
+    """
+
+    def __init__(self, map_: Map, cluster_size: int = 16) -> None:
+        assert 0 < cluster_size
+
+        self._map = map_
+        self._cluster_size = cluster_size
+        # 境界 → 出入口の組（境界の左または上のセル, 反対側のセル）のリスト
+        self._borders: dict[BorderType, list[tuple[int, int]]] = {}
+        # 出入口 → 境界の反対側の出入口のリスト
+        self._links: dict[int, list[int]] = {}
+        # クラスタ → 出入口 → 同じクラスタ内の出入口 → コスト
+        self._edges: dict[ClusterType, dict[int, dict[int, int]]] = {}
+        self.rebuild()
+
+    @property
+    def cluster_size(self) -> int:
+        """クラスタの幅と高さ."""
+
+        return self._cluster_size
+
+    @property
+    def cluster_count(self) -> int:
+        """クラスタの数."""
+
+        return len(self._edges)
+
+    @property
+    def node_count(self) -> int:
+        """出入口の数."""
+
+        return sum(len(nodes) for nodes in self._edges.values())
+
+    def get_nodes(self, cx: int, cy: int) -> list[GridPosition]:
+        """クラスタの出入口を得ます.
+
+        :params cx: クラスタのX座標
+        :params cy: クラスタのY座標
+        :return: 出入口の位置のリスト（Y座標, X座標の順）
+        """
+
+        width = self._map.width
+        return [
+            GridPosition(index % width, index // width)
+            for index in sorted(self._edges[(cx, cy)])]
+
+    def rebuild(self) -> None:
+        """すべてのクラスタを作り直します."""
+
+        size = self._cluster_size
+        columns = (self._map.width + size - 1) // size
+        rows = (self._map.height + size - 1) // size
+        clusters = [(cx, cy) for cy in range(rows) for cx in range(columns)]
+
+        self._borders.clear()
+        self._links.clear()
+        self._edges.clear()
+        borders = []
+        for cx, cy in clusters:
+            if cx + 1 < columns:
+                borders.append((cx, cy, True))
+            if cy + 1 < rows:
+                borders.append((cx, cy, False))
+        self._rebuild(borders, clusters)
+
+    def update(self, positions: tp.Iterable[GridPosition]) -> None:
+        """地形を変更した位置を含むクラスタだけを作り直します.
+
+        境界のセルが変わった場合は、その境界の出入口と、境界をはさむ両方のクラスタを作り直します.
+
+        :params positions: 地形を変更した位置
+        """
+
+        size = self._cluster_size
+        borders = set()
+        clusters = set()
+        for pos in positions:
+            cx, lx = divmod(pos.x, size)
+            cy, ly = divmod(pos.y, size)
+            clusters.add((cx, cy))
+            if lx == 0:
+                borders.add((cx - 1, cy, True))
+            if lx == size - 1:
+                borders.add((cx, cy, True))
+            if ly == 0:
+                borders.add((cx, cy - 1, False))
+            if ly == size - 1:
+                borders.add((cx, cy, False))
+
+        # マップの端は境界ではない
+        borders = [b for b in borders if self._is_border(b)]
+        for cx, cy, vertical in borders:
+            clusters.add((cx, cy))
+            clusters.add((cx + 1, cy) if vertical else (cx, cy + 1))
+        self._rebuild(borders, clusters)
+
+    def find_path(
+            self,
+            start: GridPosition,
+            goal: GridPosition) -> tp.Optional[list[GridPosition]]:
+        """抽象グラフで経路を探し、クラスタ内の経路に展開します.
+
+        :params start: 開始位置
+        :params goal: 目的地
+        :return: 開始位置から目的地までの位置のリスト。到達できない場合、開始位置が進入禁止の場合は None
+        """
+
+        map_ = self._map
+        if not map_.is_range(start) or not map_.is_range(goal):
+            return None
+
+        width = map_.width
+        start_index = start.y * width + start.x
+        goal_index = goal.y * width + goal.x
+        if start_index == goal_index:
+            return [start]
+        costs = map_.cost_grid.data
+        if costs[start_index] == Ground.COST_FORBIDDEN:
+            # 出入口につながらないため探さない
+            return None
+        if costs[goal_index] == Ground.COST_FORBIDDEN:
+            return None
+
+        start_cluster = self._get_cluster(start_index)
+        goal_cluster = self._get_cluster(goal_index)
+        starts, start_links = self._search_local(start_index, start_cluster, False)
+        goals, goal_links = self._search_local(goal_index, goal_cluster, True)
+
+        # 同じクラスタ内で直接たどり着ける場合
+        best = starts.get(goal_index, -1)
+        best_node = _START
+
+        min_cost = map_._get_min_cost()
+        gy, gx = divmod(goal_index, width)
+
+        def estimate_cost(index: int) -> int:
+            y, x = divmod(index, width)
+            return (abs(x - gx) + abs(y - gy)) * min_cost
+
+        totals = {}
+        prevs = {}
+        open_list = []
+        for node in self._edges[start_cluster]:
+            total = starts.get(node)
+            if total is not None:
+                totals[node] = total
+                prevs[node] = _START
+                open_list.append((total + estimate_cost(node), total, node))
+        heapq.heapify(open_list)
+
+        while open_list:
+            estimate, total, node = heapq.heappop(open_list)
+            if 0 <= best <= estimate:
+                break
+            if totals[node] < total:
+                # より小さいコストで到達済み
+                continue
+
+            rest = goals.get(node)
+            if rest is not None and (best < 0 or total + rest < best):
+                best = total + rest
+                best_node = node
+
+            next_nodes = [
+                (next_node, costs[next_node])
+                for next_node in self._links.get(node, ())]
+            next_nodes.extend(self._edges[self._get_cluster(node)][node].items())
+            for next_node, cost in next_nodes:
+                next_total = total + cost
+                if next_node in totals and totals[next_node] <= next_total:
+                    continue
+                totals[next_node] = next_total
+                prevs[next_node] = node
+                heapq.heappush(
+                    open_list,
+                    (next_total + estimate_cost(next_node), next_total, next_node))
+
+        if best < 0:
+            return None
+
+        # 出入口の列を、クラスタ内の経路に展開する
+        if best_node == _START:
+            path = _trace_path(start_links, goal_index, width)
+            path.reverse()
+            return path
+
+        nodes = []
+        node = best_node
+        while node != _START:
+            nodes.append(node)
+            node = prevs[node]
+        nodes.reverse()
+
+        path = _trace_path(start_links, nodes[0], width)
+        path.reverse()
+        for node, next_node in zip(nodes, nodes[1:]):
+            cluster = self._get_cluster(node)
+            if cluster != self._get_cluster(next_node):
+                # 境界をまたぐ
+                path.append(GridPosition(next_node % width, next_node // width))
+                continue
+            _, links = self._search_local(node, cluster, False, next_node)
+            part = _trace_path(links, next_node, width)
+            part.reverse()
+            path.extend(part[1:])
+        path.extend(_trace_path(goal_links, nodes[-1], width)[1:])
+        return path
+
+    def _rebuild(
+            self,
+            borders: tp.Iterable[BorderType],
+            clusters: tp.Iterable[ClusterType]) -> None:
+        """指定した境界の出入口と、クラスタ内のコストを作り直します.
+
+        :params borders: 作り直す境界
+        :params clusters: 作り直すクラスタ
+        """
+
+        for border in borders:
+            for a, b in self._borders.pop(border, ()):
+                self._links[a].remove(b)
+                self._links[b].remove(a)
+            pairs = self._find_entrances(border)
+            for a, b in pairs:
+                self._links.setdefault(a, []).append(b)
+                self._links.setdefault(b, []).append(a)
+            self._borders[border] = pairs
+
+        for index in [i for i, links in self._links.items() if not links]:
+            del self._links[index]
+
+        nodes_dict: dict[ClusterType, list[int]] = {c: [] for c in clusters}
+        for index in self._links:
+            nodes = nodes_dict.get(self._get_cluster(index))
+            if nodes is not None:
+                nodes.append(index)
+
+        for cluster, nodes in nodes_dict.items():
+            edges = {}
+            for node in nodes:
+                totals, _ = self._search_local(node, cluster, False)
+                edges[node] = {
+                    other: totals[other] for other in nodes
+                    if other != node and other in totals}
+            self._edges[cluster] = edges
+
+    def _find_entrances(self, border: BorderType) -> list[tuple[int, int]]:
+        """境界の出入口を探します.
+
+        境界をはさんで両側とも進入できるセルが続く区間ごとに、中央の1組を出入口とします.
+
+        :params border: 境界
+        :return: 出入口の組（境界の左または上のセル, 反対側のセル）のリスト
+        """
+
+        cx, cy, vertical = border
+        size = self._cluster_size
+        width = self._map.width
+        height = self._map.height
+        costs = self._map.cost_grid.data
+        forbidden = Ground.COST_FORBIDDEN
+
+        if vertical:
+            x = cx * size + size - 1
+            cells = range(cy * size, min(cy * size + size, height))
+            pairs = [(y * width + x, y * width + x + 1) for y in cells]
+        else:
+            y = cy * size + size - 1
+            cells = range(cx * size, min(cx * size + size, width))
+            pairs = [(y * width + x, (y + 1) * width + x) for x in cells]
+
+        entrances = []
+        run = []
+        for a, b in pairs + [(-1, -1)]:
+            if 0 <= a and costs[a] != forbidden and costs[b] != forbidden:
+                run.append((a, b))
+                continue
+            if run:
+                entrances.append(run[len(run) // 2])
+                run = []
+        return entrances
+
+    def _search_local(
+            self,
+            index: int,
+            cluster: ClusterType,
+            reverse: bool,
+            target: int = -1) -> tuple[dict[int, int], dict[int, int]]:
+        """クラスタ内だけで、指定セルからの最小コストを探します.
+
+        :params index: 起点のセルの添字
+        :params cluster: クラスタ
+        :params reverse: 起点に向かうコストを探すか
+        :params target: 見つかったら探索を終えるセルの添字
+        :return: セルの添字 → コスト の辞書と、セルの添字 → 起点側の隣の添字 の辞書
+        """
+
+        width = self._map.width
+        height = self._map.height
+        costs = self._map.cost_grid.data
+        forbidden = Ground.COST_FORBIDDEN
+        size = self._cluster_size
+        left = cluster[0] * size
+        top = cluster[1] * size
+        right = left + size
+        bottom = top + size
+
+        totals = {index: 0}
+        links = {index: -1}
+        open_list = [(0, index)]
+        while open_list:
+            total, current = heapq.heappop(open_list)
+            if current == target:
+                break
+            if totals[current] < total:
+                # より小さいコストで到達済み
+                continue
+
+            for next_index in get_neighbors(current, width, height):
+                y, x = divmod(next_index, width)
+                if not (left <= x < right and top <= y < bottom):
+                    continue
+                cost = costs[next_index]
+                if cost == forbidden:
+                    continue
+                # 逆向きの場合は、隣から現在のセルに進入するコスト
+                next_total = total + (costs[current] if reverse else cost)
+                if next_index in totals and totals[next_index] <= next_total:
+                    continue
+                totals[next_index] = next_total
+                links[next_index] = current
+                heapq.heappush(open_list, (next_total, next_index))
+
+        return totals, links
+
+    def _get_cluster(self, index: int) -> ClusterType:
+        """セルを含むクラスタを得ます.
+
+        :params index: セルの添字
+        :return: クラスタ
+        """
+
+        y, x = divmod(index, self._map.width)
+        return x // self._cluster_size, y // self._cluster_size
+
+    def _is_border(self, border: BorderType) -> bool:
+        """マップ内の境界か？"""
+
+        cx, cy, vertical = border
+        size = self._cluster_size
+        if cx < 0 or cy < 0:
+            return False
+        if vertical:
+            return (cx + 1) * size < self._map.width
+        return (cy + 1) * size < self._map.height
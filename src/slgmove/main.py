@@ -2,9 +2,22 @@
 
 from __future__ import annotations
 
+import heapq
+import time
 import typing as tp
+import weakref
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from enum import Enum, auto
 
-from slgmove.position import GridPosition
+from slgmove import vector
+from slgmove.grid import Grid, SparseGrid, fit_typecode
+from slgmove.position import GridPosition, GridPoint, Topology, calc_grid_distance
+from slgmove.stats import MoveStats, StatsHookType
+
+# 統計を有効にするとインスタンスで差し替えるマップのメソッド
+_STATS_METHODS = ('can_move', 'find_unit_from_pos')
 
 
 class Unit:
@@ -25,6 +38,8 @@ class Unit:
         self._pos = position
         self._move = move
         self._name = name
+        # 配置されているマップ（マップを使い捨てても残らないよう弱参照で持つ）
+        self._maps: weakref.WeakSet[MapBase] = weakref.WeakSet()
 
     @property
     def position(self) -> GridPosition:
@@ -45,43 +60,83 @@ class Unit:
         return self._name
 
     def set_position(self, pos) -> None:
-        """位置を設定します."""
-        
+        """位置を設定します.
+
+        配置されているマップにも移動を通知します.
+        position を直接書き換えた場合は通知されない点に注意してください.
+        """
+
+        old_pos = self._pos
         self._pos = pos
+        for map_ in self._maps:
+            map_._on_unit_moved(self, old_pos)
 
     def __str__(self) -> str:
         return f'{self.name}: Pos={self.position}, Move={self.move}'
 
 
-class Map:
-    """マップ.
+class MapBase:
+    """マップの基底クラス.
+
+    地面の情報の持ち方は派生クラスで決め、ユニットの配置と移動のルールはこのクラスで扱います.
 
-    :params ground_types: 地面タイプの二次元リスト
     :params ground_dict: 地面タイプ → Ground の辞書
     """
 
-    def __init__(
-            self,
-            ground_types: list[list[int]],
-            ground_dict: dict[int, Ground]) -> None:
-        assert 0 < len(ground_types)
-        assert 0 < len(ground_types[0])
-
-        self._ground_types = ground_types
+    def __init__(self, ground_dict: dict[int, Ground]) -> None:
         self._ground_dict = ground_dict
         self._unit_set = set()
+        # 位置 → その位置にいるユニットのリスト の索引
+        self._unit_index: dict[tuple[int, int], list[Unit]] = {}
+        self._version = 0
 
     @property
     def width(self) -> int:
         """幅."""
 
-        return len(self._ground_types[0])
+        return self.type_grid.width
 
     @property
     def height(self) -> int:
         """高さ."""
 
-        return len(self._ground_types)
+        return self.type_grid.height
+
+    @property
+    def ground_dict(self) -> dict[int, Ground]:
+        """地面タイプ → Ground の辞書."""
+
+        return self._ground_dict
+
+    @property
+    def version(self) -> int:
+        """版数.
+
+        地面タイプやユニットの配置が変わるたびに増えます.
+        """
+
+        return self._version
+
+    @property
+    def type_grid(self) -> Grid:
+        """地面タイプのグリッド."""
+
+        raise NotImplementedError
+
+    @property
+    def cost_grid(self) -> Grid:
+        """移動コストのグリッド."""
+
+        raise NotImplementedError
+
+    def create_step_grid(self, value: int) -> Grid:
+        """MoveMap の計算結果を書き込むグリッドを作成します.
+
+        :params value: 初期値
+        :return: マップと同じ大きさのグリッド
+        """
+
+        raise NotImplementedError
 
     def get_ground(self, pos: GridPosition) -> Ground:
         """指定位置の地面を得ます.
@@ -100,7 +155,7 @@ class Map:
         :return: 地面タイプ
         """
 
-        return self._ground_types[pos.y][pos.x]
+        return self.type_grid.get(pos.x, pos.y)
 
     def get_cost(self, pos: GridPosition) -> int:
         """指定位置の移動コストを得ます.
@@ -109,8 +164,7 @@ class Map:
         :return: 移動コスト
         """
 
-        g = self.get_ground(pos)
-        return g.cost
+        return self.cost_grid.get(pos.x, pos.y)
 
     def add_unit(self, unit: Unit) -> None:
         """ユニットを追加します.
@@ -120,19 +174,93 @@ class Map:
         :params unit: ユニット
         """
 
+        if unit in self._unit_set:
+            return
+
         self._unit_set.add(unit)
+        self._add_index(unit, unit.position)
+        unit._maps.add(self)
+        self._version += 1
+
+    def remove_unit(self, unit: Unit) -> None:
+        """ユニットを取り除きます.
+
+        存在しないユニットを指定した場合は無視します.
+
+        :params unit: ユニット
+        """
+
+        if unit not in self._unit_set:
+            return
+
+        self._unit_set.remove(unit)
+        self._remove_index(unit, unit.position)
+        unit._maps.discard(self)
+        self._version += 1
+
+    def _on_unit_moved(self, unit: Unit, old_pos: GridPosition) -> None:
+        """ユニットの移動を索引に反映します.
+
+        :params unit: 移動したユニット
+        :params old_pos: 移動前の位置
+        """
+
+        self._remove_index(unit, old_pos)
+        self._add_index(unit, unit.position)
+        self._version += 1
+
+    def _add_index(self, unit: Unit, pos: GridPosition) -> None:
+        """索引にユニットを登録します.
+
+        同じ位置に複数のユニットがいる場合は、登録した順に並べます.
+
+        :params unit: ユニット
+        :params pos: 位置
+        """
+
+        self._unit_index.setdefault(pos.get(), []).append(unit)
+
+    def _remove_index(self, unit: Unit, pos: GridPosition) -> None:
+        """索引からユニットを取り除きます.
+
+        :params unit: ユニット
+        :params pos: 索引に登録されている位置
+        """
+
+        key = pos.get()
+        units = self._unit_index.get(key)
+        if units is None or unit not in units:
+            return
+        units.remove(unit)
+        if not units:
+            del self._unit_index[key]
 
     def find_unit_from_pos(self, pos: GridPosition) -> tp.Optional[Unit]:
         """指定位置にいるユニットを得ます.
 
         :params pos: 位置
-        :return: ユニット。指定位置にいない場合は None
+        :return: ユニット。指定位置にいない場合は None。複数いる場合は先に登録したユニット
         """
 
-        for unit in self._unit_set:
-            if unit.position == pos:
-                return unit
-        return None
+        units = self._unit_index.get(pos.get())
+        if units is None:
+            return None
+        return units[0]
+
+    def get_unit_indices(self) -> set[int]:
+        """ユニットのいるセルの添字を得ます.
+
+        添字は type_grid, cost_grid と共通です.
+
+        :return: マップ範囲内でユニットのいるセルの添字の集合
+        """
+
+        width = self.width
+        height = self.height
+        return {
+            y * width + x
+            for x, y in self._unit_index
+            if x < width and y < height}
 
     def is_range(self, pos: GridPosition) -> bool:
         """指定位置がマップ範囲内か？
@@ -169,13 +297,233 @@ class Map:
 
         return True
 
+    def enable_stats(self, stats: MoveStats) -> None:
+        """can_move と find_unit_from_pos の呼び出し回数を数え始めます.
+
+        このインスタンスのメソッドだけを数える関数に差し替えるため、無効の間は負荷がかかりません.
+        既に有効な場合は、その関数の上に重ねるため、それぞれの統計に数えます.
+
+        :params stats: 数えた値を足す統計
+        """
+
+        # 既に差し替えた関数があれば、それを呼ぶ
+        base_can_move = self.can_move
+        base_find_unit_from_pos = self.find_unit_from_pos
+
+        def can_move(pos: GridPosition, move: int) -> bool:
+            stats.add(can_move_calls=1)
+            return base_can_move(pos, move)
+
+        def find_unit_from_pos(pos: GridPosition) -> tp.Optional[Unit]:
+            stats.add(unit_lookups=1)
+            return base_find_unit_from_pos(pos)
+
+        self.can_move = can_move
+        self.find_unit_from_pos = find_unit_from_pos
+
+    def disable_stats(self) -> None:
+        """呼び出し回数を数えるのをやめます.
+
+        重ねて有効にしていた場合も、すべて元に戻します.
+        """
+
+        for name in _STATS_METHODS:
+            self.__dict__.pop(name, None)
+
+    def find_path(
+            self,
+            start: GridPosition,
+            goal: GridPosition,
+            topology: Topology = Topology.SQUARE4) -> tp.Optional[list[GridPosition]]:
+        """A* で最小コストの経路を探します.
+
+        移動のルールは can_move と同じで、進入するセルのコストを足し合わせたものを経路のコストとします.
+        斜めや六角形の隣への移動も、進入するセルのコストだけがかかります.
+        ヒューリスティックには GridPosition.calc_distance と同じ距離
+        （SQUARE4 はマンハッタン距離、SQUARE8 はチェビシェフ距離、HEX は六角形グリッドの距離）に、最小の移動コストを掛けたものを使います.
+
+        :params start: 開始位置
+        :params goal: 目的地
+        :params topology: セルのつながり方
+        :return: 開始位置から目的地までの位置のリスト。到達できない場合は None
+        """
+
+        if not self.is_range(start) or not self.is_range(goal):
+            return None
+
+        width = self.width
+        height = self.height
+        costs = self.cost_grid.data
+        forbidden = Ground.COST_FORBIDDEN
+        occupied = self.get_unit_indices()
+        min_cost = self._get_min_cost()
+
+        start_index = start.y * width + start.x
+        goal_index = goal.y * width + goal.x
+        gx, gy = goal.get()
+
+        totals = {start_index: 0}
+        prevs = {start_index: -1}
+        square4 = topology == Topology.SQUARE4
+        open_list = [(start.calc_distance(goal, topology) * min_cost, 0, start_index)]
+        while open_list:
+            _, total, index = heapq.heappop(open_list)
+            if index == goal_index:
+                path = _trace_path(prevs, goal_index, width)
+                path.reverse()
+                return path
+            if totals[index] < total:
+                # より小さいコストで到達済み
+                continue
+
+            for next_index in get_neighbors(index, width, height, topology):
+                cost = costs[next_index]
+                if cost == forbidden or next_index in occupied:
+                    continue
+                next_total = total + cost
+                if totals.get(next_index, next_total + 1) <= next_total:
+                    continue
+
+                totals[next_index] = next_total
+                prevs[next_index] = index
+                y, x = divmod(next_index, width)
+                if square4:
+                    distance = abs(gx - x) + abs(gy - y)
+                else:
+                    distance = calc_grid_distance(x, y, gx, gy, topology)
+                heapq.heappush(
+                    open_list,
+                    (next_total + distance * min_cost, next_total, next_index))
+
+        return None
+
+    def _get_min_cost(self) -> int:
+        """進入禁止を除いた最小の移動コストを得ます."""
+
+        return min(
+            (g.cost for g in self._ground_dict.values() if not g.is_forbidden()),
+            default=0)
+
+
+class Map(MapBase):
+    """マップ.
+
+    地面タイプと移動コストを、マップ全体分のグリッドで持ちます.
+
+    :params ground_types: 地面タイプの二次元リスト
+    :params ground_dict: 地面タイプ → Ground の辞書
+    """
+
+    def __init__(
+            self,
+            ground_types: list[list[int]],
+            ground_dict: dict[int, Ground]) -> None:
+        assert 0 < len(ground_types)
+        assert 0 < len(ground_types[0])
+
+        # まだマップにない地面タイプにも set_type で変更できる型にする
+        values = [v for line in ground_types for v in line]
+        typecode = fit_typecode(values + list(ground_dict))
+        self._setup(Grid.from_list(ground_types, typecode), ground_dict)
+
+    @classmethod
+    def from_grid(
+            cls,
+            type_grid: Grid,
+            ground_dict: dict[int, Ground],
+            cost_grid: tp.Optional[Grid] = None) -> Map:
+        """地面タイプのグリッドからマップを作成します.
+
+        グリッドはコピーせずにそのまま使います.
+
+        :params type_grid: 地面タイプのグリッド
+        :params ground_dict: 地面タイプ → Ground の辞書
+        :params cost_grid: 移動コストのグリッド。None の場合は地面タイプから作成します
+        :return: マップ
+        """
+
+        map_ = cls.__new__(cls)
+        map_._setup(type_grid, ground_dict, cost_grid)
+        return map_
+
+    def _setup(
+            self,
+            type_grid: Grid,
+            ground_dict: dict[int, Ground],
+            cost_grid: tp.Optional[Grid] = None) -> None:
+        """初期化します.
+
+        :params type_grid: 地面タイプのグリッド
+        :params ground_dict: 地面タイプ → Ground の辞書
+        :params cost_grid: 移動コストのグリッド。None の場合は地面タイプから作成します
+        """
+
+        super().__init__(ground_dict)
+        self._types = type_grid
+        if cost_grid is None:
+            self._costs = self._create_costs()
+        else:
+            assert cost_grid.width == type_grid.width
+            assert cost_grid.height == type_grid.height
+            self._costs = cost_grid
+
+    def _create_costs(self) -> Grid:
+        """地面タイプから、セルごとの移動コストのグリッドを作成します.
+
+        :return: 移動コストのグリッド
+        """
+
+        type_costs = {t: g.cost for t, g in self._ground_dict.items()}
+        return Grid.from_values(
+            self._types.width, self._types.height,
+            map(type_costs.__getitem__, self._types.data),
+            fit_typecode(type_costs.values()))
+
+    @property
+    def type_grid(self) -> Grid:
+        """地面タイプのグリッド."""
+
+        return self._types
+
+    @property
+    def cost_grid(self) -> Grid:
+        """移動コストのグリッド."""
+
+        return self._costs
+
+    def create_step_grid(self, value: int) -> Grid:
+        """MoveMap の計算結果を書き込むグリッドを作成します.
+
+        :params value: 初期値
+        :return: マップと同じ大きさのグリッド
+        """
+
+        return Grid(self.width, self.height, 'i', value)
+
+    def set_type(self, pos: GridPosition, type_: int) -> None:
+        """指定位置の地面タイプを変更します.
+
+        :params pos: 位置
+        :params type_: 地面タイプ
+        """
+
+        cost = self._ground_dict[type_].cost
+        self._types.set(pos.x, pos.y, type_)
+        self._costs.set(pos.x, pos.y, cost)
+        self._version += 1
+
+    def to_string(self) -> str:
+        """地面タイプを文字列にします.
+
+        :return: dump で出力するのと同じ文字列
+        """
+
+        return self._types.to_string()
+
     def dump(self) -> None:
         """マップの情報を出力します."""
 
-        for line in self._ground_types:
-            for x in line:
-                print(x, end=' ')
-            print('')
+        print(self.to_string(), end='')
 
 
 class Ground:
@@ -204,30 +552,107 @@ class Ground:
         return self._cost == self.COST_FORBIDDEN
 
 
+class Engine(Enum):
+    """移動範囲の計算方式."""
+
+    RECURSIVE = auto()  # 再帰による全経路探索
+    QUEUE = auto()  # 残り移動力ごとのバケットキューによる探索
+    NUMPY = auto()  # NumPy による配列全体の緩和（NumPy が必要）
+
+
 class MoveMap:
     """移動範囲マップ.
 
     計算結果は、ユニットのいる位置を起点に、移動力を減らしながら書き込まれます.
     移動できない位置は UNSET_VALUE のままになります.
 
+    隣のセルは topology で選べます. 斜めや六角形の隣への移動も、進入するセルのコストだけがかかります.
+    RECURSIVE は SQUARE4 のみ、NUMPY は SQUARE4 と SQUARE8 のみに対応します.
+
     :params map_: マップ
+    :params engine: 計算方式
+    :params topology: セルのつながり方
     """
 
     # 書き込みされていない値
     UNSET_VALUE = -1
 
-    def __init__(self, map_: Map) -> None:
+    def __init__(
+            self,
+            map_: MapBase,
+            engine: Engine = Engine.QUEUE,
+            topology: Topology = Topology.SQUARE4) -> None:
+        if engine == Engine.NUMPY and not vector.is_available():
+            raise ImportError('Engine.NUMPY requires numpy')
+        if engine == Engine.RECURSIVE and topology != Topology.SQUARE4:
+            raise NotImplementedError
+        if engine == Engine.NUMPY and topology == Topology.HEX:
+            raise NotImplementedError
+
         self._map = map_
-        self._moves = []
-        self._reset()
+        self._engine = engine
+        self._topology = topology
+        # 統計（無効の場合は None）
+        self._stats: tp.Optional[MoveStats] = None
+        self._stats_hook: tp.Optional[StatsHookType] = None
+        self._moves = map_.create_step_grid(self.UNSET_VALUE)
+        # 最後に計算した開始位置の添字と移動力
+        self._start_index = -1
+        self._move = 0
+
+    @property
+    def engine(self) -> Engine:
+        """計算方式."""
+
+        return self._engine
+
+    @property
+    def topology(self) -> Topology:
+        """セルのつながり方."""
+
+        return self._topology
+
+    @property
+    def stats(self) -> tp.Optional[MoveStats]:
+        """calc の統計の合計. 統計が無効の場合は None."""
+
+        return self._stats
+
+    @property
+    def grid(self) -> tp.Union[Grid, SparseGrid]:
+        """セルごとの残り移動力のグリッド.
+
+        to_bytes, to_numpy, to_rle で計算結果をまとめて書き出せます.
+        """
+
+        return self._moves
 
     def _reset(self) -> None:
         """計算結果をリセットします."""
 
-        self._moves.clear()
-        for y in range(self._map.height):
-            line = [self.UNSET_VALUE] * self._map.width
-            self._moves.append(line)
+        self._moves.fill(self.UNSET_VALUE)
+
+    def enable_stats(self, hook: tp.Optional[StatsHookType] = None) -> MoveStats:
+        """calc の統計を取り始めます.
+
+        統計を取る間は、数えるための処理を含む計算に切り替えます.
+        QUEUE ではマップのメソッドを呼ばずに判定するため、その判定の回数を can_move_calls, unit_lookups に数えます.
+        NUMPY では回数は数えず、時間だけを計ります.
+
+        :params hook: calc のたびに、その計算の統計を受け取る関数
+        :return: 統計の合計
+        """
+
+        if self._stats is None:
+            self._stats = MoveStats()
+        self._stats_hook = hook
+        return self._stats
+
+    def disable_stats(self) -> None:
+        """統計を取るのをやめます."""
+
+        self._stats = None
+        self._stats_hook = None
 
     def calc(self, unit) -> None:
         """指定ユニットの移動範囲を計算します.
@@ -235,8 +660,261 @@ class MoveMap:
         :params unit: ユニット
         """
 
+        if self._stats is not None:
+            self._calc_with_stats(unit)
+        else:
+            self._calc(unit)
+
+    def _calc(self, unit) -> None:
+        """計算方式に応じて移動範囲を計算します.
+
+        :params unit: ユニット
+        """
+
         self._reset()
-        self._calc_step(unit.position, unit.move)
+        self._start_index = self._moves.index(unit.position.x, unit.position.y)
+        self._move = unit.move
+        if self._engine == Engine.RECURSIVE:
+            # 隣の位置を使い回すため、不変の位置で計算する
+            start = GridPoint.of(*unit.position.get())
+            self._calc_step(start, unit.move)
+        elif self._engine == Engine.QUEUE:
+            self._calc_queue(unit.position, unit.move)
+        elif self._engine == Engine.NUMPY:
+            self._calc_numpy(unit.position, unit.move)
+        else:
+            raise NotImplementedError
+
+    def _calc_with_stats(self, unit) -> None:
+        """統計を取りながら移動範囲を計算します.
+
+        :params unit: ユニット
+        """
+
+        stats = MoveStats()
+        # マップで直接有効にしている統計は、計算後に戻す
+        saved = {
+            name: self._map.__dict__[name]
+            for name in _STATS_METHODS if name in self._map.__dict__}
+        self._map.enable_stats(stats)
+        if self._engine == Engine.RECURSIVE:
+            self._write = self._create_counting_write(stats)
+        begin = time.perf_counter()
+        try:
+            if self._engine == Engine.QUEUE:
+                self._reset()
+                self._start_index = self._moves.index(
+                    unit.position.x, unit.position.y)
+                self._move = unit.move
+                steps = _flood_queue_stats(
+                    self._map.cost_grid.data,
+                    self._map.width,
+                    self._map.height,
+                    self._map.get_unit_indices(),
+                    self._start_index,
+                    unit.move,
+                    self._topology,
+                    stats)
+                moves = self._moves.data
+                for index, step in steps.items():
+                    moves[index] = step
+            else:
+                self._calc(unit)
+        finally:
+            elapsed = time.perf_counter() - begin
+            self._map.disable_stats()
+            self._map.__dict__.update(saved)
+            self.__dict__.pop('_write', None)
+
+        stats.add(calc_count=1, elapsed=elapsed)
+        self._stats.merge(stats)
+        if self._stats_hook is not None:
+            self._stats_hook(stats)
+
+    def _create_counting_write(
+            self,
+            stats: MoveStats) -> tp.Callable[[GridPosition, int], None]:
+        """_write の回数を数える関数を作成します.
+
+        :params stats: 数えた値を足す統計
+        :return: _write の代わりの関数
+        """
+
+        moves = self._moves
+        unset = self.UNSET_VALUE
+        write = type(self)._write
+
+        def counting_write(pos: GridPosition, move: int) -> None:
+            step = moves.get(pos.x, pos.y)
+            stats.add(
+                visits=1,
+                revisits=1 if step != unset and step < move else 0)
+            write(self, pos, move)
+
+        return counting_write
+
+    def _calc_queue(self, start: GridPosition, move: int) -> None:
+        """残り移動力の大きい位置から順に移動範囲を計算します.
+
+        結果は _calc_step と一致します.
+
+        :params start: 開始位置
+        :params move: 移動力
+        """
+
+        steps = flood_queue(
+            self._map.cost_grid.data,
+            self._map.width,
+            self._map.height,
+            self._map.get_unit_indices(),
+            self._moves.index(start.x, start.y),
+            move,
+            self._topology)
+
+        moves = self._moves.data
+        for index, step in steps.items():
+            moves[index] = step
+
+    def _calc_numpy(self, start: GridPosition, move: int) -> None:
+        """NumPy による配列全体の緩和で移動範囲を計算します.
+
+        結果は _calc_step と一致します.
+
+        :params start: 開始位置
+        :params move: 移動力
+        """
+
+        if not isinstance(self._map, Map):
+            # マップ全体分の配列を持つマップでのみ計算できる
+            raise NotImplementedError
+
+        width = self._map.width
+        height = self._map.height
+        costs = vector.as_array(self._map.cost_grid.data, width, height)
+        blocked = costs == Ground.COST_FORBIDDEN
+        blocked.ravel()[list(self._map.get_unit_indices())] = True
+
+        moves = vector.calc_moves(
+            costs, blocked, start.get(), move, self.UNSET_VALUE,
+            self._topology == Topology.SQUARE8)
+        vector.as_array(self._moves.data, width, height)[:] = moves
+
+    def update(self, positions: tp.Iterable[GridPosition]) -> None:
+        """地形やユニット配置の変化に合わせて、計算結果のうち影響のある部分だけを直します.
+
+        calc の後に地面タイプやユニットの有無が変わった位置を指定します.
+        変化した位置を経由して書き込まれていたセルだけを消し、その周りから計算し直します.
+        計算したユニット自身が移動した場合は、calc で計算し直してください.
+
+        :params positions: 変化した位置
+        """
+
+        if self._start_index < 0:
+            return
+
+        width = self._map.width
+        height = self._map.height
+        costs = self._map.cost_grid.data
+        moves = self._moves.data
+        unset = self.UNSET_VALUE
+        changed = {
+            self._moves.index(pos.x, pos.y)
+            for pos in positions if self._map.is_range(pos)}
+        changed.discard(self._start_index)
+
+        # 変化したセルから、残り移動力がちょうど引き継がれているセルをたどる
+        affected = set()
+        stack = [index for index in changed if moves[index] != unset]
+        while stack:
+            index = stack.pop()
+            if index in affected:
+                continue
+            affected.add(index)
+
+            rest = moves[index]
+            if rest <= 0:
+                continue
+            for next_index in get_neighbors(index, width, height, self._topology):
+                if next_index in affected or next_index == self._start_index:
+                    continue
+                next_rest = moves[next_index]
+                if next_rest != unset and next_rest == rest - costs[next_index]:
+                    stack.append(next_index)
+
+        for index in affected:
+            moves[index] = unset
+
+        # 消したセルと変化したセルの周りから広げ直す
+        buckets = [[] for _ in range(self._move + 1)]
+        for index in affected | changed:
+            for next_index in get_neighbors(index, width, height, self._topology):
+                rest = moves[next_index]
+                if 0 < rest:
+                    buckets[rest].append(next_index)
+
+        _relax_array(
+            costs, width, height, self._map.get_unit_indices(), moves, buckets,
+            self._topology)
+
+    def calc_many(
+            self,
+            units: tp.Sequence[Unit],
+            processes: tp.Optional[int] = None,
+            executor: tp.Optional[Executor] = None,
+            chunk_size: int = 64) -> list[MoveRange]:
+        """複数ユニットの移動範囲をまとめて計算します.
+
+        移動コストとユニット位置は全ユニットで共有し、結果はユニットごとの MoveRange で返します.
+        自身の計算結果（get_step など）は変更しません.
+        計算方式によらず QUEUE で計算します.
+
+        processes を指定すると、呼び出しのたびにワーカープロセスを起動して終了します.
+        繰り返し呼ぶ場合は、使い回す executor（MovePool.executor など）を渡してください.
+
+        :params units: ユニットのリスト
+        :params processes: 並列計算するプロセス数。None の場合は現在のプロセスで計算します
+        :params executor: 並列計算に使う Executor。指定した場合は processes より優先します
+        :params chunk_size: executor を指定した場合に、1回でワーカーに渡すユニットの数
+        :return: units と同じ順番の計算結果
+        """
+
+        assert 0 < chunk_size
+
+        width = self._map.width
+        height = self._map.height
+        costs = self._map.cost_grid.data
+        occupied = self._map.get_unit_indices()
+        jobs = [
+            (self._moves.index(u.position.x, u.position.y), u.move)
+            for u in units]
+
+        if executor is not None:
+            # ワーカーに渡せるよう、mmap や共有メモリの上のグリッドもコピーする
+            costs = _copy_costs(self._map.cost_grid)
+            tasks = [
+                (costs, width, height, occupied, self._topology,
+                 jobs[start:start + chunk_size])
+                for start in range(0, len(jobs), chunk_size)]
+            steps_list = [
+                steps
+                for chunk in executor.map(_flood_chunk_worker, tasks)
+                for steps in chunk]
+        elif processes is None:
+            steps_list = [
+                flood_queue(
+                    costs, width, height, occupied, index, move, self._topology)
+                for index, move in jobs]
+        else:
+            costs = _copy_costs(self._map.cost_grid)
+            with ProcessPoolExecutor(
+                    processes,
+                    initializer=_init_worker,
+                    initargs=(costs, width, height, occupied, self._topology)) as executor:
+                chunksize = max(1, len(jobs) // (processes * 4))
+                steps_list = list(
+                    executor.map(_flood_worker, jobs, chunksize=chunksize))
+
+        return [MoveRange(width, height, steps) for steps in steps_list]
 
     def _calc_step(self, pos: GridPosition, move: int) -> None:
         """一歩分の移動範囲を計算します.
@@ -277,9 +955,9 @@ class MoveMap:
         :params move: 移動力
         """
 
-        if move <= self._moves[pos.y][pos.x]:
+        if move <= self._moves.get(pos.x, pos.y):
             return
-        self._moves[pos.y][pos.x] = move
+        self._moves.set(pos.x, pos.y, move)
 
     def can_move(self, pos: GridPosition) -> bool:
         """指定位置に移動できるか？
@@ -303,12 +981,687 @@ class MoveMap:
         :return: 計算結果
         """
 
-        return self._moves[pos.y][pos.x]
+        return self._moves.get(pos.x, pos.y)
+
+    def get_reach_set(self) -> ReachSet:
+        """計算済みの移動範囲を、移動できる位置の集合にします.
+
+        :return: 移動できる位置の集合
+        """
+
+        unset = self.UNSET_VALUE
+        moves = self._moves.data
+        if isinstance(self._moves, SparseGrid):
+            indices = (i for i, step in moves.items() if step != unset)
+        else:
+            indices = (i for i, step in enumerate(moves) if step != unset)
+        return ReachSet.from_indices(self._map.width, self._map.height, indices)
+
+    def get_path(self, pos: GridPosition) -> tp.Optional[list[GridPosition]]:
+        """計算済みの移動範囲から、指定位置までの経路を得ます.
+
+        目的地から「隣の残り移動力 - 自分のコスト == 自分の残り移動力」となる隣をたどって開始位置まで戻ります.
+        条件を満たす最初の隣へ深さ優先で進むため、探索は経路の長さ程度で終わります.
+
+        :params pos: 目的地
+        :return: 開始位置から目的地までの位置のリスト。移動できない場合は None
+        """
+
+        if not self.can_move(pos):
+            return None
+
+        width = self._map.width
+        height = self._map.height
+        costs = self._map.cost_grid.data
+        moves = self._moves.data
+
+        # 開始位置側から目的地側へのつながり（コスト 0 の地面で巡回しないよう、たどったセルには戻らない）
+        goal_index = self._moves.index(pos.x, pos.y)
+        nexts = {goal_index: -1}
+        stack = [goal_index]
+        while stack:
+            index = stack[-1]
+            if index == self._start_index:
+                break
+
+            step = moves[index] + costs[index]
+            for prev_index in get_neighbors(index, width, height, self._topology):
+                if prev_index in nexts:
+                    continue
+                if moves[prev_index] != step or moves[prev_index] <= 0:
+                    continue
+                nexts[prev_index] = index
+                stack.append(prev_index)
+                break
+            else:
+                # 行き止まりのため1つ戻る
+                stack.pop()
+        else:
+            return None
+
+        return _trace_path(nexts, self._start_index, width)
+
+    def to_string(self) -> str:
+        """残り移動力を文字列にします.
+
+        :return: dump で出力するのと同じ文字列
+        """
+
+        return self._moves.to_string(2)
 
     def dump(self) -> None:
         """現在の情報を出力します."""
 
-        for line in self._moves:
-            for x in line:
-                print(f'{x:2}', end=' ')
-            print('')
+        print(self.to_string(), end='')
+
+
+class MoveRange:
+    """1ユニット分の移動範囲.
+
+    移動できる位置の残り移動力だけを持つ、コンパクトな計算結果です.
+
+    :params width: マップの幅
+    :params height: マップの高さ
+    :params steps: セルの添字 → 残り移動力 の辞書
+    """
+
+    def __init__(self, width: int, height: int, steps: dict[int, int]) -> None:
+        self._width = width
+        self._height = height
+        self._steps = steps
+
+    @property
+    def steps(self) -> dict[int, int]:
+        """セルの添字 → 残り移動力 の辞書."""
+
+        return self._steps
+
+    def can_move(self, pos: GridPosition) -> bool:
+        """指定位置に移動できるか？
+
+        :params pos: 位置
+        :return: 移動できればTrue
+        """
+
+        return self.get_step(pos) != MoveMap.UNSET_VALUE
+
+    def get_step(self, pos: GridPosition) -> int:
+        """指定位置の残り移動力を得ます.
+
+        :params pos: 位置
+        :return: 残り移動力。移動できない位置は MoveMap.UNSET_VALUE
+        """
+
+        if self._width <= pos.x or self._height <= pos.y:
+            return MoveMap.UNSET_VALUE
+        index = pos.y * self._width + pos.x
+        return self._steps.get(index, MoveMap.UNSET_VALUE)
+
+    def get_positions(self) -> list[GridPosition]:
+        """移動できる位置のリストを得ます.
+
+        :return: 位置のリスト（添字順）
+        """
+
+        positions = []
+        for index in sorted(self._steps):
+            y, x = divmod(index, self._width)
+            positions.append(GridPosition(x, y))
+        return positions
+
+    def get_reach_set(self) -> ReachSet:
+        """移動できる位置の集合を得ます.
+
+        :return: 移動できる位置の集合
+        """
+
+        return ReachSet.from_indices(self._width, self._height, self._steps)
+
+    def __len__(self) -> int:
+        return len(self._steps)
+
+
+class ReachSet:
+    """移動できる位置の集合.
+
+    セルごとに1ビットを持つビット集合で、多数のユニットの移動範囲を保持する場合に向いています.
+    ビットの位置は Grid の添字（y * width + x）と同じです.
+    同じ大きさのマップの集合どうしで、和（|）・積（&）・差（-）を求められます.
+
+    :params width: マップの幅
+    :params height: マップの高さ
+    :params bits: 移動できるセルのビットを立てた整数
+    """
+
+    def __init__(self, width: int, height: int, bits: int = 0) -> None:
+        assert 0 <= bits and bits.bit_length() <= width * height
+
+        self._width = width
+        self._height = height
+        self._bits = bits
+
+    @classmethod
+    def from_indices(
+            cls,
+            width: int,
+            height: int,
+            indices: tp.Iterable[int]) -> ReachSet:
+        """セルの添字から集合を作成します.
+
+        :params width: マップの幅
+        :params height: マップの高さ
+        :params indices: 移動できるセルの添字
+        :return: 移動できる位置の集合
+        """
+
+        buffer = bytearray((width * height + 7) // 8)
+        for index in indices:
+            buffer[index >> 3] |= 1 << (index & 7)
+        return cls(width, height, int.from_bytes(buffer, 'little'))
+
+    @classmethod
+    def union(cls, reach_sets: tp.Iterable[ReachSet]) -> ReachSet:
+        """すべての集合の和を求めます.
+
+        :params reach_sets: 集合のリスト。1つ以上必要です
+        :return: いずれかの集合に含まれる位置の集合
+        """
+
+        result = None
+        for reach_set in reach_sets:
+            result = reach_set if result is None else result | reach_set
+        assert result is not None
+        return result
+
+    @classmethod
+    def intersection(cls, reach_sets: tp.Iterable[ReachSet]) -> ReachSet:
+        """すべての集合の積を求めます.
+
+        :params reach_sets: 集合のリスト。1つ以上必要です
+        :return: すべての集合に含まれる位置の集合
+        """
+
+        result = None
+        for reach_set in reach_sets:
+            result = reach_set if result is None else result & reach_set
+        assert result is not None
+        return result
+
+    @property
+    def width(self) -> int:
+        """マップの幅."""
+
+        return self._width
+
+    @property
+    def height(self) -> int:
+        """マップの高さ."""
+
+        return self._height
+
+    @property
+    def bits(self) -> int:
+        """移動できるセルのビットを立てた整数."""
+
+        return self._bits
+
+    def can_move(self, pos: GridPosition) -> bool:
+        """指定位置に移動できるか？
+
+        :params pos: 位置
+        :return: 移動できればTrue
+        """
+
+        if self._width <= pos.x or self._height <= pos.y:
+            return False
+        return (self._bits >> (pos.y * self._width + pos.x)) & 1 == 1
+
+    def get_indices(self) -> list[int]:
+        """移動できるセルの添字を得ます.
+
+        :return: 添字のリスト（添字順）
+        """
+
+        indices = []
+        data = self._bits.to_bytes((self._width * self._height + 7) // 8, 'little')
+        for offset, byte in enumerate(data):
+            if byte == 0:
+                continue
+            base = offset << 3
+            for bit in range(8):
+                if byte >> bit & 1:
+                    indices.append(base + bit)
+        return indices
+
+    def get_positions(self) -> list[GridPosition]:
+        """移動できる位置のリストを得ます.
+
+        :return: 位置のリスト（添字順）
+        """
+
+        positions = []
+        for index in self.get_indices():
+            y, x = divmod(index, self._width)
+            positions.append(GridPosition(x, y))
+        return positions
+
+    def _check(self, other: ReachSet) -> None:
+        """同じ大きさのマップの集合か確認します."""
+
+        if self._width != other._width or self._height != other._height:
+            raise ValueError('map size mismatch')
+
+    def __or__(self, other: ReachSet) -> ReachSet:
+        self._check(other)
+        return ReachSet(self._width, self._height, self._bits | other._bits)
+
+    def __and__(self, other: ReachSet) -> ReachSet:
+        self._check(other)
+        return ReachSet(self._width, self._height, self._bits & other._bits)
+
+    def __sub__(self, other: ReachSet) -> ReachSet:
+        self._check(other)
+        return ReachSet(self._width, self._height, self._bits & ~other._bits)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ReachSet):
+            return NotImplemented
+        return (self._width, self._height, self._bits) == \
+            (other._width, other._height, other._bits)
+
+    def __hash__(self) -> int:
+        return hash((self._width, self._height, self._bits))
+
+    def __bool__(self) -> bool:
+        return self._bits != 0
+
+    def __len__(self) -> int:
+        return self._bits.bit_count()
+
+
+class MoveRangeCache:
+    """移動範囲のキャッシュ.
+
+    開始位置・移動力・マップの版数が同じであれば、前回の計算結果を返します.
+    保持する数が上限を超えると、最も長く使われていないものから捨てます.
+
+    :params map_: マップ
+    :params maxsize: 保持する計算結果の上限
+    """
+
+    def __init__(self, map_: MapBase, maxsize: int = 128) -> None:
+        assert 0 < maxsize
+
+        self._map = map_
+        self._maxsize = maxsize
+        self._ranges: OrderedDict[tuple, MoveRange] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        """保持する計算結果の上限."""
+
+        return self._maxsize
+
+    @property
+    def hits(self) -> int:
+        """キャッシュから返した回数."""
+
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """計算し直した回数."""
+
+        return self._misses
+
+    @property
+    def hit_rate(self) -> float:
+        """キャッシュから返した割合."""
+
+        total = self._hits + self._misses
+        if total == 0:
+            return 0.0
+        return self._hits / total
+
+    def calc(self, unit: Unit) -> MoveRange:
+        """指定ユニットの移動範囲を得ます.
+
+        :params unit: ユニット
+        :return: 移動範囲
+        """
+
+        key = (unit.position.get(), unit.move, self._map.version)
+        range_ = self._ranges.get(key)
+        if range_ is not None:
+            self._hits += 1
+            self._ranges.move_to_end(key)
+            return range_
+
+        self._misses += 1
+        width = self._map.width
+        height = self._map.height
+        steps = flood_queue(
+            self._map.cost_grid.data,
+            width,
+            height,
+            self._map.get_unit_indices(),
+            self._map.type_grid.index(unit.position.x, unit.position.y),
+            unit.move)
+        range_ = MoveRange(width, height, steps)
+
+        self._ranges[key] = range_
+        if self._maxsize < len(self._ranges):
+            self._ranges.popitem(last=False)
+        return range_
+
+    def clear(self) -> None:
+        """保持している計算結果と統計を消します."""
+
+        self._ranges.clear()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._ranges)
+
+
+def flood_queue(
+        costs: tp.Sequence[int],
+        width: int,
+        height: int,
+        occupied: tp.Container[int],
+        start_index: int,
+        move: int,
+        topology: Topology = Topology.SQUARE4) -> dict[int, int]:
+    """残り移動力の大きいセルから順に移動範囲を計算します.
+
+    残り移動力ごとのバケットにセルを積み、大きいバケットから取り出して隣へ広げていきます.
+    各セルは残り移動力が増えたときだけ積み直されるため、訪問回数は移動力+1 回以内に収まります.
+    SQUARE4 の隣は関数呼び出しなしで求めます.
+
+    :params costs: セルごとの移動コスト（y * width + x の順）
+    :params width: マップの幅
+    :params height: マップの高さ
+    :params occupied: ユニットのいるセルの添字
+    :params start_index: 開始セルの添字
+    :params move: 移動力
+    :params topology: セルのつながり方
+    :return: 到達できるセルの添字 → 残り移動力 の辞書
+    """
+
+    square4 = topology == Topology.SQUARE4
+    forbidden = Ground.COST_FORBIDDEN
+    unset = MoveMap.UNSET_VALUE
+    moves = {start_index: move}
+    buckets = [[] for _ in range(move + 1)]
+    buckets[move].append(start_index)
+
+    for rest in range(move, 0, -1):
+        bucket = buckets[rest]
+        # コスト 0 の地面では同じバケットに積まれるため、空になるまで取り出す
+        while bucket:
+            index = bucket.pop()
+            if moves[index] != rest:
+                # より大きい移動力で到達済み
+                continue
+
+            if square4:
+                y, x = divmod(index, width)
+                nexts = (
+                    index + width if y + 1 < height else -1,
+                    index - width if 0 < y else -1,
+                    index - 1 if 0 < x else -1,
+                    index + 1 if x + 1 < width else -1,
+                )
+            else:
+                nexts = get_neighbors(index, width, height, topology)
+            for next_index in nexts:
+                if next_index < 0:
+                    continue
+                cost = costs[next_index]
+                if cost == forbidden or rest < cost:
+                    continue
+                next_rest = rest - cost
+                if next_rest <= moves.get(next_index, unset):
+                    continue
+                if next_index in occupied:
+                    continue
+
+                moves[next_index] = next_rest
+                buckets[next_rest].append(next_index)
+
+    return moves
+
+
+def _flood_queue_stats(
+        costs: tp.Sequence[int],
+        width: int,
+        height: int,
+        occupied: tp.Container[int],
+        start_index: int,
+        move: int,
+        topology: Topology,
+        stats: MoveStats) -> dict[int, int]:
+    """統計を取りながら flood_queue と同じ計算をします.
+
+    flood_queue を遅くしないよう、数えるための処理はこちらにだけ入れています.
+
+    :params costs: セルごとの移動コスト（y * width + x の順）
+    :params width: マップの幅
+    :params height: マップの高さ
+    :params occupied: ユニットのいるセルの添字
+    :params start_index: 開始セルの添字
+    :params move: 移動力
+    :params topology: セルのつながり方
+    :params stats: 数えた値を足す統計
+    :return: 到達できるセルの添字 → 残り移動力 の辞書
+    """
+
+    forbidden = Ground.COST_FORBIDDEN
+    unset = MoveMap.UNSET_VALUE
+    moves = {start_index: move}
+    buckets = [[] for _ in range(move + 1)]
+    buckets[move].append(start_index)
+    visits = 0
+    revisits = 0
+    checks = 0
+    lookups = 0
+
+    for rest in range(move, 0, -1):
+        bucket = buckets[rest]
+        while bucket:
+            index = bucket.pop()
+            if moves[index] != rest:
+                continue
+
+            visits += 1
+            for next_index in get_neighbors(index, width, height, topology):
+                checks += 1
+                cost = costs[next_index]
+                if cost == forbidden or rest < cost:
+                    continue
+                next_rest = rest - cost
+                current = moves.get(next_index, unset)
+                if next_rest <= current:
+                    continue
+                lookups += 1
+                if next_index in occupied:
+                    continue
+
+                if current != unset:
+                    revisits += 1
+                moves[next_index] = next_rest
+                buckets[next_rest].append(next_index)
+
+    stats.add(
+        visits=visits, revisits=revisits,
+        can_move_calls=checks, unit_lookups=lookups)
+    return moves
+
+
+def _relax_array(
+        costs: tp.Sequence[int],
+        width: int,
+        height: int,
+        occupied: tp.Container[int],
+        moves: tp.MutableSequence[int],
+        buckets: list[list[int]],
+        topology: Topology = Topology.SQUARE4) -> None:
+    """バケットに積まれたセルから、計算結果の配列を直接書き換えて移動範囲を広げます.
+
+    flood_queue と同じ手順で、結果を辞書ではなく既存の配列に書き込みます.
+
+    :params costs: セルごとの移動コスト（y * width + x の順）
+    :params width: マップの幅
+    :params height: マップの高さ
+    :params occupied: ユニットのいるセルの添字
+    :params moves: セルごとの残り移動力（y * width + x の順）
+    :params buckets: 残り移動力ごとの、広げ始めるセルの添字のリスト
+    :params topology: セルのつながり方
+    """
+
+    forbidden = Ground.COST_FORBIDDEN
+    for rest in range(len(buckets) - 1, 0, -1):
+        bucket = buckets[rest]
+        while bucket:
+            index = bucket.pop()
+            if moves[index] != rest:
+                continue
+
+            for next_index in get_neighbors(index, width, height, topology):
+                cost = costs[next_index]
+                if cost == forbidden or rest < cost:
+                    continue
+                next_rest = rest - cost
+                if next_rest <= moves[next_index]:
+                    continue
+                if next_index in occupied:
+                    continue
+
+                moves[next_index] = next_rest
+                buckets[next_rest].append(next_index)
+
+
+# つながり方ごとの隣への移動量（偶数行, 奇数行）
+_NEIGHBOR_OFFSETS = {
+    Topology.SQUARE8: (
+        ((0, 1), (0, -1), (-1, 0), (1, 0), (-1, -1), (1, -1), (-1, 1), (1, 1)),
+    ) * 2,
+    Topology.HEX: (
+        ((0, 1), (0, -1), (-1, 0), (1, 0), (-1, -1), (-1, 1)),
+        ((0, 1), (0, -1), (-1, 0), (1, 0), (1, -1), (1, 1)),
+    ),
+}
+
+
+def get_neighbors(
+        index: int,
+        width: int,
+        height: int,
+        topology: Topology = Topology.SQUARE4) -> list[int]:
+    """隣のうち、マップ範囲内のセルの添字を得ます.
+
+    :params index: セルの添字
+    :params width: マップの幅
+    :params height: マップの高さ
+    :params topology: セルのつながり方
+    :return: 隣のセルの添字のリスト
+    """
+
+    y, x = divmod(index, width)
+    if topology != Topology.SQUARE4:
+        return [
+            (y + dy) * width + x + dx
+            for dx, dy in _NEIGHBOR_OFFSETS[topology][y & 1]
+            if 0 <= x + dx < width and 0 <= y + dy < height]
+
+    neighbors = []
+    if y + 1 < height:
+        neighbors.append(index + width)
+    if 0 < y:
+        neighbors.append(index - width)
+    if 0 < x:
+        neighbors.append(index - 1)
+    if x + 1 < width:
+        neighbors.append(index + 1)
+    return neighbors
+
+
+def _trace_path(
+        links: dict[int, int],
+        index: int,
+        width: int) -> list[GridPosition]:
+    """添字のつながりをたどって位置のリストを作ります.
+
+    :params links: 添字 → 次の添字 の辞書。-1 で終わります
+    :params index: 最初の添字
+    :params width: マップの幅
+    :return: 位置のリスト
+    """
+
+    path = []
+    while index != -1:
+        y, x = divmod(index, width)
+        path.append(GridPosition(x, y))
+        index = links[index]
+    return path
+
+
+def _copy_costs(grid: Grid) -> array:
+    """ワーカープロセスに渡すため、移動コストを配列にコピーします.
+
+    mmap や共有メモリの上のグリッドは memoryview のため、そのままでは pickle できません.
+
+    :params grid: 移動コストのグリッド
+    :return: 移動コストの配列
+    """
+
+    costs = array(grid.typecode)
+    costs.frombytes(memoryview(grid.data).cast('B'))
+    return costs
+
+
+# ワーカープロセスで共有する計算用データ
+_worker_args: tuple = ()
+
+
+def _init_worker(
+        costs: tp.Sequence[int],
+        width: int,
+        height: int,
+        occupied: tp.Container[int],
+        topology: Topology) -> None:
+    """ワーカープロセスを初期化します."""
+
+    global _worker_args
+    _worker_args = (costs, width, height, occupied, topology)
+
+
+def _flood_worker(job: tuple[int, int]) -> dict[int, int]:
+    """ワーカープロセスで移動範囲を計算します.
+
+    :params job: 開始セルの添字と移動力
+    :return: 到達できるセルの添字 → 残り移動力 の辞書
+    """
+
+    costs, width, height, occupied, topology = _worker_args
+    index, move = job
+    return flood_queue(costs, width, height, occupied, index, move, topology)
+
+
+def _flood_chunk_worker(
+        task: tuple[tp.Sequence[int], int, int, tp.Container[int], Topology,
+                    list[tuple[int, int]]]
+) -> list[dict[int, int]]:
+    """ワーカーで複数ユニットの移動範囲を計算します.
+
+    :params task: 移動コスト, 幅, 高さ, ユニットのいるセルの添字, つながり方, (開始セルの添字, 移動力) のリスト
+    :return: ユニットごとの、到達できるセルの添字 → 残り移動力 の辞書
+    """
+
+    costs, width, height, occupied, topology, jobs = task
+    return [
+        flood_queue(costs, width, height, occupied, index, move, topology)
+        for index, move in jobs]
@@ -0,0 +1,115 @@
+"""マップのバイナリファイル.
+
+ファイルの構成は次のとおりです. 数値はすべてリトルエンディアンです.
+
+    ヘッダ         : マジック b'SLGM', 版数, 地面タイプの型コード, 移動コストの型コード, 幅, 高さ, 地面の数
+    地面テーブル   : (地面タイプ, 移動コスト) × 地面の数
+    地面タイプ     : 幅 × 高さ 個の値（8 バイト境界から）
+    移動コスト     : 幅 × 高さ 個の値（8 バイト境界から）
+
+読み込み時はファイルを mmap し、地面タイプと移動コストのグリッドをファイルの上に直接置きます.
+そのため大きなマップでもすぐに開け、複数のプロセスで開いた場合も同じページを共有します.
+"""
+from __future__ import annotations
+
+import mmap
+import struct
+import sys
+from pathlib import Path
+
+from slgmove.grid import Grid, layout_grids
+from slgmove.main import Map, Ground
+
+# ファイルの先頭の識別子
+MAGIC = b'SLGM'
+
+# ファイル形式の版数
+VERSION = 1
+
+# ヘッダ（マジック, 版数, 地面タイプの型コード, 移動コストの型コード, 幅, 高さ, 地面の数）
+_HEADER = struct.Struct('<4sHccIII')
+
+# 地面テーブルの1要素（地面タイプ, 移動コスト）
+_GROUND = struct.Struct('<qq')
+
+
+def save(map_: Map, path: Path) -> None:
+    """マップをファイルに保存します.
+
+    ユニットの配置は保存しません.
+
+    :params map_: マップ
+    :params path: 保存先のパス
+    """
+
+    if sys.byteorder != 'little':
+        raise NotImplementedError
+
+    types = map_.type_grid
+    costs = map_.cost_grid
+    ground_dict = map_.ground_dict
+
+    header = _HEADER.pack(
+        MAGIC, VERSION,
+        types.typecode.encode('ascii'), costs.typecode.encode('ascii'),
+        map_.width, map_.height, len(ground_dict))
+    grounds = b''.join(
+        _GROUND.pack(type_, g.cost) for type_, g in ground_dict.items())
+
+    grids = (types, costs)
+    layouts = layout_grids(
+        len(header) + len(grounds), map_.width, map_.height,
+        (grid.typecode for grid in grids))
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(grounds)
+        for grid, (offset, _) in zip(grids, layouts):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(memoryview(grid.data).cast('B'))
+
+
+def load(path: Path, writable: bool = False) -> Map:
+    """ファイルを mmap してマップを作成します.
+
+    writable が False の場合は読み取り専用となり、set_type を呼ぶと TypeError になります.
+    True の場合は書き換えられますが、内容はファイルには書き戻されません.
+
+    :params path: ファイルのパス
+    :params writable: 地面タイプを書き換えられるようにするか
+    :return: マップ
+    :raises ValueError: ファイルの形式が正しくない
+    """
+
+    access = mmap.ACCESS_COPY if writable else mmap.ACCESS_READ
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=access)
+
+    if len(buffer) < _HEADER.size:
+        raise ValueError('file is too short')
+    magic, version, types_code, costs_code, width, height, count = \
+        _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError('not a map file')
+    if version != VERSION:
+        raise ValueError(f'unsupported version: {version}')
+    if sys.byteorder != 'little':
+        raise NotImplementedError
+
+    offset = _HEADER.size
+    ground_dict = {}
+    for _ in range(count):
+        type_, cost = _GROUND.unpack_from(buffer, offset)
+        ground_dict[type_] = Ground(cost)
+        offset += _GROUND.size
+
+    typecodes = [code.decode('ascii') for code in (types_code, costs_code)]
+    grids = []
+    for typecode, (offset, size) in zip(
+            typecodes, layout_grids(offset, width, height, typecodes)):
+        if len(buffer) < offset + size:
+            raise ValueError('file is too short')
+        view = memoryview(buffer)[offset:offset + size]
+        grids.append(Grid.from_buffer(width, height, typecode, view))
+
+    return Map.from_grid(grids[0], ground_dict, grids[1])
+
@@ -0,0 +1,236 @@
+"""共有メモリを使った移動範囲の並列計算.
+
+地面タイプと移動コストのグリッドを multiprocessing.shared_memory に置き、ワーカープロセスはコピーせずに参照します.
+同じ地形で多数の戦闘を同時に扱う場合でも、地形のメモリはマシン全体で1つ分で済みます.
+"""
+from __future__ import annotations
+
+import typing as tp
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from slgmove.grid import Grid, layout_grids
+from slgmove.main import Unit, Map, Ground, MoveRange, flood_queue
+
+# [型エイリアス] 共有メモリ上のマップの情報（共有メモリ名, 幅, 高さ, 地面タイプの型コード, 移動コストの型コード,
+# (地面タイプ, 移動コスト) のタプル）
+SpecType = tuple[str, int, int, str, str, tuple[tuple[int, int], ...]]
+
+# [型エイリアス] 戦闘（地形, ユニットのリスト）
+BattleType = tuple['SharedMap', tp.Sequence[Unit]]
+
+# ワーカープロセスで開いたままにしておく共有メモリの数の上限
+_MAX_ATTACHED = 16
+
+
+class SharedMap:
+    """共有メモリに置いたマップ.
+
+    地面タイプと移動コストのグリッドは、マップのファイルと同じ並びで置きます.
+    作成したプロセスが close を呼ぶと共有メモリを破棄します. ユニットの配置は共有しません.
+
+    :params map_: 共有する地形のマップ
+    """
+
+    def __init__(self, map_: Map) -> None:
+        grids = (map_.type_grid, map_.cost_grid)
+        layouts = layout_grids(
+            0, map_.width, map_.height, (grid.typecode for grid in grids))
+        offset, size = layouts[-1]
+
+        self._shm = shared_memory.SharedMemory(create=True, size=offset + size)
+        for grid, (offset, size) in zip(grids, layouts):
+            self._shm.buf[offset:offset + size] = memoryview(grid.data).cast('B')
+
+        grounds = tuple((t, g.cost) for t, g in map_.ground_dict.items())
+        self._spec: SpecType = (
+            self._shm.name, map_.width, map_.height,
+            map_.type_grid.typecode, map_.cost_grid.typecode, grounds)
+        self._map = _create_map(self._shm, self._spec)
+
+    @property
+    def name(self) -> str:
+        """共有メモリの名前."""
+
+        return self._spec[0]
+
+    @property
+    def spec(self) -> SpecType:
+        """ワーカープロセスに渡す、共有メモリ上のマップの情報."""
+
+        return self._spec
+
+    @property
+    def map(self) -> Map:
+        """共有メモリを参照するマップ."""
+
+        return self._map
+
+    def close(self) -> None:
+        """共有メモリを破棄します.
+
+        map で得たマップは使えなくなります. 参照が残っていると BufferError になります.
+        """
+
+        if self._shm is None:
+            return
+        self._map = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self) -> SharedMap:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class MovePool:
+    """移動範囲を並列計算するワーカープロセスのプール.
+
+    ワーカープロセスは、最初に受け取った SharedMap の共有メモリを開いて使い続けます.
+
+    :params processes: ワーカープロセスの数。None の場合は CPU の数
+    """
+
+    def __init__(self, processes: tp.Optional[int] = None) -> None:
+        self._executor = ProcessPoolExecutor(processes)
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """ワーカープロセスのプール.
+
+        MoveMap.calc_many に渡すと、同じワーカープロセスで計算できます.
+        """
+
+        return self._executor
+
+    def calc_many(
+            self,
+            shared: SharedMap,
+            units: tp.Sequence[Unit],
+            chunk_size: int = 64) -> list[MoveRange]:
+        """1つの戦闘のユニットの移動範囲をまとめて計算します.
+
+        :params shared: 地形
+        :params units: 戦闘に参加しているユニットのリスト
+        :params chunk_size: 1回でワーカープロセスに渡すユニットの数
+        :return: units と同じ順番の計算結果
+        """
+
+        return self.calc_battles([(shared, units)], chunk_size)[0]
+
+    def calc_battles(
+            self,
+            battles: tp.Sequence[BattleType],
+            chunk_size: int = 64) -> list[list[MoveRange]]:
+        """複数の戦闘のユニットの移動範囲をまとめて計算します.
+
+        ユニットは同じ戦闘のユニットのいるセルには進入できません.
+        計算は MoveMap.calc_many と同じく QUEUE で行います.
+
+        :params battles: 戦闘（地形, ユニットのリスト）のリスト
+        :params chunk_size: 1回でワーカープロセスに渡すユニットの数
+        :return: 戦闘ごとの、ユニットと同じ順番の計算結果
+        """
+
+        assert 0 < chunk_size
+
+        tasks = []
+        owners = []
+        for battle_index, (shared, units) in enumerate(battles):
+            _, width, height, *_ = shared.spec
+            occupied = frozenset(
+                u.position.y * width + u.position.x for u in units
+                if u.position.x < width and u.position.y < height)
+            jobs = [(u.position.y * width + u.position.x, u.move) for u in units]
+            for start in range(0, len(jobs), chunk_size):
+                tasks.append((shared.spec, occupied, jobs[start:start + chunk_size]))
+                owners.append(battle_index)
+
+        results: list[list[MoveRange]] = [[] for _ in battles]
+        for battle_index, steps_list in zip(
+                owners, self._executor.map(_calc_worker, tasks)):
+            _, width, height, *_ = battles[battle_index][0].spec
+            results[battle_index].extend(
+                MoveRange(width, height, steps) for steps in steps_list)
+        return results
+
+    def close(self) -> None:
+        """ワーカープロセスを終了します."""
+
+        self._executor.shutdown()
+
+    def __enter__(self) -> MovePool:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def _create_map(shm: shared_memory.SharedMemory, spec: SpecType) -> Map:
+    """共有メモリの上にマップを作成します.
+
+    :params shm: 共有メモリ
+    :params spec: 共有メモリ上のマップの情報
+    :return: 共有メモリを参照するマップ
+    """
+
+    _, width, height, types_code, costs_code, grounds = spec
+    typecodes = (types_code, costs_code)
+    types, costs = [
+        Grid.from_buffer(width, height, typecode, shm.buf[offset:offset + size])
+        for typecode, (offset, size) in zip(
+            typecodes, layout_grids(0, width, height, typecodes))]
+    ground_dict = {t: Ground(cost) for t, cost in grounds}
+    return Map.from_grid(types, ground_dict, costs)
+
+
+# ワーカープロセスで開いている共有メモリ（共有メモリ名 → (共有メモリ, マップ)）
+_attached: OrderedDict[str, tuple[shared_memory.SharedMemory, Map]] = OrderedDict()
+
+
+def _attach(spec: SpecType) -> Map:
+    """共有メモリを開いてマップを得ます.
+
+    開いた共有メモリは上限まで保持し、超えたら最も長く使われていないものから閉じます.
+
+    :params spec: 共有メモリ上のマップの情報
+    :return: 共有メモリを参照するマップ
+    """
+
+    name = spec[0]
+    entry = _attached.get(name)
+    if entry is not None:
+        _attached.move_to_end(name)
+        return entry[1]
+
+    shm = shared_memory.SharedMemory(name=name)
+    map_ = _create_map(shm, spec)
+    _attached[name] = (shm, map_)
+    while _MAX_ATTACHED < len(_attached):
+        _, (old_shm, old_map) = _attached.popitem(last=False)
+        # マップが共有メモリを参照したままだと閉じられない
+        del old_map
+        old_shm.close()
+    return map_
+
+
+def _calc_worker(
+        task: tuple[SpecType, frozenset[int], list[tuple[int, int]]]
+) -> list[dict[int, int]]:
+    """ワーカープロセスで移動範囲を計算します.
+
+    :params task: 共有メモリ上のマップの情報, ユニットのいるセルの添字, (開始セルの添字, 移動力) のリスト
+    :return: ユニットごとの、到達できるセルの添字 → 残り移動力 の辞書
+    """
+
+    spec, occupied, jobs = task
+    map_ = _attach(spec)
+    _, width, height, *_ = spec
+    costs = map_.cost_grid.data
+    return [
+        flood_queue(costs, width, height, occupied, index, move)
+        for index, move in jobs]
@@ -1,6 +1,50 @@
 """位置クラス."""
 from __future__ import annotations
 
+import weakref
+from enum import Enum, auto
+
+
+class Topology(Enum):
+    """隣り合うセルのつながり方."""
+
+    SQUARE4 = auto()  # 上下左右
+    SQUARE8 = auto()  # 上下左右と斜め
+    HEX = auto()  # 六角形（奇数行を右に半マスずらして並べる）
+
+
+def calc_grid_distance(
+        x1: int,
+        y1: int,
+        x2: int,
+        y2: int,
+        topology: Topology = Topology.SQUARE4) -> int:
+    """2つの座標の間を移動するのに必要な最小の歩数を計算します.
+
+    SQUARE4 ではマンハッタン距離、SQUARE8 ではチェビシェフ距離、HEX では六角形グリッドの距離となります.
+
+    :params x1: 1つ目のX座標
+    :params y1: 1つ目のY座標
+    :params x2: 2つ目のX座標
+    :params y2: 2つ目のY座標
+    :params topology: セルのつながり方
+    :return: 歩数
+    """
+
+    dx = abs(x2 - x1)
+    dy = abs(y2 - y1)
+    if topology == Topology.SQUARE4:
+        return dx + dy
+    if topology == Topology.SQUARE8:
+        return max(dx, dy)
+
+    # 奇数行ずらしの座標を、斜めの軸を持つ座標に直して比べる
+    q1 = x1 - (y1 - (y1 & 1)) // 2
+    q2 = x2 - (y2 - (y2 & 1)) // 2
+    dq = q2 - q1
+    dr = y2 - y1
+    return (abs(dq) + abs(dr) + abs(dq + dr)) // 2
+
 
 class GridPosition:
     """グリッド上の位置を表すクラス.
@@ -11,6 +55,8 @@ class GridPosition:
     :params y: Y座標
     """
 
+    __slots__ = ('_x', '_y')
+
     def __init__(self, x: int = 0, y: int = 0) -> None:
         assert 0 <= x
         assert 0 <= y
@@ -82,29 +128,198 @@ class GridPosition:
 
         return GridPosition(self._x + 1, self._y)
 
-    def calc_distance(self, pos: GridPosition) -> int:
+    def calc_distance(
+            self,
+            pos: GridPosition,
+            topology: Topology = Topology.SQUARE4) -> int:
         """指定した座標との距離を計算します.
 
         グリッド単位での距離となります.
-        斜め上の座標を指定した場合、斜め1マスではなく、横→縦で2マスとなる点に注意してください.
+        SQUARE4 で斜め上の座標を指定した場合、斜め1マスではなく、横→縦で2マスとなる点に注意してください.
 
         :params pos: 比較先の座標
+        :params topology: セルのつながり方
         :return: 距離
         """
 
+        if topology != Topology.SQUARE4:
+            return calc_grid_distance(self.x, self.y, pos.x, pos.y, topology)
+
         dx = abs(pos.x - self.x)
         dy = abs(pos.y - self.y)
         return dx + dy
 
     def __eq__(self, other) -> bool:
-        if isinstance(other, tuple):
-            x, y = other
-        elif isinstance(other, GridPosition):
-            x, y = other.get()
-        else:
-            raise TypeError
-
+        x, y = _get_xy(other)
         return self.x == x and self.y == y
 
     def __str__(self):
         return f'({self._x},{self._y})'
+
+
+class GridPoint:
+    """グリッド上の位置を表す不変クラス.
+
+    GridPosition と同じ座標を表しますが、書き換えできないため dict や set のキーに使えます.
+    of() で作成すると同じ座標のインスタンスを使い回し、上下左右の隣も初回に作ったものを使い回します.
+    使い回すインスタンスは弱参照で持つため、どこからも参照されなくなれば解放されます.
+
+    負の数は扱いません.
+
+    :params x: X座標
+    :params y: Y座標
+    """
+
+    __slots__ = ('_x', '_y', '_hash', '_neighbors', '__weakref__')
+
+    # 座標 → インスタンス（使われなくなったインスタンスは自動で取り除かれる）
+    _interned: weakref.WeakValueDictionary[tuple[int, int], GridPoint] = \
+        weakref.WeakValueDictionary()
+
+    def __init__(self, x: int = 0, y: int = 0) -> None:
+        assert 0 <= x
+        assert 0 <= y
+
+        object.__setattr__(self, '_x', x)
+        object.__setattr__(self, '_y', y)
+        object.__setattr__(self, '_hash', hash((x, y)))
+        object.__setattr__(self, '_neighbors', None)
+
+    @classmethod
+    def of(cls, x: int, y: int) -> GridPoint:
+        """指定座標のインスタンスを得ます.
+
+        同じ座標に対しては常に同じインスタンスを返します.
+
+        :params x: X座標
+        :params y: Y座標
+        :return: 位置
+        """
+
+        point = cls._interned.get((x, y))
+        if point is None:
+            point = cls(x, y)
+            cls._interned[(x, y)] = point
+        return point
+
+    @property
+    def x(self) -> int:
+        """X座標."""
+
+        return self._x
+
+    @property
+    def y(self) -> int:
+        """Y座標."""
+
+        return self._y
+
+    def get(self) -> tuple[int, int]:
+        """X,Y座標をタプル形式で得ます.
+
+        :return: X,Y座標のタプル
+        """
+
+        return self._x, self._y
+
+    def _get_neighbors(self) -> tuple[GridPoint, GridPoint, GridPoint, GridPoint]:
+        """上下左右の隣を得ます.
+
+        :return: 上, 下, 左, 右 の座標
+        """
+
+        if self._neighbors is None:
+            x, y = self._x, self._y
+            neighbors = (
+                GridPoint.of(x, max(0, y - 1)),
+                GridPoint.of(x, y + 1),
+                GridPoint.of(max(0, x - 1), y),
+                GridPoint.of(x + 1, y),
+            )
+            object.__setattr__(self, '_neighbors', neighbors)
+        return self._neighbors
+
+    def up(self) -> GridPoint:
+        """一つ上の座標を返します.
+
+        :return: 一つ上の座標
+        """
+
+        return self._get_neighbors()[0]
+
+    def down(self) -> GridPoint:
+        """一つ下の座標を返します.
+
+        :return: 一つ下の座標
+        """
+
+        return self._get_neighbors()[1]
+
+    def left(self) -> GridPoint:
+        """一つ左の座標を返します.
+
+        :return: 一つ左の座標
+        """
+
+        return self._get_neighbors()[2]
+
+    def right(self) -> GridPoint:
+        """一つ右の座標を返します.
+
+        :return: 一つ右の座標
+        """
+
+        return self._get_neighbors()[3]
+
+    def calc_distance(
+            self,
+            pos: GridPoint,
+            topology: Topology = Topology.SQUARE4) -> int:
+        """指定した座標との距離を計算します.
+
+        GridPosition.calc_distance と同じく、グリッド単位の距離となります.
+
+        :params pos: 比較先の座標
+        :params topology: セルのつながり方
+        :return: 距離
+        """
+
+        if topology != Topology.SQUARE4:
+            return calc_grid_distance(self._x, self._y, pos.x, pos.y, topology)
+        return abs(pos.x - self._x) + abs(pos.y - self._y)
+
+    def __setattr__(self, name, value) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self) -> tuple:
+        return GridPoint.of, (self._x, self._y)
+
+    def __copy__(self) -> GridPoint:
+        return self
+
+    def __deepcopy__(self, memo: dict) -> GridPoint:
+        return self
+
+    def __eq__(self, other) -> bool:
+        x, y = _get_xy(other)
+        return self._x == x and self._y == y
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __str__(self):
+        return f'({self._x},{self._y})'
+
+
+def _get_xy(other) -> tuple[int, int]:
+    """比較相手の X,Y座標を得ます.
+
+    :params other: タプル、GridPosition、GridPoint のいずれか
+    :return: X,Y座標のタプル
+    """
+
+    if isinstance(other, tuple):
+        return other
+    if isinstance(other, (GridPosition, GridPoint)):
+        return other.get()
+    raise TypeError
@@ -0,0 +1,106 @@
+"""移動計算の統計.
+
+MoveMap や Map で統計を有効にすると、計算中のセルの訪問回数や判定の呼び出し回数を数えます.
+無効の場合は数えるための処理を一切通らないため、計算速度は変わりません.
+"""
+from __future__ import annotations
+
+import typing as tp
+
+
+class MoveStats:
+    """移動計算の統計."""
+
+    def __init__(self) -> None:
+        self._calc_count = 0
+        self._visits = 0
+        self._revisits = 0
+        self._can_move_calls = 0
+        self._unit_lookups = 0
+        self._elapsed = 0.0
+
+    @property
+    def calc_count(self) -> int:
+        """計算の回数."""
+
+        return self._calc_count
+
+    @property
+    def visits(self) -> int:
+        """セルから隣へ広げた回数."""
+
+        return self._visits
+
+    @property
+    def revisits(self) -> int:
+        """書き込み済みのセルに、より大きい残り移動力を書き直した回数."""
+
+        return self._revisits
+
+    @property
+    def can_move_calls(self) -> int:
+        """セルに進入できるかを判定した回数."""
+
+        return self._can_move_calls
+
+    @property
+    def unit_lookups(self) -> int:
+        """セルにユニットがいるかを調べた回数."""
+
+        return self._unit_lookups
+
+    @property
+    def elapsed(self) -> float:
+        """計算にかかった時間の合計（秒）."""
+
+        return self._elapsed
+
+    def add(
+            self,
+            calc_count: int = 0,
+            visits: int = 0,
+            revisits: int = 0,
+            can_move_calls: int = 0,
+            unit_lookups: int = 0,
+            elapsed: float = 0.0) -> None:
+        """値を足します.
+
+        :params calc_count: 計算の回数
+        :params visits: セルから隣へ広げた回数
+        :params revisits: 書き直した回数
+        :params can_move_calls: 進入できるかを判定した回数
+        :params unit_lookups: ユニットがいるかを調べた回数
+        :params elapsed: 計算にかかった時間（秒）
+        """
+
+        self._calc_count += calc_count
+        self._visits += visits
+        self._revisits += revisits
+        self._can_move_calls += can_move_calls
+        self._unit_lookups += unit_lookups
+        self._elapsed += elapsed
+
+    def merge(self, other: MoveStats) -> None:
+        """他の統計の値を足します.
+
+        :params other: 他の統計
+        """
+
+        self.add(
+            other._calc_count, other._visits, other._revisits,
+            other._can_move_calls, other._unit_lookups, other._elapsed)
+
+    def reset(self) -> None:
+        """すべての値を 0 に戻します."""
+
+        self.__init__()
+
+    def __str__(self) -> str:
+        return (
+            f'calc={self._calc_count}, visits={self._visits}, '
+            f'revisits={self._revisits}, can_move={self._can_move_calls}, '
+            f'unit_lookups={self._unit_lookups}, elapsed={self._elapsed:.6f}s')
+
+
+# [型エイリアス] 統計の通知先（1回の計算の統計を受け取る関数）
+StatsHookType = tp.Callable[[MoveStats], None]
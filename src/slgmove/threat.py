@@ -0,0 +1,123 @@
+"""脅威マップ.
+
+複数のユニットについて「次のターンに攻撃が届くか」をまとめ、セルごとに届くユニットの数を数えます.
+"""
+from __future__ import annotations
+
+import typing as tp
+
+from slgmove import vector
+from slgmove.grid import Grid, fit_typecode
+from slgmove.main import Unit, Map, Ground, Engine, flood_queue, get_neighbors
+from slgmove.position import GridPosition
+
+
+class ThreatMap:
+    """脅威マップ.
+
+    各ユニットの移動範囲に攻撃範囲を足したセルを、ユニットごとに1回ずつ数えます.
+    攻撃範囲は地形やユニットに関係なく、移動先からのグリッド単位の距離で決まります.
+
+    :params map_: マップ
+    :params engine: 計算方式。QUEUE または NUMPY
+    """
+
+    def __init__(self, map_: Map, engine: Engine = Engine.QUEUE) -> None:
+        if engine == Engine.NUMPY and not vector.is_available():
+            raise ImportError('Engine.NUMPY requires numpy')
+        if engine not in (Engine.QUEUE, Engine.NUMPY):
+            raise NotImplementedError
+
+        self._map = map_
+        self._engine = engine
+        self._counts = Grid(map_.width, map_.height)
+
+    @property
+    def engine(self) -> Engine:
+        """計算方式."""
+
+        return self._engine
+
+    @property
+    def grid(self) -> Grid:
+        """セルごとの、攻撃が届くユニットの数のグリッド."""
+
+        return self._counts
+
+    def calc(self, units: tp.Sequence[Unit], attack_range: int = 1) -> None:
+        """指定ユニットの脅威を計算します.
+
+        :params units: ユニットのリスト
+        :params attack_range: 移動先からの攻撃の届く距離
+        """
+
+        assert 0 <= attack_range
+
+        width = self._map.width
+        height = self._map.height
+        self._counts = Grid(width, height, fit_typecode([0, len(units)]))
+        if self._engine == Engine.QUEUE:
+            self._calc_queue(units, attack_range)
+        else:
+            self._calc_numpy(units, attack_range)
+
+    def _calc_queue(self, units: tp.Sequence[Unit], attack_range: int) -> None:
+        """ユニットごとに移動範囲を計算し、攻撃範囲を広げて数えます.
+
+        :params units: ユニットのリスト
+        :params attack_range: 移動先からの攻撃の届く距離
+        """
+
+        width = self._map.width
+        height = self._map.height
+        costs = self._map.cost_grid.data
+        occupied = self._map.get_unit_indices()
+        counts = self._counts.data
+
+        for unit in units:
+            start_index = self._counts.index(unit.position.x, unit.position.y)
+            steps = flood_queue(
+                costs, width, height, occupied, start_index, unit.move)
+
+            # 移動範囲の外側に向けて1マスずつ広げる
+            frontier = set(steps)
+            threats = set(frontier)
+            for _ in range(attack_range):
+                nexts = set()
+                for index in frontier:
+                    for next_index in get_neighbors(index, width, height):
+                        if next_index not in threats:
+                            nexts.add(next_index)
+                threats |= nexts
+                frontier = nexts
+
+            for index in threats:
+                counts[index] += 1
+
+    def _calc_numpy(self, units: tp.Sequence[Unit], attack_range: int) -> None:
+        """NumPy で移動範囲を計算し、配列全体をずらして攻撃範囲を広げて数えます.
+
+        :params units: ユニットのリスト
+        :params attack_range: 移動先からの攻撃の届く距離
+        """
+
+        width = self._map.width
+        height = self._map.height
+        costs = vector.as_array(self._map.cost_grid.data, width, height)
+        blocked = costs == Ground.COST_FORBIDDEN
+        blocked.ravel()[list(self._map.get_unit_indices())] = True
+
+        counts = vector.as_array(self._counts.data, width, height)
+        for unit in units:
+            moves = vector.calc_moves(
+                costs, blocked, unit.position.get(), unit.move, -1)
+            counts += vector.dilate(moves != -1, attack_range)
+
+    def get_count(self, pos: GridPosition) -> int:
+        """指定位置に攻撃が届くユニットの数を得ます.
+
+        :params pos: 位置
+        :return: ユニットの数
+        """
+
+        return self._counts.get(pos.x, pos.y)
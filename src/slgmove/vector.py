@@ -0,0 +1,110 @@
+"""NumPy による移動範囲計算.
+
+NumPy がインストールされていない環境では利用できません.
+"""
+from __future__ import annotations
+
+import typing as tp
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def is_available() -> bool:
+    """NumPy が利用できるか？"""
+
+    return np is not None
+
+
+def as_array(buffer: tp.Any, width: int, height: int) -> np.ndarray:
+    """一次元のバッファを、コピーせずに (height, width) の配列として扱います.
+
+    :params buffer: y * width + x の順に並んだバッファ
+    :params width: 幅
+    :params height: 高さ
+    :return: バッファを共有する二次元配列
+    """
+
+    return np.asarray(memoryview(buffer)).reshape(height, width)
+
+
+def calc_moves(
+        costs: np.ndarray,
+        blocked: np.ndarray,
+        start: tuple[int, int],
+        move: int,
+        unset: int,
+        diagonal: bool = False) -> np.ndarray:
+    """配列全体の緩和を繰り返して移動範囲を計算します.
+
+    各回で上下左右の隣から「残り移動力 - 移動先のコスト」の最大値を求め、値が変わらなくなるまで繰り返します.
+    結果は MoveMap の他の計算方式と一致します.
+
+    :params costs: セルごとの移動コストの二次元配列
+    :params blocked: 進入できないセル（進入禁止・ユニットがいる）の二次元配列
+    :params start: 開始位置の X,Y座標
+    :params move: 移動力
+    :params unset: 移動できないセルの値
+    :params diagonal: 斜めの隣からも広げるか
+    :return: セルごとの残り移動力の二次元配列
+    """
+
+    height, width = costs.shape
+    x, y = start
+    moves = np.full((height, width), unset, dtype=np.int32)
+
+    # コスト 0 の地面がなければ、届くのは移動力の距離までなので、その範囲だけ計算する
+    if (costs[~blocked] == 0).any():
+        top, bottom, left, right = 0, height, 0, width
+    else:
+        top, bottom = max(0, y - move), min(height, y + move + 1)
+        left, right = max(0, x - move), min(width, x + move + 1)
+
+    window = moves[top:bottom, left:right]
+    window_costs = costs[top:bottom, left:right].astype(np.int32)
+    enterable = ~blocked[top:bottom, left:right]
+    window[y - top, x - left] = move
+
+    sources = np.empty_like(window)
+    while True:
+        # 残り移動力 0 のセルからは広がらない
+        rests = np.where(0 < window, window, unset)
+        sources.fill(unset)
+        np.maximum(sources[1:, :], rests[:-1, :], out=sources[1:, :])
+        np.maximum(sources[:-1, :], rests[1:, :], out=sources[:-1, :])
+        np.maximum(sources[:, 1:], rests[:, :-1], out=sources[:, 1:])
+        np.maximum(sources[:, :-1], rests[:, 1:], out=sources[:, :-1])
+        if diagonal:
+            np.maximum(sources[1:, 1:], rests[:-1, :-1], out=sources[1:, 1:])
+            np.maximum(sources[1:, :-1], rests[:-1, 1:], out=sources[1:, :-1])
+            np.maximum(sources[:-1, 1:], rests[1:, :-1], out=sources[:-1, 1:])
+            np.maximum(sources[:-1, :-1], rests[1:, 1:], out=sources[:-1, :-1])
+
+        valid = enterable & (window_costs <= sources)
+        nexts = np.where(valid, sources - window_costs, unset)
+        if not (window < nexts).any():
+            break
+        np.maximum(window, nexts, out=window)
+
+    return moves
+
+
+def dilate(mask: np.ndarray, radius: int) -> np.ndarray:
+    """真のセルから、グリッド単位の距離が radius 以内のセルまで広げます.
+
+    :params mask: 二次元の真偽値配列
+    :params radius: 広げる距離
+    :return: 広げた後の真偽値配列
+    """
+
+    result = mask.copy()
+    for _ in range(radius):
+        grown = result.copy()
+        grown[1:, :] |= result[:-1, :]
+        grown[:-1, :] |= result[1:, :]
+        grown[:, 1:] |= result[:, :-1]
+        grown[:, :-1] |= result[:, 1:]
+        result = grown
+    return result
@@ -0,0 +1,108 @@
+"""batch モジュールのテスト."""
+
+import random
+import unittest
+
+from damage import batch
+from damage.batch import calc_damages, ATTRIBUTES
+from damage.damage import Damage, AttackInfo, DefenceInfo, Attribute, AttackType, Condition
+
+
+@unittest.skipUnless(batch.is_available(), 'numpy is not installed')
+class TestCalcDamages(unittest.TestCase):
+
+    def test_basic(self):
+        damages = calc_damages(
+            powers=[10, 10, 3],
+            types=[AttackType.PHYSICS.value, AttackType.MAGIC.value, AttackType.PHYSICS.value],
+            attributes=[Attribute.NONE.value] * 3,
+            physics=[4, 4, 5],
+            magics=[1, 1, 1],
+            resistances=[[1.0] * len(ATTRIBUTES)] * 3,
+            conditions=[0, 0, 0])
+        self.assertEqual([6, 9, 0], damages.tolist())
+
+    def test_regist(self):
+        res = [1.0] * len(ATTRIBUTES)
+        res[ATTRIBUTES.index(Attribute.FIRE)] = 0.5
+        damages = calc_damages(
+            powers=[11, 11],
+            types=[AttackType.PHYSICS.value] * 2,
+            attributes=[Attribute.FIRE.value, Attribute.WATER.value],
+            physics=[0, 0],
+            magics=[0, 0],
+            resistances=[res, res],
+            conditions=[0, 0])
+        self.assertEqual([5, 11], damages.tolist())
+
+    def test_cond_mag(self):
+        cond_mag_dict = {
+            Condition.POISON: 1.5,
+            Condition.SLEEP: 2.0,
+        }
+        conditions = [
+            0,
+            Condition.POISON.value,
+            (Condition.POISON | Condition.SLEEP).value,
+        ]
+        damages = calc_damages(
+            powers=[10] * 3,
+            types=[AttackType.PHYSICS.value] * 3,
+            attributes=[Attribute.NONE.value] * 3,
+            physics=[0] * 3,
+            magics=[0] * 3,
+            resistances=[[1.0] * len(ATTRIBUTES)] * 3,
+            conditions=conditions,
+            cond_mag_dict=cond_mag_dict)
+        self.assertEqual([10, 15, 25], damages.tolist())
+
+    def test_empty(self):
+        damages = calc_damages([], [], [], [], [], [], [])
+        self.assertEqual((0,), damages.shape)
+        self.assertEqual('int64', damages.dtype.name)
+
+    def test_unknown_type(self):
+        with self.assertRaises(NotImplementedError):
+            calc_damages(
+                powers=[10],
+                types=[0],
+                attributes=[Attribute.NONE.value],
+                physics=[0],
+                magics=[0],
+                resistances=[[1.0] * len(ATTRIBUTES)],
+                conditions=[0])
+
+    def test_same_as_damage(self):
+        rand = random.Random(1)
+        mags = [0.5, 1.1, 1.3, 1.5, 2.0, 2.7]
+        ratios = [0.0, 0.25, 0.3, 0.7, 1.0, 1.1, 1.5, 2.0, -0.5]
+        conds = [None, Condition.POISON, Condition.SLEEP, Condition.POISON | Condition.SLEEP]
+        for _ in range(20):
+            cond_mag_dict = {c: rand.choice(mags) for c in rand.sample(list(Condition), rand.randint(0, 2))}
+
+            expected = []
+            columns = [[] for _ in range(7)]
+            for _ in range(200):
+                type_ = rand.choice(list(AttackType))
+                attr = rand.choice(ATTRIBUTES)
+                res_dict = {a: rand.choice(ratios) for a in ATTRIBUTES if rand.random() < 0.5}
+                cond = rand.choice(conds)
+                attack = AttackInfo(rand.randint(0, 999), type_, attr, cond_mag_dict)
+                defence = DefenceInfo(rand.randint(0, 500), rand.randint(0, 500), res_dict, cond)
+                expected.append(Damage(attack, defence).calc())
+
+                values = (
+                    attack.power, type_.value, attr.value,
+                    defence.physical_power, defence.magical_power,
+                    [defence.get_regist(a) for a in ATTRIBUTES],
+                    cond.value if cond is not None else 0)
+                for column, value in zip(columns, values):
+                    column.append(value)
+
+            damages = calc_damages(*columns, cond_mag_dict=cond_mag_dict)
+            with self.subTest(cond_mag_dict=cond_mag_dict):
+                self.assertEqual(expected, damages.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""compiled モジュールのテスト."""
+
+import random
+import unittest
+
+from damage import compiled
+from damage.compiled import CompiledAttack, CompiledDefence, ATTRIBUTES, CONDITION_MASK
+from damage.damage import Damage, AttackInfo, DefenceInfo, Attribute, AttackType, Condition
+
+
+class TestCompiledAttack(unittest.TestCase):
+
+    def test_init(self):
+        at = CompiledAttack(AttackInfo(10, AttackType.MAGIC, Attribute.FIRE))
+        self.assertEqual(10, at.power)
+        self.assertTrue(at.is_magic())
+        self.assertEqual((1.0,) * (CONDITION_MASK + 1), at.condition_magnifications)
+
+    def test_condition_magnifications(self):
+        cond_mag_dict = {
+            Condition.POISON: 2.0,
+            Condition.SLEEP: 1.5,
+        }
+        at = CompiledAttack(AttackInfo(0, cond_mag_dict=cond_mag_dict))
+        mags = at.condition_magnifications
+        self.assertEqual(1.0, mags[0])
+        self.assertEqual(2.0, mags[Condition.POISON.value])
+        self.assertEqual(1.5, mags[Condition.SLEEP.value])
+        self.assertEqual(2.5, mags[(Condition.POISON | Condition.SLEEP).value])
+
+
+class TestCompiledDefence(unittest.TestCase):
+
+    def test_init(self):
+        df = CompiledDefence(DefenceInfo(8, 6, {Attribute.FIRE: 0.5}))
+        self.assertEqual(8, df.physical_power)
+        self.assertEqual(6, df.magical_power)
+        self.assertEqual(0, df.conditions)
+        self.assertEqual(0.5, df.regists[ATTRIBUTES.index(Attribute.FIRE)])
+        self.assertEqual(1.0, df.regists[ATTRIBUTES.index(Attribute.WIND)])
+
+    def test_conditions(self):
+        df = CompiledDefence(DefenceInfo(0, 0, conditions=Condition.POISON | Condition.SLEEP))
+        self.assertEqual((Condition.POISON | Condition.SLEEP).value, df.conditions)
+
+
+class TestCalc(unittest.TestCase):
+
+    def test_calc(self):
+        at = CompiledAttack(AttackInfo(20, attr=Attribute.FIRE, cond_mag_dict={Condition.POISON: 1.5}))
+        df = CompiledDefence(DefenceInfo(10, 0, {Attribute.FIRE: 0.5}, Condition.POISON))
+        self.assertEqual(7, compiled.calc(at, df))
+
+    def test_same_as_damage(self):
+        rand = random.Random(1)
+        mags = [0.5, 1.1, 1.3, 1.5, 2.0, 2.7]
+        ratios = [0.0, 0.25, 0.3, 0.7, 1.0, 1.1, 1.5, 2.0, -0.5]
+        conds = [None, Condition.POISON, Condition.SLEEP, Condition.POISON | Condition.SLEEP]
+        for _ in range(2000):
+            cond_mag_dict = {c: rand.choice(mags) for c in rand.sample(list(Condition), rand.randint(0, 2))}
+            res_dict = {a: rand.choice(ratios) for a in ATTRIBUTES if rand.random() < 0.5}
+            attack = AttackInfo(
+                rand.randint(0, 999), rand.choice(list(AttackType)),
+                rand.choice(ATTRIBUTES), cond_mag_dict)
+            defence = DefenceInfo(
+                rand.randint(0, 500), rand.randint(0, 500), res_dict, rand.choice(conds))
+            self.assertEqual(
+                Damage(attack, defence).calc(),
+                compiled.calc(CompiledAttack(attack), CompiledDefence(defence)))
+
+
+if __name__ == '__main__':
+    unittest.main()
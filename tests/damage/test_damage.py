@@ -1,9 +1,16 @@
 """damage モジュールのテスト."""
 
+import copy
+import os
+import pickle
+import random
+import subprocess
+import sys
 import unittest
 from unittest import mock
 
-from damage.damage import Damage, AttackInfo, DefenceInfo, Attribute, AttackType, Condition
+from damage.damage import Damage, DamageCache, AttackInfo, DefenceInfo, Attribute, AttackType, Condition
+from damage.damage import FrozenAttackInfo, FrozenDefenceInfo, calc_damage
 
 
 class TestAttackInfo(unittest.TestCase):
@@ -33,6 +40,36 @@ class TestAttackInfo(unittest.TestCase):
         self.assertEqual(2.0, at.get_condition_magnification(Condition.POISON))
         self.assertEqual(1.0, at.get_condition_magnification(Condition.SLEEP))
 
+    def test_content_key(self):
+        at1 = AttackInfo(10, AttackType.MAGIC, Attribute.FIRE, {Condition.POISON: 2.0})
+        at2 = AttackInfo(10, AttackType.MAGIC, Attribute.FIRE, {Condition.POISON: 2.0})
+        self.assertEqual(at1.content_key, at2.content_key)
+        self.assertEqual(at1.content_hash, at2.content_hash)
+
+        self.assertNotEqual(at1.content_key, AttackInfo(11, AttackType.MAGIC, Attribute.FIRE).content_key)
+        self.assertNotEqual(at1.content_key, AttackInfo(10, AttackType.PHYSICS, Attribute.FIRE).content_key)
+        self.assertNotEqual(at1.content_key, AttackInfo(10, AttackType.MAGIC, Attribute.WATER).content_key)
+
+        # 倍率を足す順番で結果が変わりうるため、辞書の順番が違えば別のキー
+        at3 = AttackInfo(0, cond_mag_dict={Condition.POISON: 1.1, Condition.SLEEP: 1.2})
+        at4 = AttackInfo(0, cond_mag_dict={Condition.SLEEP: 1.2, Condition.POISON: 1.1})
+        self.assertNotEqual(at3.content_key, at4.content_key)
+
+    def test_content_hash_stable(self):
+        """プロセスのハッシュのシードによらず同じ値になる."""
+
+        code = (
+            'from damage.damage import AttackInfo, DefenceInfo, Attribute, Condition;'
+            'print(AttackInfo(10, attr=Attribute.FIRE, cond_mag_dict={Condition.POISON: 1.5}).content_hash,'
+            ' DefenceInfo(1, 2, {Attribute.FIRE: 0.5}, Condition.SLEEP).content_hash)')
+        outputs = set()
+        for seed in ('1', '2'):
+            env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=os.pathsep.join(sys.path))
+            outputs.add(subprocess.run(
+                [sys.executable, '-c', code], env=env, check=True,
+                capture_output=True, text=True).stdout)
+        self.assertEqual(1, len(outputs))
+
 
 class TestDefenceInfo(unittest.TestCase):
 
@@ -79,6 +116,16 @@ class TestDefenceInfo(unittest.TestCase):
         self.assertTrue(df.is_condition(Condition.POISON))
         self.assertTrue(df.is_condition(Condition.SLEEP))
 
+    def test_content_key(self):
+        df1 = DefenceInfo(8, 6, {Attribute.FIRE: 0.5, Attribute.WATER: 2.0}, Condition.POISON)
+        df2 = DefenceInfo(8, 6, {Attribute.WATER: 2.0, Attribute.FIRE: 0.5}, Condition.POISON)
+        self.assertEqual(df1.content_key, df2.content_key)
+        self.assertEqual(df1.content_hash, df2.content_hash)
+
+        self.assertNotEqual(df1.content_key, DefenceInfo(8, 6, {Attribute.FIRE: 0.5}, Condition.POISON).content_key)
+        self.assertNotEqual(df1.content_key, DefenceInfo(8, 6, df1._res_dict).content_key)
+        self.assertNotEqual(df1.content_key, DefenceInfo(6, 8, df1._res_dict, Condition.POISON).content_key)
+
 
 class TestDamage(unittest.TestCase):
 
@@ -281,5 +328,186 @@ class TestModule(unittest.TestCase):
         print(f'  {val} のダメージ!')
 
 
+class TestFrozenAttackInfo(unittest.TestCase):
+
+    def test_init(self):
+        at = FrozenAttackInfo(10, AttackType.MAGIC, Attribute.FIRE)
+        self.assertEqual(10, at.power)
+        self.assertEqual(Attribute.FIRE, at.attribute)
+        self.assertEqual({}, at.condition_magnifications)
+        self.assertTrue(at.is_magic())
+
+    def test_minus(self):
+        with self.assertRaises(ValueError):
+            FrozenAttackInfo(-10)
+
+    def test_immutable(self):
+        cond_mag_dict = {Condition.POISON: 2.0}
+        at = FrozenAttackInfo(10, cond_mag_dict=cond_mag_dict)
+        with self.assertRaises(AttributeError):
+            at._power = 20
+        with self.assertRaises(AttributeError):
+            at.extra = 1
+        with self.assertRaises(TypeError):
+            at.condition_magnifications[Condition.SLEEP] = 2.0
+
+        # 渡した辞書を変更しても影響しない
+        cond_mag_dict[Condition.POISON] = 3.0
+        self.assertEqual(2.0, at.get_condition_magnification(Condition.POISON))
+        self.assertEqual(1.0, at.get_condition_magnification(Condition.SLEEP))
+
+    def test_pickle_copy(self):
+        for at in (
+                FrozenAttackInfo(10),
+                FrozenAttackInfo(10, AttackType.MAGIC, Attribute.FIRE, {Condition.POISON: 2.0})):
+            with self.subTest(content_key=at.content_key):
+                loaded = pickle.loads(pickle.dumps(at))
+                self.assertEqual(at.content_key, loaded.content_key)
+                self.assertIs(at, copy.copy(at))
+                self.assertIs(at, copy.deepcopy(at))
+
+        # 辞書がない場合は、読み込んだ後も空の辞書を共有する
+        self.assertIs(
+            FrozenAttackInfo(1).condition_magnifications,
+            pickle.loads(pickle.dumps(FrozenAttackInfo(1))).condition_magnifications)
+
+    def test_shared_empty(self):
+        self.assertIs(
+            FrozenAttackInfo(1).condition_magnifications,
+            FrozenAttackInfo(2, cond_mag_dict={}).condition_magnifications)
+
+    def test_content_key(self):
+        cond_mag_dict = {Condition.POISON: 2.0}
+        self.assertEqual(
+            AttackInfo(10, AttackType.MAGIC, Attribute.FIRE, cond_mag_dict).content_key,
+            FrozenAttackInfo(10, AttackType.MAGIC, Attribute.FIRE, cond_mag_dict).content_key)
+
+
+class TestFrozenDefenceInfo(unittest.TestCase):
+
+    def test_init(self):
+        df = FrozenDefenceInfo(8, 6, {Attribute.FIRE: 0.5}, Condition.POISON)
+        self.assertEqual(8, df.physical_power)
+        self.assertEqual(6, df.magical_power)
+        self.assertEqual(0.5, df.get_regist(Attribute.FIRE))
+        self.assertEqual(1.0, df.get_regist(Attribute.WIND))
+        self.assertTrue(df.has_condition())
+        self.assertTrue(df.is_condition(Condition.POISON))
+        self.assertFalse(df.is_condition(Condition.SLEEP))
+
+    def test_minus(self):
+        with self.assertRaises(ValueError):
+            FrozenDefenceInfo(-10, 10)
+        with self.assertRaises(ValueError):
+            FrozenDefenceInfo(10, -10)
+
+    def test_immutable(self):
+        df = FrozenDefenceInfo(8, 6)
+        with self.assertRaises(AttributeError):
+            df._physics = 0
+        self.assertIs(df._res_dict, FrozenDefenceInfo(0, 0)._res_dict)
+
+    def test_pickle_copy(self):
+        for df in (
+                FrozenDefenceInfo(8, 6),
+                FrozenDefenceInfo(8, 6, {Attribute.FIRE: 0.5}, Condition.POISON | Condition.SLEEP)):
+            with self.subTest(content_key=df.content_key):
+                loaded = pickle.loads(pickle.dumps(df))
+                self.assertEqual(df.content_key, loaded.content_key)
+                self.assertIs(df, copy.copy(df))
+                self.assertIs(df, copy.deepcopy(df))
+
+    def test_content_key(self):
+        res_dict = {Attribute.FIRE: 0.5}
+        self.assertEqual(
+            DefenceInfo(8, 6, res_dict, Condition.SLEEP).content_key,
+            FrozenDefenceInfo(8, 6, res_dict, Condition.SLEEP).content_key)
+
+
+class TestCalcDamage(unittest.TestCase):
+
+    def test_same_as_damage(self):
+        rand = random.Random(1)
+        mags = [0.5, 1.1, 1.3, 1.5, 2.0, 2.7]
+        ratios = [0.0, 0.25, 0.3, 0.7, 1.0, 1.1, 1.5, 2.0, -0.5]
+        conds = [None, Condition.POISON, Condition.SLEEP, Condition.POISON | Condition.SLEEP]
+        for _ in range(1000):
+            cond_mag_dict = {c: rand.choice(mags) for c in rand.sample(list(Condition), rand.randint(0, 2))}
+            res_dict = {a: rand.choice(ratios) for a in Attribute if rand.random() < 0.5}
+            at_args = (
+                rand.randint(0, 999), rand.choice(list(AttackType)),
+                rand.choice(list(Attribute)), cond_mag_dict)
+            df_args = (rand.randint(0, 500), rand.randint(0, 500), res_dict, rand.choice(conds))
+
+            expected = Damage(AttackInfo(*at_args), DefenceInfo(*df_args)).calc()
+            self.assertEqual(expected, calc_damage(AttackInfo(*at_args), DefenceInfo(*df_args)))
+            self.assertEqual(
+                expected, calc_damage(FrozenAttackInfo(*at_args), FrozenDefenceInfo(*df_args)))
+            self.assertEqual(
+                expected, Damage(FrozenAttackInfo(*at_args), FrozenDefenceInfo(*df_args)).calc())
+
+
+class TestDamageCache(unittest.TestCase):
+
+    def test_calc(self):
+        cache = DamageCache()
+        at = AttackInfo(20, attr=Attribute.FIRE, cond_mag_dict={Condition.POISON: 1.5})
+        df = DefenceInfo(10, 0, {Attribute.FIRE: 0.5}, Condition.POISON)
+        self.assertEqual(7, cache.calc(at, df))
+        self.assertEqual(0, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+        # 別のインスタンスでも内容が同じならキャッシュから返す
+        at = AttackInfo(20, attr=Attribute.FIRE, cond_mag_dict={Condition.POISON: 1.5})
+        df = DefenceInfo(10, 0, {Attribute.FIRE: 0.5}, Condition.POISON)
+        with mock.patch.object(Damage, 'calc') as mp_calc:
+            self.assertEqual(7, cache.calc(at, df))
+            mp_calc.assert_not_called()
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(0.5, cache.hit_rate)
+        self.assertEqual(1, len(cache))
+
+    def test_evict(self):
+        cache = DamageCache(maxsize=2)
+        df = DefenceInfo(0, 0)
+        at1, at2, at3 = AttackInfo(1), AttackInfo(2), AttackInfo(3)
+        cache.calc(at1, df)
+        cache.calc(at2, df)
+        cache.calc(at1, df)
+        cache.calc(at3, df)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.evictions)
+
+        # at2 が最も長く使われていないため捨てられている
+        cache.calc(at1, df)
+        self.assertEqual(2, cache.hits)
+        cache.calc(at2, df)
+        self.assertEqual(4, cache.misses)
+
+    def test_mutated_dict(self):
+        """作成後に辞書を変更しても、古い値を返さない."""
+
+        cache = DamageCache()
+        cond_mag_dict = {Condition.POISON: 1.5}
+        res_dict = {Attribute.NONE: 1.0}
+        at = AttackInfo(10, cond_mag_dict=cond_mag_dict)
+        df = DefenceInfo(0, 0, res_dict, Condition.POISON)
+        self.assertEqual(15, cache.calc(at, df))
+
+        cond_mag_dict[Condition.POISON] = 3.0
+        self.assertEqual(30, cache.calc(at, df))
+        res_dict[Attribute.NONE] = 0.5
+        self.assertEqual(15, cache.calc(at, df))
+        self.assertEqual(Damage(at, df).calc(), cache.calc(at, df))
+
+    def test_clear(self):
+        cache = DamageCache()
+        cache.calc(AttackInfo(1), DefenceInfo(0, 0))
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.misses)
+        self.assertEqual(0.0, cache.hit_rate)
+
+
 if __name__ == '__main__':
     unittest.main()
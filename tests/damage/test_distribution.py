@@ -0,0 +1,97 @@
+"""distribution モジュールのテスト."""
+
+import itertools
+import unittest
+from fractions import Fraction
+
+from damage.damage import Damage, AttackInfo, DefenceInfo, Attribute, AttackType, Condition
+from damage.distribution import DamageDistribution
+
+
+class TestDamageDistribution(unittest.TestCase):
+
+    def test_fixed(self):
+        at = AttackInfo(20, attr=Attribute.FIRE, cond_mag_dict={Condition.POISON: 1.5})
+        df = DefenceInfo(10, 0, {Attribute.FIRE: 0.5}, Condition.POISON)
+        dist = DamageDistribution(at, df)
+        self.assertEqual({7: 1}, dist.probabilities)
+        self.assertEqual(7, dist.mean)
+        self.assertEqual(7, dist.percentile(50))
+
+    def test_ranges(self):
+        at = AttackInfo(0)
+        df = DefenceInfo(0, 0)
+        dist = DamageDistribution(at, df, power_range=(10, 12), defence_range=(9, 10))
+        # 差は 0〜3 で、それぞれ 1, 2, 2, 1 通り
+        self.assertEqual(
+            {0: Fraction(1, 6), 1: Fraction(2, 6), 2: Fraction(2, 6), 3: Fraction(1, 6)},
+            dist.probabilities)
+        self.assertEqual(Fraction(3, 2), dist.mean)
+        self.assertEqual(0, dist.percentile(0))
+        self.assertEqual(1, dist.percentile(50))
+        self.assertEqual(2, dist.percentile(51))
+        self.assertEqual(3, dist.percentile(100))
+        self.assertEqual(0, dist.get_probability(4))
+
+    def test_clamp(self):
+        at = AttackInfo(0)
+        df = DefenceInfo(0, 0)
+        dist = DamageDistribution(at, df, power_range=(0, 2), defence_range=(1, 2))
+        self.assertEqual({0: Fraction(5, 6), 1: Fraction(1, 6)}, dist.probabilities)
+
+    def test_conditions(self):
+        at = AttackInfo(10, cond_mag_dict={Condition.POISON: 2.0, Condition.SLEEP: 1.5})
+        df = DefenceInfo(0, 0)
+        dist = DamageDistribution(
+            at, df, cond_prob_dict={Condition.POISON: 0.5, Condition.SLEEP: 0.25})
+        self.assertEqual(
+            {10: Fraction(3, 8), 15: Fraction(1, 8), 20: Fraction(3, 8), 25: Fraction(1, 8)},
+            dist.probabilities)
+        self.assertEqual(Fraction(65, 4), dist.mean)
+
+    def test_invalid(self):
+        at = AttackInfo(10)
+        df = DefenceInfo(0, 0)
+        with self.assertRaises(ValueError):
+            DamageDistribution(at, df, power_range=(-1, 10))
+        with self.assertRaises(ValueError):
+            DamageDistribution(at, df, defence_range=(5, 4))
+        with self.assertRaises(ValueError):
+            DamageDistribution(at, df, cond_prob_dict={Condition.POISON: 1.5})
+        with self.assertRaises(ValueError):
+            DamageDistribution(at, df).percentile(101)
+
+    def test_same_as_damage(self):
+        """すべての組み合わせを Damage で計算した結果と一致する."""
+
+        cond_mag_dict = {Condition.SLEEP: 1.3, Condition.POISON: 1.7}
+        res_dict = {Attribute.WATER: 0.7}
+        cond_prob_dict = {Condition.POISON: 0.3, Condition.SLEEP: 0.6}
+        for type_ in AttackType:
+            at = AttackInfo(0, type_, Attribute.WATER, cond_mag_dict)
+            dist = DamageDistribution(
+                at, DefenceInfo(0, 0, res_dict),
+                power_range=(20, 35), defence_range=(5, 27), cond_prob_dict=cond_prob_dict)
+
+            expected = {}
+            for power, df_pow, poison, sleep in itertools.product(
+                    range(20, 36), range(5, 28), (False, True), (False, True)):
+                conditions = None
+                prob = Fraction(1, 16 * 23)
+                for cond, on in ((Condition.POISON, poison), (Condition.SLEEP, sleep)):
+                    p = Fraction(cond_prob_dict[cond])
+                    prob *= p if on else 1 - p
+                    if on:
+                        conditions = cond if conditions is None else conditions | cond
+                damage = Damage(
+                    AttackInfo(power, type_, Attribute.WATER, cond_mag_dict),
+                    DefenceInfo(df_pow, df_pow, res_dict, conditions)).calc()
+                expected[damage] = expected.get(damage, 0) + prob
+
+            with self.subTest(type_=type_):
+                self.assertEqual(expected, dist.probabilities)
+                self.assertEqual(1, sum(dist.probabilities.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
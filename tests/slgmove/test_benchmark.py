@@ -0,0 +1,83 @@
+"""benchmark モジュールのテスト."""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from slgmove import benchmark
+from slgmove.main import Engine
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_generate_map(self):
+        map1 = benchmark.generate_map(16, 'rough', 0.1, seed=1)
+        map2 = benchmark.generate_map(16, 'rough', 0.1, seed=1)
+        map3 = benchmark.generate_map(16, 'rough', 0.1, seed=2)
+        self.assertEqual(16, map1.width)
+        self.assertEqual(16, map1.height)
+        self.assertEqual(map1.type_grid.to_list(), map2.type_grid.to_list())
+        self.assertEqual(map1.get_unit_indices(), map2.get_unit_indices())
+        self.assertNotEqual(map1.type_grid.to_list(), map3.type_grid.to_list())
+        self.assertEqual(25, len(map1.get_unit_indices()))
+
+    def test_generate_units(self):
+        map_ = benchmark.generate_map(8, 'plain', 0.5)
+        units = benchmark.generate_units(map_, 3, 4)
+        occupied = map_.get_unit_indices()
+        self.assertEqual(4, len(units))
+        for unit in units:
+            self.assertEqual(3, unit.move)
+            index = map_.cost_grid.index(unit.position.x, unit.position.y)
+            self.assertNotIn(index, occupied)
+
+    def test_get_engines(self):
+        engines = benchmark.get_engines(benchmark.Case(16, 'plain', 0, 4))
+        self.assertIn(Engine.RECURSIVE, engines)
+        engines = benchmark.get_engines(benchmark.Case(64, 'plain', 0, 4))
+        self.assertNotIn(Engine.RECURSIVE, engines)
+
+    def test_run(self):
+        cases = [benchmark.Case(8, 'maze', 0.05, 3)]
+        results = benchmark.run(cases, repeat=1, units=2)
+        self.assertIn('calc[QUEUE] 8x8 maze d=0.05 m=3', results)
+        for result in results.values():
+            self.assertLessEqual(0.0, result['time'])
+            self.assertLessEqual(0, result['peak'])
+
+    def test_compare(self):
+        baseline = {
+            'a': {'time': 1.0, 'peak': 100},
+            'b': {'time': 1.0, 'peak': 100},
+        }
+        results = {
+            'a': {'time': 1.1, 'peak': 100},
+            'b': {'time': 1.5, 'peak': 100},
+            'c': {'time': 9.0, 'peak': 900},
+        }
+        regressions = benchmark.compare(results, baseline, tolerance=0.2)
+        self.assertEqual(1, len(regressions))
+        self.assertTrue(regressions[0].startswith('b: time'))
+
+    def test_main(self):
+        cases = [benchmark.Case(8, 'rough', 0.05, 3)]
+        with tempfile.TemporaryDirectory() as dir_:
+            path = Path(dir_) / 'baseline.json'
+            with mock.patch.object(benchmark, 'QUICK_CASES', cases), \
+                    mock.patch('builtins.print'):
+                ret = benchmark.main(['--quick', '--repeat', '1', '--save', str(path)])
+                self.assertEqual(0, ret)
+
+                # 基準値より遅ければ失敗する
+                baseline = json.loads(path.read_text(encoding='utf-8'))
+                for result in baseline.values():
+                    result['time'] = 0.0
+                path.write_text(json.dumps(baseline), encoding='utf-8')
+                ret = benchmark.main(['--quick', '--repeat', '1', '--baseline', str(path)])
+                self.assertEqual(1, ret)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""chunk モジュールのテスト."""
+
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from slgmove import chunk
+from slgmove.chunk import ChunkedMap
+from slgmove.grid import SparseGrid
+from slgmove.main import Unit, Map, MoveMap, Ground, Engine
+from slgmove.position import GridPosition
+
+_GROUND_DICT = {
+    0: Ground(1),
+    1: Ground(Ground.COST_FORBIDDEN),
+    2: Ground(2),
+}
+
+
+def _create_map(width, height):
+    rand = random.Random(0)
+    ground_types = [
+        [rand.choice([0, 0, 0, 1, 2]) for _ in range(width)]
+        for _ in range(height)]
+    return Map(ground_types, _GROUND_DICT)
+
+
+class TestChunkedMap(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._dir.name)
+        self._map = _create_map(20, 15)
+        chunk.save_chunks(self._map, self._path, chunk_size=8)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_save_chunks(self):
+        # 20x15 を 8x8 で分けると 3x2 個
+        for cy in range(2):
+            for cx in range(3):
+                self.assertTrue(chunk.get_chunk_path(self._path, cx, cy).exists())
+        self.assertFalse(chunk.get_chunk_path(self._path, 3, 0).exists())
+
+    def test_open(self):
+        map_ = ChunkedMap.open(self._path, max_chunks=2)
+        self.assertEqual(20, map_.width)
+        self.assertEqual(15, map_.height)
+        self.assertEqual(8, map_.chunk_size)
+        self.assertEqual(0, map_.loaded_count)
+
+        for y in range(15):
+            for x in range(20):
+                pos = GridPosition(x, y)
+                self.assertEqual(self._map.get_type(pos), map_.get_type(pos))
+                self.assertEqual(self._map.get_cost(pos), map_.get_cost(pos))
+                self.assertLessEqual(map_.loaded_count, 2)
+        self.assertEqual(
+            self._map.cost_grid.to_list(), map_.cost_grid.to_list())
+        pos = GridPosition(3, 4)
+        self.assertEqual(map_.get_cost(pos), map_.get_ground(pos).cost)
+
+    def test_lazy_load(self):
+        loaded = []
+
+        def loader(cx, cy):
+            loaded.append((cx, cy))
+            return chunk.mapfile.load(chunk.get_chunk_path(self._path, cx, cy))
+
+        map_ = ChunkedMap(20, 15, _GROUND_DICT, loader, 8, max_chunks=2)
+        map_.get_cost(GridPosition(0, 0))
+        map_.get_cost(GridPosition(7, 7))
+        self.assertEqual([(0, 0)], loaded)
+
+        map_.get_cost(GridPosition(8, 0))
+        map_.get_cost(GridPosition(0, 8))
+        self.assertEqual(2, map_.loaded_count)
+        # (0, 0) は捨てられているので読み直す
+        map_.get_cost(GridPosition(0, 0))
+        self.assertEqual([(0, 0), (1, 0), (0, 1), (0, 0)], loaded)
+
+    def test_move_map(self):
+        map_ = ChunkedMap.open(self._path, max_chunks=2)
+        self._map.add_unit(Unit(GridPosition(10, 7)))
+        map_.add_unit(Unit(GridPosition(10, 7)))
+
+        unit = Unit(GridPosition(9, 8), move=5)
+        expected = MoveMap(self._map)
+        expected.calc(unit)
+        move_map = MoveMap(map_)
+        self.assertIsInstance(move_map._moves, SparseGrid)
+        move_map.calc(unit)
+        self.assertEqual(expected._moves.to_list(), move_map._moves.to_list())
+        self.assertEqual(expected.get_reach_set(), move_map.get_reach_set())
+        self.assertLessEqual(map_.loaded_count, 2)
+
+        with self.assertRaises(NotImplementedError):
+            MoveMap(map_, Engine.NUMPY).calc(unit)
+
+    def test_find_path(self):
+        map_ = ChunkedMap.open(self._path, max_chunks=2)
+        start = GridPosition(1, 1)
+        goal = GridPosition(18, 13)
+        expected = self._map.find_path(start, goal)
+        path = map_.find_path(start, goal)
+        self.assertEqual(
+            sum(self._map.get_cost(p) for p in expected[1:]),
+            sum(map_.get_cost(p) for p in path[1:]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""flowfield モジュールのテスト."""
+
+import random
+import unittest
+
+from slgmove.flowfield import FlowField, Direction
+from slgmove.main import Map, Ground
+from slgmove.position import GridPosition
+
+_GROUND_TYPES = [
+    [0, 0, 0, 0, 0],
+    [0, 1, 1, 1, 0],
+    [0, 0, 0, 1, 0],
+    [2, 2, 0, 0, 0],
+]
+
+_GROUND_DICT = {
+    0: Ground(1),
+    1: Ground(Ground.COST_FORBIDDEN),
+    2: Ground(3),
+}
+
+
+def _get_cost(map_, path):
+    return sum(map_.get_cost(pos) for pos in path[1:])
+
+
+class TestFlowField(unittest.TestCase):
+
+    def test_init(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        flow = FlowField(map_)
+        self.assertEqual(FlowField.UNSET_VALUE, flow.get_distance(GridPosition(0, 0)))
+        self.assertEqual(Direction.NONE, flow.get_direction(GridPosition(0, 0)))
+
+    def test_calc(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        flow = FlowField(map_)
+        flow.calc([GridPosition(0, 0)])
+        self.assertEqual(
+            [
+                [0, 1, 2, 3, 4],
+                [1, -1, -1, -1, 5],
+                [2, 3, 4, -1, 6],
+                [3, 4, 5, 6, 7],
+            ],
+            flow.distance_grid.to_list())
+        self.assertEqual(Direction.NONE, flow.get_direction(GridPosition(0, 0)))
+        self.assertEqual(Direction.LEFT, flow.get_direction(GridPosition(4, 0)))
+        self.assertEqual(Direction.UP, flow.get_direction(GridPosition(0, 3)))
+        self.assertEqual(Direction.NONE, flow.get_direction(GridPosition(1, 1)))
+
+    def test_calc_goal_cost(self):
+        # 目的地への進入にもコストがかかる
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        flow = FlowField(map_)
+        flow.calc([GridPosition(0, 3)])
+        self.assertEqual(3, flow.get_distance(GridPosition(0, 2)))
+        self.assertEqual(3, flow.get_distance(GridPosition(1, 3)))
+        self.assertEqual(6, flow.get_distance(GridPosition(2, 3)))
+
+    def test_calc_many_goals(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        flow = FlowField(map_)
+        flow.calc([GridPosition(0, 0), GridPosition(4, 3)])
+        self.assertEqual(0, flow.get_distance(GridPosition(4, 3)))
+        self.assertEqual(3, flow.get_distance(GridPosition(4, 0)))
+        self.assertEqual(2, flow.get_distance(GridPosition(2, 0)))
+        self.assertEqual(2, flow.get_distance(GridPosition(2, 3)))
+
+    def test_calc_invalid_goals(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        flow = FlowField(map_)
+        flow.calc([GridPosition(1, 1), GridPosition(9, 9)])
+        self.assertTrue(all(
+            d == FlowField.UNSET_VALUE
+            for line in flow.distance_grid.to_list() for d in line))
+
+    def test_calc_reset(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        flow = FlowField(map_)
+        flow.calc([GridPosition(0, 0)])
+        flow.calc([GridPosition(4, 0)])
+        self.assertEqual(0, flow.get_distance(GridPosition(4, 0)))
+        self.assertEqual(4, flow.get_distance(GridPosition(0, 0)))
+        self.assertEqual(Direction.RIGHT, flow.get_direction(GridPosition(0, 0)))
+
+    def test_get_next(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        flow = FlowField(map_)
+        goal = GridPosition(4, 3)
+        flow.calc([goal])
+
+        pos = GridPosition(0, 2)
+        path = [pos]
+        while True:
+            pos = flow.get_next(pos)
+            if pos is None:
+                break
+            path.append(pos)
+        self.assertEqual(goal, path[-1])
+        self.assertEqual(flow.get_distance(GridPosition(0, 2)), _get_cost(map_, path))
+        self.assertIsNone(flow.get_next(GridPosition(1, 1)))
+
+    def test_find_path(self):
+        # 結果が find_path の最小コストと一致する
+        rand = random.Random(0)
+        for _ in range(20):
+            types = [[rand.choice([0, 0, 0, 1, 2]) for _ in range(8)] for _ in range(8)]
+            types[0][0] = 0
+            map_ = Map(types, _GROUND_DICT)
+            goal = GridPosition(0, 0)
+            flow = FlowField(map_)
+            flow.calc([goal])
+            for y in range(8):
+                for x in range(8):
+                    start = GridPosition(x, y)
+                    if map_.get_cost(start) == Ground.COST_FORBIDDEN:
+                        continue
+                    path = map_.find_path(start, goal)
+                    if path is None:
+                        self.assertEqual(FlowField.UNSET_VALUE, flow.get_distance(start))
+                    else:
+                        self.assertEqual(_get_cost(map_, path), flow.get_distance(start))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+"""grid モジュールのテスト."""
+
+import unittest
+
+from slgmove import vector
+from slgmove.grid import Grid, SparseGrid, fit_typecode, align_offset, layout_grids
+
+
+class TestFitTypecode(unittest.TestCase):
+
+    def test_fit(self):
+        self.assertEqual('b', fit_typecode([-1, 0, 127]))
+        self.assertEqual('h', fit_typecode([-1, 128]))
+        self.assertEqual('i', fit_typecode([1 << 20]))
+        self.assertEqual('q', fit_typecode([1 << 40]))
+        self.assertEqual('b', fit_typecode([]))
+
+        with self.assertRaises(OverflowError):
+            fit_typecode([1 << 64])
+
+
+class TestLayoutGrids(unittest.TestCase):
+
+    def test_align_offset(self):
+        self.assertEqual(0, align_offset(0))
+        self.assertEqual(8, align_offset(1))
+        self.assertEqual(8, align_offset(8))
+        self.assertEqual(16, align_offset(9))
+
+    def test_layout(self):
+        # 3 × 2 の 'b' は 6 バイトのため、次の 'i' は境界の 8 から
+        self.assertEqual([(8, 6), (16, 24)], layout_grids(5, 3, 2, ('b', 'i')))
+        self.assertEqual([], layout_grids(0, 3, 2, ()))
+
+
+class TestGrid(unittest.TestCase):
+
+    def test_init(self):
+        grid = Grid(3, 2, 'i', -1)
+        self.assertEqual(3, grid.width)
+        self.assertEqual(2, grid.height)
+        self.assertEqual('i', grid.typecode)
+        self.assertEqual(6, len(grid.data))
+        self.assertEqual([[-1, -1, -1], [-1, -1, -1]], grid.to_list())
+
+    def test_from_list(self):
+        lines = [
+            [1, 2, 3],
+            [4, 5, 300],
+        ]
+        grid = Grid.from_list(lines)
+        self.assertEqual('h', grid.typecode)
+        self.assertEqual(lines, grid.to_list())
+        self.assertEqual(300, grid.get(2, 1))
+        self.assertEqual(5, grid.index(2, 1))
+
+        with self.assertRaises(AssertionError):
+            Grid.from_list([[1, 2], [3]])
+
+    def test_set(self):
+        grid = Grid(3, 2)
+        grid.set(1, 1, 5)
+        self.assertEqual(5, grid.get(1, 1))
+        self.assertEqual(5, grid.data[4])
+
+    def test_out_of_range(self):
+        grid = Grid.from_list([[1, 2, 3], [4, 5, 6]])
+        # 右端を超えても次の行に回り込まない
+        for x, y in ((3, 0), (-1, 1), (0, 2), (0, -1)):
+            with self.subTest(x=x, y=y):
+                with self.assertRaises(IndexError):
+                    grid.get(x, y)
+                with self.assertRaises(IndexError):
+                    grid.set(x, y, 0)
+
+    def test_fill(self):
+        grid = Grid(3, 2)
+        data = grid.data
+        grid.fill(7)
+        self.assertEqual([[7, 7, 7], [7, 7, 7]], grid.to_list())
+        # 配列は作り直さない
+        self.assertIs(data, grid.data)
+
+
+    def test_from_buffer(self):
+        buffer = bytearray([1, 2, 3, 4, 5, 6])
+        grid = Grid.from_buffer(3, 2, 'b', buffer)
+        self.assertEqual([[1, 2, 3], [4, 5, 6]], grid.to_list())
+
+        # バッファを共有する
+        grid.set(0, 1, 9)
+        self.assertEqual(9, buffer[3])
+        grid.fill(0)
+        self.assertEqual(bytearray(6), buffer)
+
+        with self.assertRaises(TypeError):
+            Grid.from_buffer(3, 2, 'b', bytes(6)).set(0, 0, 1)
+
+    def test_to_string(self):
+        grid = Grid.from_list([[1, -1, 10], [0, 0, 2]])
+        self.assertEqual('1 -1 10 \n0 0 2 \n', grid.to_string())
+        self.assertEqual(' 1 -1 10 \n 0  0  2 \n', grid.to_string(2))
+
+    def test_to_bytes(self):
+        grid = Grid.from_list([[1, 2], [3, 300]], 'h')
+        data = grid.to_bytes()
+        self.assertEqual(8, len(data))
+        self.assertEqual(grid.to_list(), Grid.from_buffer(2, 2, 'h', bytearray(data)).to_list())
+
+    @unittest.skipUnless(vector.is_available(), 'numpy is not installed')
+    def test_to_numpy(self):
+        grid = Grid.from_list([[1, 2, 3], [4, 5, 6]])
+        array = grid.to_numpy()
+        self.assertEqual((2, 3), array.shape)
+        self.assertEqual(grid.to_list(), array.tolist())
+
+        # コピーを返す
+        array[0, 0] = 9
+        self.assertEqual(1, grid.get(0, 0))
+
+    def test_to_rle(self):
+        lines = [
+            [-1, -1, -1, 2],
+            [2, 2, -1, -1],
+        ]
+        grid = Grid.from_list(lines)
+        runs = grid.to_rle()
+        self.assertEqual([(-1, 3), (2, 3), (-1, 2)], runs)
+        self.assertEqual(lines, Grid.from_rle(4, 2, runs).to_list())
+        self.assertEqual('i', Grid.from_rle(4, 2, runs, 'i').typecode)
+
+        with self.assertRaises(AssertionError):
+            Grid.from_rle(4, 2, [(0, 7)])
+
+
+class TestSparseGrid(unittest.TestCase):
+
+    def test_get_set(self):
+        grid = SparseGrid(3, 2, -1)
+        self.assertEqual(3, grid.width)
+        self.assertEqual(2, grid.height)
+        self.assertEqual(-1, grid.get(2, 1))
+        self.assertEqual(0, len(grid.data))
+
+        grid.set(2, 1, 4)
+        self.assertEqual(4, grid.get(2, 1))
+        self.assertEqual({5: 4}, grid.data)
+        self.assertEqual([[-1, -1, -1], [-1, -1, 4]], grid.to_list())
+
+    def test_out_of_range(self):
+        grid = SparseGrid(3, 2, -1)
+        for x, y in ((3, 0), (-1, 1), (0, 2), (0, -1)):
+            with self.subTest(x=x, y=y):
+                with self.assertRaises(IndexError):
+                    grid.get(x, y)
+                with self.assertRaises(IndexError):
+                    grid.set(x, y, 0)
+        self.assertEqual(0, len(grid.data))
+
+    def test_fill(self):
+        grid = SparseGrid(3, 2, -1)
+        grid.set(0, 0, 1)
+        grid.fill(0)
+        self.assertEqual(0, len(grid.data))
+        self.assertEqual(0, grid.get(0, 0))
+
+    def test_export(self):
+        grid = SparseGrid(3, 2, -1)
+        grid.set(1, 0, 5)
+        self.assertEqual([[-1, 5, -1], [-1, -1, -1]], grid.to_grid().to_list())
+        self.assertEqual('-1 5 -1 \n-1 -1 -1 \n', grid.to_string())
+        self.assertEqual([(-1, 1), (5, 1), (-1, 4)], grid.to_rle())
+        self.assertEqual(6, len(grid.to_bytes()))
+
+
+if __name__ == '__main__':
+    unittest.main()
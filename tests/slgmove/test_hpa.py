@@ -0,0 +1,130 @@
+"""hpa モジュールのテスト."""
+
+import random
+import unittest
+
+from slgmove.hpa import HierarchicalMap
+from slgmove.main import Map, Ground
+from slgmove.position import GridPosition
+
+_GROUND_DICT = {
+    0: Ground(1),
+    1: Ground(Ground.COST_FORBIDDEN),
+    2: Ground(3),
+}
+
+
+def _create_map(rand, width, height):
+    types = [
+        [rand.choice([0, 0, 0, 1, 2]) for _ in range(width)]
+        for _ in range(height)]
+    return Map(types, _GROUND_DICT)
+
+
+def _get_cost(map_, path):
+    return sum(map_.get_cost(pos) for pos in path[1:])
+
+
+class TestHierarchicalMap(unittest.TestCase):
+
+    def _assert_path(self, map_, path, start, goal):
+        self.assertEqual(start, path[0])
+        self.assertEqual(goal, path[-1])
+        for pos, next_pos in zip(path, path[1:]):
+            self.assertEqual(1, pos.calc_distance(next_pos))
+            self.assertNotEqual(Ground.COST_FORBIDDEN, map_.get_cost(next_pos))
+
+    def test_init(self):
+        map_ = Map([[0] * 10 for _ in range(7)], _GROUND_DICT)
+        hpa = HierarchicalMap(map_, 4)
+        self.assertEqual(4, hpa.cluster_size)
+        self.assertEqual(6, hpa.cluster_count)
+        # 境界ごとに1組の出入口
+        self.assertEqual(14, hpa.node_count)
+        self.assertEqual(
+            [GridPosition(3, 2), GridPosition(2, 3)],
+            hpa.get_nodes(0, 0))
+
+    def test_init_entrances(self):
+        # 両側とも進入できる区間ごとに、中央の1組を出入口とする
+        types = [
+            [0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 1, 0, 0],
+            [0, 0, 0, 0, 0, 0],
+        ]
+        map_ = Map(types, _GROUND_DICT)
+        hpa = HierarchicalMap(map_, 3)
+        self.assertEqual(
+            [GridPosition(2, 1), GridPosition(1, 2)],
+            hpa.get_nodes(0, 0))
+        self.assertEqual(
+            [GridPosition(3, 1), GridPosition(5, 2)],
+            hpa.get_nodes(1, 0))
+        self.assertEqual(
+            [GridPosition(1, 3), GridPosition(2, 3)],
+            hpa.get_nodes(0, 1))
+
+    def test_find_path(self):
+        rand = random.Random(0)
+        for _ in range(10):
+            map_ = _create_map(rand, 20, 15)
+            hpa = HierarchicalMap(map_, 5)
+            for _ in range(30):
+                start = GridPosition(rand.randrange(20), rand.randrange(15))
+                goal = GridPosition(rand.randrange(20), rand.randrange(15))
+                if map_.get_cost(start) == Ground.COST_FORBIDDEN:
+                    self.assertIsNone(hpa.find_path(start, goal))
+                    continue
+                expected = map_.find_path(start, goal)
+                path = hpa.find_path(start, goal)
+                if expected is None:
+                    self.assertIsNone(path)
+                    continue
+                self._assert_path(map_, path, start, goal)
+                self.assertLessEqual(_get_cost(map_, expected), _get_cost(map_, path))
+
+    def test_find_path_straight(self):
+        map_ = Map([[0] * 12 for _ in range(3)], _GROUND_DICT)
+        hpa = HierarchicalMap(map_, 4)
+        path = hpa.find_path(GridPosition(0, 1), GridPosition(11, 1))
+        self._assert_path(map_, path, GridPosition(0, 1), GridPosition(11, 1))
+        self.assertEqual(11, _get_cost(map_, path))
+
+    def test_find_path_invalid(self):
+        types = [
+            [0, 1, 0],
+            [0, 1, 0],
+        ]
+        map_ = Map(types, _GROUND_DICT)
+        hpa = HierarchicalMap(map_, 2)
+        self.assertEqual([GridPosition(0, 0)], hpa.find_path(GridPosition(0, 0), GridPosition(0, 0)))
+        self.assertIsNone(hpa.find_path(GridPosition(0, 0), GridPosition(2, 0)))
+        self.assertIsNone(hpa.find_path(GridPosition(0, 0), GridPosition(1, 0)))
+        self.assertIsNone(hpa.find_path(GridPosition(0, 0), GridPosition(5, 0)))
+        self.assertIsNone(hpa.find_path(GridPosition(1, 0), GridPosition(0, 0)))
+
+    def test_update(self):
+        rand = random.Random(1)
+        for _ in range(20):
+            map_ = _create_map(rand, 13, 11)
+            hpa = HierarchicalMap(map_, 4)
+            positions = []
+            for _ in range(rand.randrange(1, 6)):
+                pos = GridPosition(rand.randrange(13), rand.randrange(11))
+                map_.set_type(pos, rand.choice([0, 1, 2]))
+                positions.append(pos)
+            hpa.update(positions)
+
+            expected = HierarchicalMap(map_, 4)
+            for cy in range(3):
+                for cx in range(4):
+                    self.assertEqual(expected.get_nodes(cx, cy), hpa.get_nodes(cx, cy))
+            for _ in range(10):
+                start = GridPosition(rand.randrange(13), rand.randrange(11))
+                goal = GridPosition(rand.randrange(13), rand.randrange(11))
+                self.assertEqual(expected.find_path(start, goal), hpa.find_path(start, goal))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,18 @@
 """slgmove モジュールのテスト."""
 
+import contextlib
+import gc
+import io
+import random
 import unittest
+from unittest import mock
 
-from slgmove.position import GridPosition
-from slgmove.main import Unit, Map, MoveMap, Ground
+from slgmove import vector
+from slgmove.position import GridPosition, Topology
+from slgmove.stats import MoveStats
+from slgmove.main import (
+    Unit, Map, MoveMap, Ground, Engine, MoveRange, MoveRangeCache, ReachSet,
+    get_neighbors)
 
 _GROUND_TYPES1 = [
     [1, 1, 1, 1, 1],
@@ -73,6 +82,71 @@ class TestMap(unittest.TestCase):
             GridPosition(4, 3))
         self.assertIsNone(ret_unit)
 
+    def test_remove_unit(self):
+        unit = Unit(GridPosition(3, 2))
+        map_ = _create_map1()
+        map_.add_unit(unit)
+        map_.remove_unit(unit)
+        self.assertIsNone(map_.find_unit_from_pos(GridPosition(3, 2)))
+
+        # 取り除いた後の移動は反映されない
+        unit.set_position(GridPosition(1, 1))
+        self.assertIsNone(map_.find_unit_from_pos(GridPosition(1, 1)))
+
+        # 存在しないユニットは無視
+        map_.remove_unit(unit)
+
+    def test_unit_moved(self):
+        unit = Unit(GridPosition(3, 2))
+        map_ = _create_map1()
+        map_.add_unit(unit)
+        map_.add_unit(unit)
+
+        unit.set_position(GridPosition(1, 1))
+        self.assertIsNone(map_.find_unit_from_pos(GridPosition(3, 2)))
+        self.assertIs(unit, map_.find_unit_from_pos(GridPosition(1, 1)))
+
+    def test_stacked_units(self):
+        """同じ位置に複数のユニットがいる場合、1体が去ってもいる扱いのまま."""
+
+        unit_a = Unit(GridPosition(1, 1))
+        unit_b = Unit(GridPosition(1, 1))
+        map_ = _create_map1()
+        map_.add_unit(unit_a)
+        map_.add_unit(unit_b)
+        self.assertIs(unit_a, map_.find_unit_from_pos(GridPosition(1, 1)))
+
+        map_.remove_unit(unit_b)
+        self.assertIs(unit_a, map_.find_unit_from_pos(GridPosition(1, 1)))
+        self.assertFalse(map_.can_move(GridPosition(1, 1), 1))
+
+        map_.add_unit(unit_b)
+        unit_a.set_position(GridPosition(2, 1))
+        self.assertIs(unit_b, map_.find_unit_from_pos(GridPosition(1, 1)))
+        self.assertEqual({6, 7}, map_.get_unit_indices())
+
+    def test_unit_maps_released(self):
+        """ユニットを追加したマップは、ユニットがあっても解放される."""
+
+        unit = Unit(GridPosition(1, 1))
+        for _ in range(10):
+            _create_map1().add_unit(unit)
+        gc.collect()
+        self.assertEqual(0, len(unit._maps))
+
+        map_ = _create_map1()
+        map_.add_unit(unit)
+        unit.set_position(GridPosition(2, 1))
+        self.assertIs(unit, map_.find_unit_from_pos(GridPosition(2, 1)))
+
+    def test_get_unit_indices(self):
+        map_ = _create_map1()
+        map_.add_unit(Unit(GridPosition(3, 2)))
+        map_.add_unit(Unit(GridPosition(1, 1)))
+        # 範囲外のユニットは含まない
+        map_.add_unit(Unit(GridPosition(5, 0)))
+        self.assertEqual({13, 6}, map_.get_unit_indices())
+
     def test_get_cost(self):
         map_ = _create_map1()
         self.assertEqual(Ground.COST_FORBIDDEN, map_.get_cost(GridPosition(0, 0)))
@@ -81,6 +155,53 @@ class TestMap(unittest.TestCase):
         map_ = _create_map2()
         self.assertEqual(2, map_.get_cost(GridPosition(2, 2)))
 
+        # 右端を超えた位置は次の行のセルにならない
+        with self.assertRaises(IndexError):
+            map_.get_cost(GridPosition(map_.width, 0))
+
+    def test_grids(self):
+        map_ = _create_map2()
+        self.assertEqual(_GROUND_TYPES2, map_.type_grid.to_list())
+        self.assertEqual('b', map_.type_grid.typecode)
+        self.assertEqual(2, map_.cost_grid.get(4, 3))
+        self.assertEqual(Ground.COST_FORBIDDEN, map_.cost_grid.get(0, 0))
+
+    def test_set_type(self):
+        map_ = Map([list(line) for line in _GROUND_TYPES2], _GROUND_DICT)
+        pos = GridPosition(1, 1)
+        map_.set_type(pos, 2)
+        self.assertEqual(2, map_.get_type(pos))
+        self.assertEqual(2, map_.get_cost(pos))
+
+        with self.assertRaises(KeyError):
+            map_.set_type(pos, 9)
+
+    def test_set_type_unused(self):
+        """マップにまだない地面タイプにも変更できる."""
+
+        ground_dict = dict(_GROUND_DICT)
+        ground_dict[300] = Ground(3)
+        map_ = Map([list(line) for line in _GROUND_TYPES2], ground_dict)
+        pos = GridPosition(1, 1)
+        map_.set_type(pos, 300)
+        self.assertEqual(300, map_.get_type(pos))
+        self.assertEqual(3, map_.get_cost(pos))
+
+    def test_version(self):
+        map_ = Map([list(line) for line in _GROUND_TYPES2], _GROUND_DICT)
+        self.assertEqual(0, map_.version)
+
+        map_.set_type(GridPosition(1, 1), 2)
+        self.assertEqual(1, map_.version)
+
+        unit = Unit(GridPosition(1, 1))
+        map_.add_unit(unit)
+        self.assertEqual(2, map_.version)
+        unit.set_position(GridPosition(2, 1))
+        self.assertEqual(3, map_.version)
+        map_.remove_unit(unit)
+        self.assertEqual(4, map_.version)
+
     def test_get_ground(self):
         map_ = _create_map1()
         g = map_.get_ground(GridPosition(0, 0))
@@ -134,6 +255,52 @@ class TestMap(unittest.TestCase):
         can = map_.can_move(pos, 1)
         self.assertFalse(can)
 
+    def test_find_path(self):
+        map_ = _create_map2()
+        map_.add_unit(Unit(GridPosition(3, 2)))
+
+        path = map_.find_path(GridPosition(3, 3), GridPosition(3, 1))
+        self.assertEqual(5, len(path))
+        self.assertEqual((3, 3), path[0])
+        self.assertEqual((3, 1), path[-1])
+        self.assertNotIn((3, 2), path)
+        for pos, next_pos in zip(path, path[1:]):
+            self.assertEqual(1, pos.calc_distance(next_pos))
+        # コスト 2 のセルを1つ通る回り道が最小
+        self.assertEqual(5, sum(map_.get_cost(p) for p in path[1:]))
+
+        # その場
+        self.assertEqual(
+            [(3, 3)], map_.find_path(GridPosition(3, 3), GridPosition(3, 3)))
+
+        # 進入不可・ユニットがいる・範囲外
+        self.assertIsNone(
+            map_.find_path(GridPosition(3, 3), GridPosition(0, 0)))
+        self.assertIsNone(
+            map_.find_path(GridPosition(3, 3), GridPosition(3, 2)))
+        self.assertIsNone(
+            map_.find_path(GridPosition(3, 3), GridPosition(9, 9)))
+
+    def test_find_path_cost(self):
+        ground_types = [
+            [0, 0, 0],
+            [3, 1, 0],
+            [0, 0, 0],
+        ]
+        ground_dict = dict(_GROUND_DICT)
+        ground_dict[3] = Ground(9)
+        map_ = Map(ground_types, ground_dict)
+        # 下のコスト 9 を通るより、右回りの方が安い
+        path = map_.find_path(GridPosition(0, 0), GridPosition(0, 2))
+        self.assertEqual(
+            [(0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (1, 2), (0, 2)], path)
+
+        # ユニットがいると右回りできない
+        map_.add_unit(Unit(GridPosition(1, 0)))
+        self.assertEqual(
+            [(0, 0), (0, 1), (0, 2)],
+            map_.find_path(GridPosition(0, 0), GridPosition(0, 2)))
+
 
 class TestGround(unittest.TestCase):
 
@@ -155,8 +322,8 @@ class TestMoveMap(unittest.TestCase):
         map_ = _create_map1()
         move_map = MoveMap(map_)
         self.assertIs(map_, move_map._map)
-        self.assertEqual(map_.height, len(move_map._moves))
-        self.assertEqual(map_.width, len(move_map._moves[0]))
+        self.assertEqual(map_.height, move_map._moves.height)
+        self.assertEqual(map_.width, move_map._moves.width)
         self.assertEqual(MoveMap.UNSET_VALUE, move_map.get_step(GridPosition(1, 1)))
 
     def test_calc(self):
@@ -177,7 +344,164 @@ class TestMoveMap(unittest.TestCase):
             [-1, 0, 1, 2, 1, 0, -1],
             [-1, -1, -1, -1, -1, -1, -1],
         ]
-        self.assertEqual(expected, move_map._moves)
+        self.assertEqual(expected, move_map._moves.to_list())
+
+    def test_calc_engines(self):
+        for engine in Engine:
+            with self.subTest(engine=engine):
+                if engine == Engine.NUMPY and not vector.is_available():
+                    continue
+                map_ = _create_map2()
+                other_unit = Unit(GridPosition(1, 3))
+                map_.add_unit(other_unit)
+                move_map = MoveMap(map_, engine)
+                self.assertEqual(engine, move_map.engine)
+                unit = Unit(
+                    GridPosition(3, 3),
+                    move=3)
+                move_map.calc(unit)
+
+                expected = [
+                    [-1, -1, -1, -1, -1, -1, -1],
+                    [-1, -1, 0, 1, 0, -1, -1],
+                    [-1, -1, 0, 2, 1, 0, -1],
+                    [-1, -1, 2, 3, 1, 0, -1],
+                    [-1, 0, 1, 2, 1, 0, -1],
+                    [-1, -1, -1, -1, -1, -1, -1],
+                ]
+                self.assertEqual(expected, move_map._moves.to_list())
+
+    def test_calc_queue_same_as_recursive(self):
+        ground_types = [
+            [0, 2, 0, 0, 1, 0],
+            [0, 1, 3, 0, 2, 0],
+            [2, 0, 0, 0, 0, 3],
+            [0, 3, 1, 2, 0, 0],
+            [0, 0, 0, 3, 1, 2],
+        ]
+        ground_dict = dict(_GROUND_DICT)
+        ground_dict[3] = Ground(0)
+        for move in range(5):
+            with self.subTest(move=move):
+                map_ = Map(ground_types, ground_dict)
+                map_.add_unit(Unit(GridPosition(3, 1)))
+                unit = Unit(GridPosition(2, 2), move=move)
+                recursive = MoveMap(map_, Engine.RECURSIVE)
+                recursive.calc(unit)
+                queue = MoveMap(map_, Engine.QUEUE)
+                queue.calc(unit)
+                self.assertEqual(recursive._moves.to_list(), queue._moves.to_list())
+
+    def test_calc_many(self):
+        map_ = _create_map2()
+        units = [
+            Unit(GridPosition(3, 3), move=3),
+            Unit(GridPosition(1, 1), move=1),
+        ]
+        for unit in units:
+            map_.add_unit(unit)
+        move_map = MoveMap(map_)
+
+        for processes in (None, 2):
+            with self.subTest(processes=processes):
+                ranges = move_map.calc_many(units, processes)
+                self.assertEqual(2, len(ranges))
+                for unit, range_ in zip(units, ranges):
+                    move_map.calc(unit)
+                    for y in range(map_.height):
+                        for x in range(map_.width):
+                            pos = GridPosition(x, y)
+                            self.assertEqual(
+                                move_map.get_step(pos), range_.get_step(pos))
+
+    def test_get_path(self):
+        ground_types = [
+            [0, 0, 0, 0],
+            [0, 3, 3, 0],
+            [0, 2, 3, 0],
+            [0, 0, 0, 0],
+        ]
+        ground_dict = dict(_GROUND_DICT)
+        ground_dict[3] = Ground(0)
+        map_ = Map(ground_types, ground_dict)
+        # コスト 0 の地面が隣り合うと RECURSIVE は終わらないため除く
+        for engine in (Engine.QUEUE, Engine.NUMPY):
+            if engine == Engine.NUMPY and not vector.is_available():
+                continue
+            with self.subTest(engine=engine):
+                move_map = MoveMap(map_, engine)
+                self.assertIsNone(move_map.get_path(GridPosition(0, 0)))
+
+                unit = Unit(GridPosition(0, 0), move=3)
+                move_map.calc(unit)
+                for y in range(map_.height):
+                    for x in range(map_.width):
+                        pos = GridPosition(x, y)
+                        path = move_map.get_path(pos)
+                        if not move_map.can_move(pos):
+                            self.assertIsNone(path)
+                            continue
+
+                        self.assertEqual((0, 0), path[0])
+                        self.assertEqual(pos, path[-1])
+                        cost = sum(map_.get_cost(p) for p in path[1:])
+                        self.assertEqual(
+                            unit.move - move_map.get_step(pos), cost)
+
+    def test_get_path_expansions(self):
+        """経路の長さ程度のセルだけを調べる."""
+
+        map_ = Map([[0] * 201 for _ in range(201)], _GROUND_DICT)
+        move_map = MoveMap(map_, Engine.QUEUE)
+        move_map.calc(Unit(GridPosition(100, 100), move=100))
+
+        with mock.patch('slgmove.main.get_neighbors', wraps=get_neighbors) as mp:
+            path = move_map.get_path(GridPosition(150, 150))
+        self.assertEqual(101, len(path))
+        self.assertEqual((100, 100), path[0])
+        self.assertEqual((150, 150), path[-1])
+        self.assertGreaterEqual(len(path), mp.call_count)
+
+    def test_update(self):
+        rand = random.Random(0)
+        ground_dict = dict(_GROUND_DICT)
+        ground_dict[3] = Ground(0)
+        types = [0, 0, 0, 1, 2, 3]
+        for _ in range(30):
+            ground_types = [
+                [rand.choice(types) for _ in range(8)]
+                for _ in range(7)]
+            map_ = Map(ground_types, ground_dict)
+            others = []
+            for _ in range(5):
+                other = Unit(GridPosition(rand.randrange(8), rand.randrange(7)))
+                map_.add_unit(other)
+                others.append(other)
+            unit = Unit(GridPosition(4, 3), move=rand.randrange(1, 7))
+            move_map = MoveMap(map_)
+            move_map.calc(unit)
+
+            changed = []
+            for _ in range(3):
+                pos = GridPosition(rand.randrange(8), rand.randrange(7))
+                map_.set_type(pos, rand.choice(types))
+                changed.append(pos)
+            other = rand.choice(others)
+            changed.append(other.position)
+            other.set_position(GridPosition(rand.randrange(8), rand.randrange(7)))
+            changed.append(other.position)
+            move_map.update(changed)
+
+            expected = MoveMap(map_)
+            expected.calc(unit)
+            self.assertEqual(
+                expected._moves.to_list(), move_map._moves.to_list())
+
+    def test_update_before_calc(self):
+        map_ = _create_map2()
+        move_map = MoveMap(map_)
+        move_map.update([GridPosition(1, 1)])
+        self.assertFalse(move_map.can_move(GridPosition(1, 1)))
 
     def test_calc_step(self):
         map_ = _create_map1()
@@ -250,6 +574,419 @@ class TestMoveMap(unittest.TestCase):
             move_map.can_move(GridPosition(5, 5)))
 
 
+class TestMoveRange(unittest.TestCase):
+
+    def test_get_step(self):
+        range_ = MoveRange(3, 2, {1: 2, 4: 0})
+        self.assertEqual(2, len(range_))
+        self.assertEqual(2, range_.get_step(GridPosition(1, 0)))
+        self.assertEqual(0, range_.get_step(GridPosition(1, 1)))
+        self.assertEqual(
+            MoveMap.UNSET_VALUE, range_.get_step(GridPosition(0, 0)))
+        self.assertEqual(
+            MoveMap.UNSET_VALUE, range_.get_step(GridPosition(3, 0)))
+        self.assertTrue(range_.can_move(GridPosition(1, 1)))
+        self.assertFalse(range_.can_move(GridPosition(2, 1)))
+
+    def test_get_positions(self):
+        range_ = MoveRange(3, 2, {4: 0, 1: 2})
+        self.assertEqual([(1, 0), (1, 1)], range_.get_positions())
+
+    def test_get_reach_set(self):
+        range_ = MoveRange(3, 2, {4: 0, 1: 2})
+        self.assertEqual(ReachSet(3, 2, 0b10010), range_.get_reach_set())
+
+
+class TestReachSet(unittest.TestCase):
+
+    def test_from_indices(self):
+        reach_set = ReachSet.from_indices(3, 3, [0, 4, 8])
+        self.assertEqual(3, reach_set.width)
+        self.assertEqual(3, reach_set.height)
+        self.assertEqual(0b100010001, reach_set.bits)
+        self.assertEqual(3, len(reach_set))
+        self.assertEqual([0, 4, 8], reach_set.get_indices())
+        self.assertEqual([(0, 0), (1, 1), (2, 2)], reach_set.get_positions())
+        self.assertTrue(reach_set.can_move(GridPosition(1, 1)))
+        self.assertFalse(reach_set.can_move(GridPosition(1, 0)))
+        self.assertFalse(reach_set.can_move(GridPosition(3, 0)))
+        self.assertFalse(ReachSet(3, 3))
+
+    def test_operators(self):
+        a = ReachSet.from_indices(4, 4, [0, 1, 2, 15])
+        b = ReachSet.from_indices(4, 4, [2, 3, 15])
+        self.assertEqual([0, 1, 2, 3, 15], (a | b).get_indices())
+        self.assertEqual([2, 15], (a & b).get_indices())
+        self.assertEqual([0, 1], (a - b).get_indices())
+
+        c = ReachSet.from_indices(4, 4, [2, 5])
+        self.assertEqual([0, 1, 2, 3, 5, 15], ReachSet.union([a, b, c]).get_indices())
+        self.assertEqual([2], ReachSet.intersection([a, b, c]).get_indices())
+
+        with self.assertRaises(ValueError):
+            a | ReachSet(2, 8)
+
+    def test_move_map(self):
+        map_ = _create_map2()
+        map_.add_unit(Unit(GridPosition(4, 2)))
+        unit = Unit(GridPosition(3, 3), move=3)
+        move_map = MoveMap(map_)
+        move_map.calc(unit)
+        reach_set = move_map.get_reach_set()
+        for y in range(map_.height):
+            for x in range(map_.width):
+                pos = GridPosition(x, y)
+                self.assertEqual(move_map.can_move(pos), reach_set.can_move(pos))
+        self.assertEqual(reach_set, MoveRangeCache(map_).calc(unit).get_reach_set())
+
+
+class TestMoveRangeCache(unittest.TestCase):
+
+    def test_calc(self):
+        map_ = _create_map2()
+        cache = MoveRangeCache(map_)
+        self.assertEqual(0.0, cache.hit_rate)
+
+        unit = Unit(GridPosition(3, 3), move=3)
+        range_ = cache.calc(unit)
+        self.assertEqual(3, range_.get_step(GridPosition(3, 3)))
+        self.assertEqual(0, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+        # 同じ位置・移動力なら別ユニットでも使い回す
+        self.assertIs(range_, cache.calc(Unit(GridPosition(3, 3), move=3)))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(0.5, cache.hit_rate)
+
+        # マップが変わったら計算し直す
+        map_.add_unit(Unit(GridPosition(3, 2)))
+        new_range = cache.calc(unit)
+        self.assertIsNot(range_, new_range)
+        self.assertFalse(new_range.can_move(GridPosition(3, 2)))
+        self.assertEqual(2, cache.misses)
+
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.hits)
+
+    def test_evict(self):
+        map_ = _create_map2()
+        cache = MoveRangeCache(map_, maxsize=2)
+        unit1 = Unit(GridPosition(1, 1), move=1)
+        unit2 = Unit(GridPosition(2, 1), move=1)
+        unit3 = Unit(GridPosition(3, 1), move=1)
+
+        cache.calc(unit1)
+        cache.calc(unit2)
+        cache.calc(unit1)
+        cache.calc(unit3)
+        self.assertEqual(2, len(cache))
+
+        # unit2 が最も使われていないため捨てられている
+        cache.calc(unit1)
+        self.assertEqual(2, cache.hits)
+        cache.calc(unit2)
+        self.assertEqual(4, cache.misses)
+
+
+def _calc_reference(map_, unit, topology):
+    """全セルの緩和を繰り返して移動範囲を求めます."""
+
+    width = map_.width
+    height = map_.height
+    moves = [[-1] * width for _ in range(height)]
+    moves[unit.position.y][unit.position.x] = unit.move
+    changed = True
+    while changed:
+        changed = False
+        for y in range(height):
+            for x in range(width):
+                rest = moves[y][x]
+                if rest <= 0:
+                    continue
+                for index in get_neighbors(y * width + x, width, height, topology):
+                    ny, nx = divmod(index, width)
+                    pos = GridPosition(nx, ny)
+                    if not map_.can_move(pos, rest):
+                        continue
+                    next_rest = rest - map_.get_cost(pos)
+                    if moves[ny][nx] < next_rest:
+                        moves[ny][nx] = next_rest
+                        changed = True
+    return moves
+
+
+class TestTopology(unittest.TestCase):
+
+    def test_get_neighbors(self):
+        self.assertEqual({1, 4, 6, 9}, set(get_neighbors(5, 4, 3)))
+        self.assertEqual(
+            {0, 1, 2, 4, 6, 8, 9, 10},
+            set(get_neighbors(5, 4, 3, Topology.SQUARE8)))
+        self.assertEqual({1, 4, 5}, set(get_neighbors(0, 4, 3, Topology.SQUARE8)))
+        # 奇数行は右上・右下、偶数行は左上・左下とつながる
+        self.assertEqual(
+            {1, 2, 4, 6, 9, 10}, set(get_neighbors(5, 4, 3, Topology.HEX)))
+        self.assertEqual(
+            {5, 6, 9, 11}, set(get_neighbors(10, 4, 3, Topology.HEX)))
+
+    def test_init(self):
+        map_ = _create_map2()
+        self.assertEqual(Topology.SQUARE4, MoveMap(map_).topology)
+        self.assertEqual(
+            Topology.HEX, MoveMap(map_, topology=Topology.HEX).topology)
+        with self.assertRaises(NotImplementedError):
+            MoveMap(map_, Engine.RECURSIVE, Topology.SQUARE8)
+        if vector.is_available():
+            with self.assertRaises(NotImplementedError):
+                MoveMap(map_, Engine.NUMPY, Topology.HEX)
+
+    def test_calc_square8(self):
+        map_ = _create_map2()
+        unit = Unit(GridPosition(3, 3), move=2)
+        move_map = MoveMap(map_, topology=Topology.SQUARE8)
+        move_map.calc(unit)
+        expected = [
+            [-1, -1, -1, -1, -1, -1, -1],
+            [-1, -1, 0, 0, 0, 0, -1],
+            [-1, 0, 0, 1, 1, 0, -1],
+            [-1, 0, 1, 2, 0, 0, -1],
+            [-1, 0, 1, 1, 1, 0, -1],
+            [-1, -1, -1, -1, -1, -1, -1],
+        ]
+        self.assertEqual(expected, move_map._moves.to_list())
+
+    def test_calc_random(self):
+        rand = random.Random(0)
+        ground_dict = dict(_GROUND_DICT)
+        ground_dict[3] = Ground(3)
+        engines = {
+            Topology.SQUARE8: [Engine.QUEUE],
+            Topology.HEX: [Engine.QUEUE],
+        }
+        if vector.is_available():
+            engines[Topology.SQUARE8].append(Engine.NUMPY)
+        for _ in range(20):
+            ground_types = [
+                [rand.choice([0, 0, 1, 2, 3]) for _ in range(9)]
+                for _ in range(8)]
+            map_ = Map(ground_types, ground_dict)
+            for _ in range(4):
+                map_.add_unit(Unit(GridPosition(rand.randrange(9), rand.randrange(8))))
+            unit = Unit(GridPosition(rand.randrange(9), rand.randrange(8)), move=rand.randrange(1, 7))
+            for topology, topology_engines in engines.items():
+                expected = _calc_reference(map_, unit, topology)
+                for engine in topology_engines:
+                    with self.subTest(topology=topology, engine=engine):
+                        move_map = MoveMap(map_, engine, topology)
+                        move_map.calc(unit)
+                        self.assertEqual(expected, move_map._moves.to_list())
+
+                move_map = MoveMap(map_, topology=topology)
+                ranges = move_map.calc_many([unit])
+                self.assertEqual(
+                    {y * 9 + x: v for y, line in enumerate(expected) for x, v in enumerate(line) if v != -1},
+                    ranges[0].steps)
+
+    def test_update(self):
+        rand = random.Random(1)
+        for topology in (Topology.SQUARE8, Topology.HEX):
+            for _ in range(20):
+                ground_types = [
+                    [rand.choice([0, 0, 0, 1, 2]) for _ in range(8)]
+                    for _ in range(7)]
+                map_ = Map(ground_types, _GROUND_DICT)
+                unit = Unit(GridPosition(4, 3), move=rand.randrange(1, 6))
+                move_map = MoveMap(map_, topology=topology)
+                move_map.calc(unit)
+
+                changed = []
+                for _ in range(3):
+                    pos = GridPosition(rand.randrange(8), rand.randrange(7))
+                    map_.set_type(pos, rand.choice([0, 1, 2]))
+                    changed.append(pos)
+                move_map.update(changed)
+
+                expected = MoveMap(map_, topology=topology)
+                expected.calc(unit)
+                self.assertEqual(
+                    expected._moves.to_list(), move_map._moves.to_list())
+
+    def test_get_path(self):
+        map_ = _create_map2()
+        unit = Unit(GridPosition(1, 1), move=5)
+        for topology in (Topology.SQUARE8, Topology.HEX):
+            move_map = MoveMap(map_, topology=topology)
+            move_map.calc(unit)
+            for y in range(map_.height):
+                for x in range(map_.width):
+                    pos = GridPosition(x, y)
+                    path = move_map.get_path(pos)
+                    if not move_map.can_move(pos):
+                        self.assertIsNone(path)
+                        continue
+                    for prev, next_ in zip(path, path[1:]):
+                        self.assertEqual(1, prev.calc_distance(next_, topology))
+                    cost = sum(map_.get_cost(p) for p in path[1:])
+                    self.assertEqual(unit.move - move_map.get_step(pos), cost)
+
+    def test_find_path(self):
+        map_ = _create_map2()
+        start = GridPosition(1, 1)
+        goal = GridPosition(5, 4)
+        self.assertEqual(7, len(map_.find_path(start, goal, Topology.SQUARE4)) - 1)
+
+        path = map_.find_path(start, goal, Topology.SQUARE8)
+        self.assertEqual(4, len(path) - 1)
+        for prev, next_ in zip(path, path[1:]):
+            self.assertEqual(1, prev.calc_distance(next_, Topology.SQUARE8))
+
+        path = map_.find_path(start, goal, Topology.HEX)
+        self.assertEqual(start.calc_distance(goal, Topology.HEX), len(path) - 1)
+        for prev, next_ in zip(path, path[1:]):
+            self.assertEqual(1, prev.calc_distance(next_, Topology.HEX))
+
+    def test_find_path_cost(self):
+        # 最小コストが移動範囲の計算と一致する
+        rand = random.Random(2)
+        for topology in (Topology.SQUARE8, Topology.HEX):
+            for _ in range(10):
+                ground_types = [
+                    [rand.choice([0, 0, 1, 2]) for _ in range(7)]
+                    for _ in range(6)]
+                map_ = Map(ground_types, _GROUND_DICT)
+                unit = Unit(GridPosition(3, 3), move=30)
+                move_map = MoveMap(map_, topology=topology)
+                move_map.calc(unit)
+                for y in range(6):
+                    for x in range(7):
+                        goal = GridPosition(x, y)
+                        path = map_.find_path(unit.position, goal, topology)
+                        if not move_map.can_move(goal):
+                            self.assertIsNone(path)
+                            continue
+                        cost = sum(map_.get_cost(p) for p in path[1:])
+                        self.assertEqual(30 - move_map.get_step(goal), cost)
+
+
+class TestStats(unittest.TestCase):
+
+    def test_map(self):
+        map_ = _create_map2()
+        stats = MoveStats()
+        map_.enable_stats(stats)
+        map_.can_move(GridPosition(1, 1), 3)
+        map_.can_move(GridPosition(0, 0), 3)
+        self.assertEqual(2, stats.can_move_calls)
+        self.assertEqual(1, stats.unit_lookups)
+
+        # 無効にするとクラスのメソッドに戻る
+        map_.disable_stats()
+        self.assertNotIn('can_move', vars(map_))
+        map_.can_move(GridPosition(1, 1), 3)
+        self.assertEqual(2, stats.can_move_calls)
+
+    def test_disabled(self):
+        map_ = _create_map2()
+        move_map = MoveMap(map_)
+        self.assertIsNone(move_map.stats)
+        move_map.calc(Unit(GridPosition(3, 3), move=3))
+        self.assertIsNone(move_map.stats)
+
+    def test_queue(self):
+        map_ = _create_map2()
+        map_.add_unit(Unit(GridPosition(1, 3)))
+        unit = Unit(GridPosition(3, 3), move=3)
+        expected = MoveMap(map_)
+        expected.calc(unit)
+
+        hooked = []
+        move_map = MoveMap(map_)
+        stats = move_map.enable_stats(hooked.append)
+        move_map.calc(unit)
+        move_map.calc(unit)
+        self.assertEqual(expected._moves.to_list(), move_map._moves.to_list())
+        self.assertIs(stats, move_map.stats)
+        self.assertEqual(2, stats.calc_count)
+        self.assertEqual(2, len(hooked))
+        self.assertEqual(1, hooked[0].calc_count)
+        self.assertEqual(2 * hooked[0].visits, stats.visits)
+        self.assertLess(0, hooked[0].visits)
+        self.assertLess(0, hooked[0].can_move_calls)
+        self.assertLess(0, hooked[0].unit_lookups)
+        self.assertLessEqual(0.0, stats.elapsed)
+
+        move_map.disable_stats()
+        self.assertIsNone(move_map.stats)
+
+    def test_recursive(self):
+        map_ = _create_map2()
+        unit = Unit(GridPosition(3, 3), move=3)
+        expected = MoveMap(map_)
+        expected.calc(unit)
+
+        move_map = MoveMap(map_, Engine.RECURSIVE)
+        stats = move_map.enable_stats()
+        move_map.calc(unit)
+        self.assertEqual(expected._moves.to_list(), move_map._moves.to_list())
+        self.assertLess(0, stats.visits)
+        self.assertLess(0, stats.revisits)
+        self.assertLess(0, stats.can_move_calls)
+        self.assertLess(0, stats.unit_lookups)
+
+        # 計算後はマップと自身のメソッドを元に戻す
+        self.assertNotIn('can_move', vars(map_))
+        self.assertNotIn('_write', vars(move_map))
+
+    def test_map_and_move_map(self):
+        """マップと MoveMap の両方で有効にした場合は、両方に数える."""
+
+        map_ = _create_map2()
+        unit = Unit(GridPosition(3, 3), move=3)
+        map_stats = MoveStats()
+        map_.enable_stats(map_stats)
+
+        move_map = MoveMap(map_, Engine.RECURSIVE)
+        stats = move_map.enable_stats()
+        move_map.calc(unit)
+        self.assertLess(0, stats.can_move_calls)
+        self.assertEqual(stats.can_move_calls, map_stats.can_move_calls)
+        self.assertEqual(stats.unit_lookups, map_stats.unit_lookups)
+
+        # 計算後もマップの統計は有効のまま
+        self.assertIn('can_move', vars(map_))
+        calls = map_stats.can_move_calls
+        map_.can_move(GridPosition(1, 1), 3)
+        self.assertEqual(calls + 1, map_stats.can_move_calls)
+        self.assertEqual(calls, stats.can_move_calls)
+
+        map_.disable_stats()
+        self.assertNotIn('can_move', vars(map_))
+
+
+class TestExport(unittest.TestCase):
+
+    def test_map_to_string(self):
+        map_ = Map([[0, 1], [2, 0]], _GROUND_DICT)
+        self.assertEqual('0 1 \n2 0 \n', map_.to_string())
+
+    def test_move_map_to_string(self):
+        map_ = Map([[0, 0, 0]], {0: Ground(1)})
+        unit = Unit(GridPosition(0, 0), move=1)
+        move_map = MoveMap(map_)
+        move_map.calc(unit)
+        self.assertEqual(' 1  0 -1 \n', move_map.to_string())
+        self.assertEqual([(1, 1), (0, 1), (-1, 1)], move_map.grid.to_rle())
+
+    def test_dump(self):
+        # 1セルずつ print していた頃と同じ出力になる
+        map_ = Map([[0, 1], [2, 0]], _GROUND_DICT)
+        stream = io.StringIO()
+        with contextlib.redirect_stdout(stream):
+            map_.dump()
+        self.assertEqual('0 1 \n2 0 \n', stream.getvalue())
+
+
 class TestSLGMove(unittest.TestCase):
     """各機能を利用したサンプル."""
 
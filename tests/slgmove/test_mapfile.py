@@ -0,0 +1,91 @@
+"""mapfile モジュールのテスト."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from slgmove import mapfile
+from slgmove.main import Unit, Map, MoveMap, Ground
+from slgmove.position import GridPosition
+
+_GROUND_TYPES = [
+    [1, 1, 1, 1, 1, 1, 1],
+    [1, 0, 0, 0, 0, 0, 1],
+    [1, 0, 2, 0, 0, 0, 1],
+    [1, 0, 0, 0, 2, 0, 1],
+    [1, 0, 0, 0, 0, 0, 1],
+    [1, 1, 1, 1, 1, 1, 1],
+]
+
+_GROUND_DICT = {
+    0: Ground(1),
+    1: Ground(Ground.COST_FORBIDDEN),
+    2: Ground(300),
+}
+
+
+class TestMapFile(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._dir.name) / 'test.map'
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_save_load(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        mapfile.save(map_, self._path)
+
+        loaded = mapfile.load(self._path)
+        self.assertEqual(7, loaded.width)
+        self.assertEqual(6, loaded.height)
+        self.assertEqual(_GROUND_TYPES, loaded.type_grid.to_list())
+        self.assertEqual(map_.cost_grid.to_list(), loaded.cost_grid.to_list())
+        self.assertEqual('h', loaded.cost_grid.typecode)
+        self.assertEqual(300, loaded.get_cost(GridPosition(2, 2)))
+        self.assertEqual(
+            Ground.COST_FORBIDDEN, loaded.get_ground(GridPosition(0, 0)).cost)
+
+    def test_move_map(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        mapfile.save(map_, self._path)
+        loaded = mapfile.load(self._path)
+
+        unit = Unit(GridPosition(3, 3), move=3)
+        expected = MoveMap(map_)
+        expected.calc(unit)
+        move_map = MoveMap(loaded)
+        move_map.calc(unit)
+        self.assertEqual(expected._moves.to_list(), move_map._moves.to_list())
+
+    def test_writable(self):
+        mapfile.save(Map(_GROUND_TYPES, _GROUND_DICT), self._path)
+
+        loaded = mapfile.load(self._path)
+        with self.assertRaises(TypeError):
+            loaded.set_type(GridPosition(1, 1), 2)
+
+        loaded = mapfile.load(self._path, writable=True)
+        loaded.set_type(GridPosition(1, 1), 2)
+        self.assertEqual(300, loaded.get_cost(GridPosition(1, 1)))
+
+        # ファイルには書き戻さない
+        loaded = mapfile.load(self._path)
+        self.assertEqual(1, loaded.get_cost(GridPosition(1, 1)))
+
+    def test_invalid(self):
+        self._path.write_bytes(b'XXXX' + bytes(32))
+        with self.assertRaises(ValueError):
+            mapfile.load(self._path)
+
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        mapfile.save(map_, self._path)
+        data = self._path.read_bytes()
+        self._path.write_bytes(data[:-4])
+        with self.assertRaises(ValueError):
+            mapfile.load(self._path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""pool モジュールのテスト."""
+
+import functools
+import multiprocessing
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+from slgmove import pool
+from slgmove.main import Unit, Map, MoveMap, Ground
+from slgmove.pool import SharedMap, MovePool
+from slgmove.position import GridPosition
+
+_GROUND_TYPES = [
+    [1, 1, 1, 1, 1, 1, 1],
+    [1, 0, 0, 0, 0, 0, 1],
+    [1, 0, 2, 0, 0, 0, 1],
+    [1, 0, 0, 0, 2, 0, 1],
+    [1, 0, 0, 0, 0, 0, 1],
+    [1, 1, 1, 1, 1, 1, 1],
+]
+
+_GROUND_DICT = {
+    0: Ground(1),
+    1: Ground(Ground.COST_FORBIDDEN),
+    2: Ground(300),
+}
+
+
+def _calc_expected(map_, units):
+    for unit in units:
+        map_.add_unit(unit)
+    return MoveMap(map_).calc_many(units)
+
+
+class TestSharedMap(unittest.TestCase):
+
+    def test_map(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        with SharedMap(map_) as shared:
+            self.assertEqual(map_.type_grid.to_list(), shared.map.type_grid.to_list())
+            self.assertEqual(map_.cost_grid.to_list(), shared.map.cost_grid.to_list())
+            self.assertEqual('h', shared.map.cost_grid.typecode)
+            self.assertEqual(300, shared.map.get_ground(GridPosition(2, 2)).cost)
+            self.assertEqual(shared.name, shared.spec[0])
+
+    def test_attach(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        with SharedMap(map_) as shared:
+            attached = pool._attach(shared.spec)
+            self.assertEqual(map_.cost_grid.to_list(), attached.cost_grid.to_list())
+
+            # 同じ共有メモリを参照する
+            shared.map.set_type(GridPosition(1, 1), 2)
+            self.assertEqual(300, attached.get_cost(GridPosition(1, 1)))
+            self.assertIs(attached, pool._attach(shared.spec))
+
+            del attached
+            _, (shm, attached) = pool._attached.popitem()
+            del attached
+            shm.close()
+
+    def test_attach_limit(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        shared_list = [SharedMap(map_) for _ in range(3)]
+        try:
+            with mock.patch.object(pool, '_MAX_ATTACHED', 2):
+                for shared in shared_list:
+                    pool._attach(shared.spec)
+                self.assertEqual(
+                    [s.name for s in shared_list[1:]], list(pool._attached))
+        finally:
+            while pool._attached:
+                _, (shm, attached) = pool._attached.popitem()
+                del attached
+                shm.close()
+            for shared in shared_list:
+                shared.close()
+
+
+class TestMovePool(unittest.TestCase):
+
+    def test_calc_many(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        units = [
+            Unit(GridPosition(1, 1), move=3),
+            Unit(GridPosition(3, 3), move=4),
+            Unit(GridPosition(5, 4), move=2),
+        ]
+        with SharedMap(map_) as shared, MovePool(2) as move_pool:
+            results = move_pool.calc_many(shared, units, chunk_size=2)
+        expected = _calc_expected(map_, units)
+        self.assertEqual([r.steps for r in expected], [r.steps for r in results])
+
+    def test_calc_battles(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        battles_units = [
+            [Unit(GridPosition(1, 1), move=3), Unit(GridPosition(2, 1), move=3)],
+            [Unit(GridPosition(1, 1), move=3)],
+            [],
+        ]
+        with SharedMap(map_) as shared, MovePool(2) as move_pool:
+            results = move_pool.calc_battles(
+                [(shared, units) for units in battles_units], chunk_size=1)
+
+        self.assertEqual(3, len(results))
+        for units, battle_results in zip(battles_units, results):
+            expected = _calc_expected(Map(_GROUND_TYPES, _GROUND_DICT), units)
+            self.assertEqual(
+                [r.steps for r in expected], [r.steps for r in battle_results])
+        # 同じ戦闘のユニットだけが邪魔になる
+        self.assertFalse(results[0][0].can_move(GridPosition(2, 1)))
+        self.assertTrue(results[1][0].can_move(GridPosition(2, 1)))
+
+    def test_move_map_executor(self):
+        """MoveMap.calc_many でプールのワーカープロセスを使い回す."""
+
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        units = [Unit(GridPosition(1, 1), move=3), Unit(GridPosition(3, 3), move=4)]
+        expected = _calc_expected(map_, units)
+        move_map = MoveMap(map_)
+        with MovePool(2) as move_pool:
+            for _ in range(2):
+                results = move_map.calc_many(
+                    units, executor=move_pool.executor, chunk_size=1)
+                self.assertEqual([r.steps for r in expected], [r.steps for r in results])
+
+
+class TestMoveMapSpawn(unittest.TestCase):
+    """spawn で起動したワーカープロセスに、共有メモリ上のマップの移動コストを渡す."""
+
+    def test_calc_many(self):
+        context = multiprocessing.get_context('spawn')
+        units = [Unit(GridPosition(1, 1), move=3), Unit(GridPosition(3, 3), move=4)]
+        expected = _calc_expected(Map(_GROUND_TYPES, _GROUND_DICT), units)
+        with SharedMap(Map(_GROUND_TYPES, _GROUND_DICT)) as shared:
+            for unit in units:
+                shared.map.add_unit(unit)
+            move_map = MoveMap(shared.map)
+
+            with ProcessPoolExecutor(2, mp_context=context) as executor:
+                results = move_map.calc_many(units, executor=executor)
+            self.assertEqual([r.steps for r in expected], [r.steps for r in results])
+
+            spawn_executor = functools.partial(ProcessPoolExecutor, mp_context=context)
+            with mock.patch('slgmove.main.ProcessPoolExecutor', spawn_executor):
+                results = move_map.calc_many(units, processes=2)
+            self.assertEqual([r.steps for r in expected], [r.steps for r in results])
+
+            # 共有メモリを閉じられるよう参照を消す
+            del move_map
+            for unit in units:
+                shared.map.remove_unit(unit)
+
+
+if __name__ == '__main__':
+    unittest.main()
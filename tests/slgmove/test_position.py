@@ -1,8 +1,11 @@
 """position モジュールのテスト."""
 
+import copy
+import gc
+import pickle
 import unittest
 
-from slgmove.position import GridPosition
+from slgmove.position import GridPosition, GridPoint, Topology, calc_grid_distance
 
 
 class TestGridPosition(unittest.TestCase):
@@ -75,6 +78,113 @@ class TestGridPosition(unittest.TestCase):
         pos1 = GridPosition(1, 1)
         pos2 = GridPosition(3, 4)
         self.assertEqual(5, pos1.calc_distance(pos2))
+        self.assertEqual(3, pos1.calc_distance(pos2, Topology.SQUARE8))
+        self.assertEqual(3, pos1.calc_distance(pos2, Topology.HEX))
+
+    def test_slots(self):
+        pos = GridPosition(1, 2)
+        with self.assertRaises(AttributeError):
+            pos.z = 0
+
+
+class TestGridPoint(unittest.TestCase):
+
+    def test_init(self):
+        point = GridPoint(1, 2)
+        self.assertEqual(1, point.x)
+        self.assertEqual(2, point.y)
+        self.assertEqual((1, 2), point.get())
+
+        with self.assertRaises(Exception):
+            GridPoint(-1, -1)
+
+    def test_immutable(self):
+        point = GridPoint(1, 2)
+        with self.assertRaises(AttributeError):
+            point._x = 5
+        with self.assertRaises(AttributeError):
+            point.z = 5
+
+    def test_of(self):
+        point = GridPoint.of(3, 4)
+        self.assertIs(point, GridPoint.of(3, 4))
+        self.assertIsNot(point, GridPoint.of(4, 3))
+
+    def test_of_released(self):
+        """使われなくなったインスタンスは使い回し用の辞書から消える."""
+
+        point = GridPoint.of(1000, 2000)
+        point.right()
+        self.assertIn((1000, 2000), GridPoint._interned)
+        del point
+        gc.collect()
+        self.assertNotIn((1000, 2000), GridPoint._interned)
+        self.assertNotIn((1001, 2000), GridPoint._interned)
+
+    def test_copy_pickle(self):
+        point = GridPoint.of(3, 4)
+        self.assertIs(point, copy.copy(point))
+        self.assertIs(point, copy.deepcopy(point))
+        self.assertIs(point, pickle.loads(pickle.dumps(point)))
+
+        # 位置を含む状態もコピーできる
+        state = {'points': [point, GridPoint(5, 6)]}
+        copied = copy.deepcopy(state)
+        self.assertEqual(state, copied)
+
+    def test_neighbors(self):
+        point = GridPoint.of(1, 2)
+        self.assertEqual((1, 1), point.up())
+        self.assertEqual((1, 3), point.down())
+        self.assertEqual((0, 2), point.left())
+        self.assertEqual((2, 2), point.right())
+        self.assertIs(point.up(), point.up())
+        self.assertIs(GridPoint.of(1, 1), point.up())
+
+        point = GridPoint.of(0, 0)
+        self.assertIs(point, point.up())
+        self.assertIs(point, point.left())
+
+    def test_calc_distance(self):
+        point = GridPoint(1, 1)
+        self.assertEqual(5, point.calc_distance(GridPoint(3, 4)))
+        self.assertEqual(5, point.calc_distance(GridPosition(3, 4)))
+        self.assertEqual(3, point.calc_distance(GridPoint(3, 4), Topology.SQUARE8))
+
+
+class TestCalcGridDistance(unittest.TestCase):
+
+    def test_square(self):
+        self.assertEqual(7, calc_grid_distance(1, 1, 4, 5))
+        self.assertEqual(4, calc_grid_distance(1, 1, 4, 5, Topology.SQUARE8))
+        self.assertEqual(0, calc_grid_distance(2, 2, 2, 2, Topology.SQUARE8))
+
+    def test_hex(self):
+        # 奇数行は右に半マスずれている
+        self.assertEqual(1, calc_grid_distance(1, 1, 1, 0, Topology.HEX))
+        self.assertEqual(1, calc_grid_distance(1, 1, 2, 0, Topology.HEX))
+        self.assertEqual(2, calc_grid_distance(1, 1, 0, 0, Topology.HEX))
+        self.assertEqual(1, calc_grid_distance(1, 2, 0, 1, Topology.HEX))
+        self.assertEqual(2, calc_grid_distance(1, 2, 2, 1, Topology.HEX))
+        self.assertEqual(3, calc_grid_distance(0, 0, 3, 0, Topology.HEX))
+        self.assertEqual(4, calc_grid_distance(0, 0, 2, 4, Topology.HEX))
+
+    def test_equal(self):
+        point = GridPoint(1, 2)
+        self.assertEqual((1, 2), point)
+        self.assertEqual(GridPoint(1, 2), point)
+        self.assertEqual(GridPosition(1, 2), point)
+        self.assertEqual(point, GridPosition(1, 2))
+        self.assertNotEqual(GridPoint(2, 1), point)
+        with self.assertRaises(TypeError):
+            point == 5
+
+    def test_hash(self):
+        point = GridPoint(1, 2)
+        self.assertEqual(hash((1, 2)), hash(point))
+        points = {GridPoint(1, 2), GridPoint.of(1, 2), GridPoint(2, 1)}
+        self.assertEqual(2, len(points))
+        self.assertIn((1, 2), points)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,47 @@
+"""stats モジュールのテスト."""
+
+import unittest
+
+from slgmove.stats import MoveStats
+
+
+class TestMoveStats(unittest.TestCase):
+
+    def test_add(self):
+        stats = MoveStats()
+        self.assertEqual(0, stats.calc_count)
+        stats.add(calc_count=1, visits=3, revisits=1, elapsed=0.5)
+        stats.add(can_move_calls=4, unit_lookups=2)
+        self.assertEqual(1, stats.calc_count)
+        self.assertEqual(3, stats.visits)
+        self.assertEqual(1, stats.revisits)
+        self.assertEqual(4, stats.can_move_calls)
+        self.assertEqual(2, stats.unit_lookups)
+        self.assertEqual(0.5, stats.elapsed)
+
+    def test_merge(self):
+        stats = MoveStats()
+        stats.add(visits=1)
+        other = MoveStats()
+        other.add(calc_count=2, visits=3, unit_lookups=1)
+        stats.merge(other)
+        self.assertEqual(2, stats.calc_count)
+        self.assertEqual(4, stats.visits)
+        self.assertEqual(1, stats.unit_lookups)
+
+    def test_reset(self):
+        stats = MoveStats()
+        stats.add(calc_count=1, visits=3, elapsed=1.0)
+        stats.reset()
+        self.assertEqual(0, stats.calc_count)
+        self.assertEqual(0, stats.visits)
+        self.assertEqual(0.0, stats.elapsed)
+
+    def test_str(self):
+        stats = MoveStats()
+        stats.add(calc_count=1, visits=2)
+        self.assertIn('visits=2', str(stats))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""threat モジュールのテスト."""
+
+import random
+import unittest
+
+from slgmove import vector
+from slgmove.main import Unit, Map, MoveMap, Ground, Engine
+from slgmove.position import GridPosition
+from slgmove.threat import ThreatMap
+
+_GROUND_TYPES = [
+    [1, 1, 1, 1, 1, 1, 1],
+    [1, 0, 0, 0, 0, 0, 1],
+    [1, 0, 2, 0, 0, 0, 1],
+    [1, 0, 0, 0, 2, 0, 1],
+    [1, 0, 0, 0, 0, 0, 1],
+    [1, 1, 1, 1, 1, 1, 1],
+]
+
+_GROUND_DICT = {
+    0: Ground(1),
+    1: Ground(Ground.COST_FORBIDDEN),
+    2: Ground(2),
+}
+
+
+def _get_engines():
+    engines = [Engine.QUEUE]
+    if vector.is_available():
+        engines.append(Engine.NUMPY)
+    return engines
+
+
+class TestThreatMap(unittest.TestCase):
+
+    def test_init(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        threat_map = ThreatMap(map_)
+        self.assertEqual(Engine.QUEUE, threat_map.engine)
+        self.assertEqual(0, threat_map.get_count(GridPosition(1, 1)))
+
+        with self.assertRaises(NotImplementedError):
+            ThreatMap(map_, Engine.RECURSIVE)
+
+    def test_calc(self):
+        map_ = Map(_GROUND_TYPES, _GROUND_DICT)
+        units = [
+            Unit(GridPosition(1, 1), move=1),
+            Unit(GridPosition(5, 4), move=1),
+        ]
+        for unit in units:
+            map_.add_unit(unit)
+
+        for engine in _get_engines():
+            with self.subTest(engine=engine):
+                threat_map = ThreatMap(map_, engine)
+
+                # 攻撃範囲 0 なら移動範囲と同じ
+                threat_map.calc(units, attack_range=0)
+                self.assertEqual(1, threat_map.get_count(GridPosition(2, 1)))
+                self.assertEqual(0, threat_map.get_count(GridPosition(3, 1)))
+
+                threat_map.calc(units, attack_range=1)
+                self.assertEqual(1, threat_map.get_count(GridPosition(3, 1)))
+                # 進入できないセルにも攻撃は届く
+                self.assertEqual(1, threat_map.get_count(GridPosition(0, 1)))
+                self.assertEqual(0, threat_map.get_count(GridPosition(4, 1)))
+
+                threat_map.calc(units, attack_range=3)
+                self.assertEqual(2, threat_map.get_count(GridPosition(3, 2)))
+
+    def test_same_as_move_map(self):
+        rand = random.Random(0)
+        ground_types = [
+            [rand.choice([0, 0, 1, 2]) for _ in range(10)]
+            for _ in range(8)]
+        map_ = Map(ground_types, _GROUND_DICT)
+        units = []
+        for _ in range(6):
+            unit = Unit(
+                GridPosition(rand.randrange(10), rand.randrange(8)),
+                move=rand.randrange(4))
+            map_.add_unit(unit)
+            units.append(unit)
+
+        # 移動範囲から攻撃範囲を数える
+        expected = [[0] * 10 for _ in range(8)]
+        move_map = MoveMap(map_)
+        for unit in units:
+            move_map.calc(unit)
+            for y in range(8):
+                for x in range(10):
+                    for dy in range(-2, 3):
+                        for dx in range(-2, 3):
+                            if 2 < abs(dx) + abs(dy):
+                                continue
+                            tx, ty = x + dx, y + dy
+                            if not (0 <= tx < 10 and 0 <= ty < 8):
+                                continue
+                            if move_map.can_move(GridPosition(tx, ty)):
+                                expected[y][x] += 1
+                                break
+                        else:
+                            continue
+                        break
+
+        for engine in _get_engines():
+            with self.subTest(engine=engine):
+                threat_map = ThreatMap(map_, engine)
+                threat_map.calc(units, attack_range=2)
+                self.assertEqual(expected, threat_map.grid.to_list())
+
+
+if __name__ == '__main__':
+    unittest.main()
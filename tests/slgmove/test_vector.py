@@ -0,0 +1,71 @@
+"""vector モジュールのテスト."""
+
+import random
+import unittest
+
+from slgmove import vector
+from slgmove.main import Unit, Map, MoveMap, Ground, Engine
+from slgmove.position import GridPosition
+
+_GROUND_DICT = {
+    0: Ground(1),
+    1: Ground(Ground.COST_FORBIDDEN),
+    2: Ground(2),
+    3: Ground(0),
+}
+
+
+def _create_random_map(seed, width, height, types):
+    rand = random.Random(seed)
+    ground_types = [
+        [rand.choice(types) for _ in range(width)]
+        for _ in range(height)]
+    map_ = Map(ground_types, _GROUND_DICT)
+    for _ in range(width * height // 10):
+        pos = GridPosition(rand.randrange(width), rand.randrange(height))
+        map_.add_unit(Unit(pos))
+    return map_
+
+
+@unittest.skipUnless(vector.is_available(), 'numpy is not installed')
+class TestVector(unittest.TestCase):
+
+    def test_as_array(self):
+        map_ = _create_random_map(0, 5, 3, [0, 1, 2])
+        costs = vector.as_array(map_.cost_grid.data, 5, 3)
+        self.assertEqual((3, 5), costs.shape)
+        self.assertEqual(map_.get_cost(GridPosition(4, 2)), costs[2, 4])
+
+    def test_same_as_queue(self):
+        cases = [
+            (1, [0, 0, 1, 2]),
+            (2, [0, 1, 2, 3]),
+            (3, [0, 3, 3, 1]),
+        ]
+        for seed, types in cases:
+            for move in (0, 1, 3, 6):
+                with self.subTest(seed=seed, move=move):
+                    map_ = _create_random_map(seed, 12, 9, types)
+                    unit = Unit(GridPosition(5, 4), move=move)
+                    queue = MoveMap(map_, Engine.QUEUE)
+                    queue.calc(unit)
+                    numpy_ = MoveMap(map_, Engine.NUMPY)
+                    numpy_.calc(unit)
+                    self.assertEqual(
+                        queue._moves.to_list(), numpy_._moves.to_list())
+
+    def test_edge(self):
+        map_ = _create_random_map(4, 6, 6, [0, 0, 2])
+        for pos in (GridPosition(0, 0), GridPosition(5, 5)):
+            with self.subTest(pos=pos):
+                unit = Unit(pos, move=8)
+                queue = MoveMap(map_, Engine.QUEUE)
+                queue.calc(unit)
+                numpy_ = MoveMap(map_, Engine.NUMPY)
+                numpy_.calc(unit)
+                self.assertEqual(
+                    queue._moves.to_list(), numpy_._moves.to_list())
+
+
+if __name__ == '__main__':
+    unittest.main()